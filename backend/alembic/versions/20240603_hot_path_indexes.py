@@ -0,0 +1,46 @@
+"""Hot-path indexes for messages, dialogs and audit logs
+
+Revision ID: 20240603_hot_path_indexes
+Revises: 20240527_rag
+Create Date: 2024-06-03 00:00:00.000000
+"""
+
+from alembic import op
+
+
+revision = "20240603_hot_path_indexes"
+down_revision = "20240527_rag"
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ("ix_messages_dialog_id_created_at", "messages", ["dialog_id", "created_at"]),
+    ("ix_dialogs_status_last_message_at", "dialogs", ["status", "last_message_at"]),
+    ("ix_audit_logs_created_at", "audit_logs", ["created_at"]),
+    ("ix_audit_logs_admin_id", "audit_logs", ["admin_id"]),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY нельзя выполнять внутри транзакции.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _columns in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,74 @@
+"""Full-text search over messages
+
+Revision ID: 20240610_messages_fts
+Revises: 20240603_hot_path_indexes
+Create Date: 2024-06-10 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "20240610_messages_fts"
+down_revision = "20240603_hot_path_indexes"
+branch_labels = None
+depends_on = None
+
+
+SEARCH_VECTOR_EXPR = (
+    "setweight(to_tsvector('russian', coalesce({row}.content, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce({row}.content, '')), 'B')"
+)
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.add_column("messages", sa.Column("search_vector", postgresql.TSVECTOR(), nullable=True))
+
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION messages_search_vector_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.search_vector := {SEARCH_VECTOR_EXPR.format(row="NEW")};
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER messages_search_vector_trg
+        BEFORE INSERT OR UPDATE OF content ON messages
+        FOR EACH ROW EXECUTE FUNCTION messages_search_vector_update()
+        """
+    )
+    op.execute(f"UPDATE messages SET search_vector = {SEARCH_VECTOR_EXPR.format(row='messages')}")
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_messages_search_vector",
+            "messages",
+            ["search_vector"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_messages_content_trgm",
+            "messages",
+            ["content"],
+            postgresql_using="gin",
+            postgresql_ops={"content": "gin_trgm_ops"},
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_messages_content_trgm", table_name="messages", postgresql_concurrently=True, if_exists=True)
+        op.drop_index("ix_messages_search_vector", table_name="messages", postgresql_concurrently=True, if_exists=True)
+    op.execute("DROP TRIGGER IF EXISTS messages_search_vector_trg ON messages")
+    op.execute("DROP FUNCTION IF EXISTS messages_search_vector_update()")
+    op.drop_column("messages", "search_vector")
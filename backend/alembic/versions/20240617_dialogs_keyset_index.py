@@ -0,0 +1,35 @@
+"""Keyset pagination index for the dialog inbox
+
+Revision ID: 20240617_dialogs_keyset_index
+Revises: 20240610_messages_fts
+Create Date: 2024-06-17 00:00:00.000000
+"""
+
+from alembic import op
+
+
+revision = "20240617_dialogs_keyset_index"
+down_revision = "20240610_messages_fts"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_dialogs_last_message_at_id",
+            "dialogs",
+            ["last_message_at", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_dialogs_last_message_at_id",
+            table_name="dialogs",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
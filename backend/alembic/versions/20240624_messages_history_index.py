@@ -0,0 +1,35 @@
+"""Index for paginated message history
+
+Revision ID: 20240624_messages_history_index
+Revises: 20240617_dialogs_keyset_index
+Create Date: 2024-06-24 00:00:00.000000
+"""
+
+from alembic import op
+
+
+revision = "20240624_messages_history_index"
+down_revision = "20240617_dialogs_keyset_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_messages_dialog_id_id",
+            "messages",
+            ["dialog_id", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_messages_dialog_id_id",
+            table_name="messages",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
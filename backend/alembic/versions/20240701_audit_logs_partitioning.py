@@ -0,0 +1,115 @@
+"""Monthly range partitioning of audit_logs
+
+Revision ID: 20240701_audit_logs_partitioning
+Revises: 20240624_messages_history_index
+Create Date: 2024-07-01 00:00:00.000000
+"""
+
+from alembic import op
+
+
+revision = "20240701_audit_logs_partitioning"
+down_revision = "20240624_messages_history_index"
+branch_labels = None
+depends_on = None
+
+PARTITIONS_AHEAD = 2
+
+# Секции по календарным месяцам в UTC: audit_logs_yYYYYmMM. Default-секция
+# страхует вставку, если обслуживание не успело создать секцию заранее.
+CREATE_MONTH_PARTITIONS = f"""
+DO $$
+DECLARE
+    first_month timestamp;
+    last_month timestamp;
+    month timestamp;
+BEGIN
+    SELECT date_trunc('month', min(coalesce(created_at, now())) AT TIME ZONE 'UTC')
+      INTO first_month
+      FROM audit_logs_legacy;
+    last_month := date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{PARTITIONS_AHEAD} months';
+    month := first_month;
+    WHILE month <= last_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF audit_logs FOR VALUES FROM (%L) TO (%L)',
+            'audit_logs_y' || to_char(month, 'YYYY') || 'm' || to_char(month, 'MM'),
+            month::text || '+00',
+            (month + interval '1 month')::text || '+00'
+        );
+        month := month + interval '1 month';
+    END LOOP;
+END
+$$;
+"""
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_legacy")
+    op.execute("ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE")
+    op.execute("DROP INDEX IF EXISTS ix_audit_logs_created_at")
+    op.execute("DROP INDEX IF EXISTS ix_audit_logs_admin_id")
+
+    # Ключ секционирования обязан входить в первичный ключ.
+    op.execute(
+        """
+        CREATE TABLE audit_logs (
+            id integer NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+            admin_id integer REFERENCES admins (id),
+            action varchar(128) NOT NULL,
+            params json,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            CONSTRAINT audit_logs_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+    op.execute(CREATE_MONTH_PARTITIONS)
+    op.execute("CREATE TABLE audit_logs_default PARTITION OF audit_logs DEFAULT")
+
+    # В старой таблице created_at мог быть NULL, а в новой он входит в ключ.
+    op.execute(
+        """
+        INSERT INTO audit_logs (id, admin_id, action, params, created_at)
+        SELECT id, admin_id, action, params, coalesce(created_at, now()) FROM audit_logs_legacy
+        """
+    )
+    op.execute("DROP TABLE audit_logs_legacy")
+
+    op.create_index("ix_audit_logs_created_at", "audit_logs", ["created_at"])
+    op.create_index("ix_audit_logs_admin_id_created_at", "audit_logs", ["admin_id", "created_at"])
+    op.create_index("ix_audit_logs_action_created_at", "audit_logs", ["action", "created_at"])
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE audit_logs RENAME TO audit_logs_partitioned")
+    op.execute("ALTER TABLE audit_logs_partitioned RENAME CONSTRAINT audit_logs_pkey TO audit_logs_partitioned_pkey")
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY NONE")
+    op.execute("DROP INDEX IF EXISTS ix_audit_logs_created_at")
+    op.execute("DROP INDEX IF EXISTS ix_audit_logs_admin_id_created_at")
+    op.execute("DROP INDEX IF EXISTS ix_audit_logs_action_created_at")
+
+    op.execute(
+        """
+        CREATE TABLE audit_logs (
+            id integer NOT NULL DEFAULT nextval('audit_logs_id_seq'),
+            admin_id integer REFERENCES admins (id),
+            action varchar(128) NOT NULL,
+            params json,
+            created_at timestamptz NOT NULL DEFAULT now(),
+            CONSTRAINT audit_logs_pkey PRIMARY KEY (id)
+        )
+        """
+    )
+    op.execute("ALTER SEQUENCE audit_logs_id_seq OWNED BY audit_logs.id")
+    # В старой таблице created_at мог быть NULL, а в новой он входит в ключ.
+    op.execute(
+        """
+        INSERT INTO audit_logs (id, admin_id, action, params, created_at)
+        SELECT id, admin_id, action, params, created_at FROM audit_logs_partitioned
+        """
+    )
+    op.execute("DROP TABLE audit_logs_partitioned")
+
+    op.create_index("ix_audit_logs_created_at", "audit_logs", ["created_at"])
+    op.create_index("ix_audit_logs_admin_id", "audit_logs", ["admin_id"])
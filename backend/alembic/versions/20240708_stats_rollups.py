@@ -0,0 +1,84 @@
+"""Hourly stats rollups
+
+Revision ID: 20240708_stats_rollups
+Revises: 20240701_audit_logs_partitioning
+Create Date: 2024-07-08 00:00:00.000000
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "20240708_stats_rollups"
+down_revision = "20240701_audit_logs_partitioning"
+branch_labels = None
+depends_on = None
+
+COUNTERS = (
+    "messages_user",
+    "messages_ai",
+    "messages_admin",
+    "ai_fallback",
+    "ai_used_rag",
+    "ai_during_operator_wait",
+    "dialogs_created",
+    "escalations",
+    "first_response_count",
+    "first_response_within_sla",
+    "handle_count",
+)
+SUM_COUNTERS = ("first_response_seconds_sum", "handle_seconds_sum")
+
+
+def upgrade() -> None:
+    op.create_table(
+        "stats_hourly",
+        sa.Column("bucket_start", sa.DateTime(timezone=True), primary_key=True),
+        sa.Column("shard", sa.SmallInteger(), primary_key=True, server_default="0"),
+        *(sa.Column(name, sa.Integer(), nullable=False, server_default="0") for name in COUNTERS),
+        *(sa.Column(name, sa.BigInteger(), nullable=False, server_default="0") for name in SUM_COUNTERS),
+    )
+    op.add_column("dialogs", sa.Column("waiting_operator_since", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("dialogs", sa.Column("operator_session_started_at", sa.DateTime(timezone=True), nullable=True))
+
+    # Счётчики сообщений и новых диалогов восстанавливаются по истории;
+    # время первого ответа и обработки копится только с этого момента.
+    op.execute(
+        """
+        INSERT INTO stats_hourly (
+            bucket_start, shard, messages_user, messages_ai, messages_admin,
+            ai_fallback, ai_used_rag, ai_during_operator_wait, dialogs_created
+        )
+        SELECT bucket_start, 0,
+               sum(messages_user), sum(messages_ai), sum(messages_admin),
+               sum(ai_fallback), sum(ai_used_rag), sum(ai_during_operator_wait), sum(dialogs_created)
+        FROM (
+            SELECT date_trunc('hour', created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' AS bucket_start,
+                   count(*) FILTER (WHERE role = 'USER') AS messages_user,
+                   count(*) FILTER (WHERE role = 'AI') AS messages_ai,
+                   count(*) FILTER (WHERE role = 'ADMIN') AS messages_admin,
+                   count(*) FILTER (WHERE role = 'AI' AND is_fallback) AS ai_fallback,
+                   count(*) FILTER (WHERE role = 'AI' AND used_rag) AS ai_used_rag,
+                   count(*) FILTER (WHERE role = 'AI' AND ai_reply_during_operator_wait) AS ai_during_operator_wait,
+                   0 AS dialogs_created
+            FROM messages
+            WHERE created_at IS NOT NULL
+            GROUP BY 1
+            UNION ALL
+            SELECT date_trunc('hour', created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC', 0, 0, 0, 0, 0, 0, count(*)
+            FROM dialogs
+            WHERE created_at IS NOT NULL
+            GROUP BY 1
+        ) AS history
+        GROUP BY bucket_start
+        """
+    )
+    op.execute(
+        "UPDATE dialogs SET waiting_operator_since = last_message_at WHERE status = 'WAIT_OPERATOR'"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("dialogs", "operator_session_started_at")
+    op.drop_column("dialogs", "waiting_operator_since")
+    op.drop_table("stats_hourly")
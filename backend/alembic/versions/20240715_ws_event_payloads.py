@@ -0,0 +1,31 @@
+"""Overflow table for cross-worker WebSocket events
+
+Revision ID: 20240715_ws_event_payloads
+Revises: 20240708_stats_rollups
+Create Date: 2024-07-15 00:00:00.000000
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "20240715_ws_event_payloads"
+down_revision = "20240708_stats_rollups"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "ws_event_payloads",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("channel", sa.String(length=128), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index("ix_ws_event_payloads_created_at", "ws_event_payloads", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_ws_event_payloads_created_at", table_name="ws_event_payloads")
+    op.drop_table("ws_event_payloads")
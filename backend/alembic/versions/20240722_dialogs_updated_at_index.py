@@ -0,0 +1,35 @@
+"""Index on dialogs.updated_at for inbox delta sync
+
+Revision ID: 20240722_dialogs_updated_at_index
+Revises: 20240715_ws_event_payloads
+Create Date: 2024-07-22 00:00:00.000000
+"""
+
+from alembic import op
+
+
+revision = "20240722_dialogs_updated_at_index"
+down_revision = "20240715_ws_event_payloads"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_dialogs_updated_at_id",
+            "dialogs",
+            ["updated_at", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_dialogs_updated_at_id",
+            table_name="dialogs",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,35 @@
+"""Background ingestion state for knowledge files
+
+Revision ID: 20240729_knowledge_ingestion_status
+Revises: 20240722_dialogs_updated_at_index
+Create Date: 2024-07-29 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20240729_knowledge_ingestion_status"
+down_revision = "20240722_dialogs_updated_at_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Уже загруженные файлы обработаны синхронно, поэтому по умолчанию — ready.
+    op.add_column(
+        "knowledge_files",
+        sa.Column("status", sa.String(length=16), server_default="ready", nullable=False),
+    )
+    op.add_column(
+        "knowledge_files",
+        sa.Column("embedded_chunks", sa.Integer(), server_default=sa.text("0"), nullable=False),
+    )
+    op.add_column("knowledge_files", sa.Column("error_message", sa.Text(), nullable=True))
+    op.execute("UPDATE knowledge_files SET embedded_chunks = total_chunks")
+
+
+def downgrade() -> None:
+    op.drop_column("knowledge_files", "error_message")
+    op.drop_column("knowledge_files", "embedded_chunks")
+    op.drop_column("knowledge_files", "status")
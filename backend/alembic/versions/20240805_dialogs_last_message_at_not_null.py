@@ -0,0 +1,33 @@
+"""Make dialogs.last_message_at NOT NULL for keyset pagination
+
+Revision ID: 20240805_dialogs_last_message_at_not_null
+Revises: 20240729_knowledge_ingestion_status
+Create Date: 2024-08-05 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "20240805_dialogs_last_message_at_not_null"
+down_revision = "20240729_knowledge_ingestion_status"
+branch_labels = None
+depends_on = None
+
+_CHECK = "ck_dialogs_last_message_at_not_null"
+
+
+def upgrade() -> None:
+    op.execute(
+        "UPDATE dialogs SET last_message_at = COALESCE(created_at, NOW()) WHERE last_message_at IS NULL"
+    )
+    # Проверка NOT VALID + VALIDATE не держит эксклюзивную блокировку на время
+    # сканирования, а SET NOT NULL затем опирается на неё и таблицу не читает.
+    op.execute(f"ALTER TABLE dialogs ADD CONSTRAINT {_CHECK} CHECK (last_message_at IS NOT NULL) NOT VALID")
+    op.execute(f"ALTER TABLE dialogs VALIDATE CONSTRAINT {_CHECK}")
+    op.alter_column("dialogs", "last_message_at", existing_type=sa.DateTime(timezone=True), nullable=False)
+    op.execute(f"ALTER TABLE dialogs DROP CONSTRAINT {_CHECK}")
+
+
+def downgrade() -> None:
+    op.alter_column("dialogs", "last_message_at", existing_type=sa.DateTime(timezone=True), nullable=True)
@@ -0,0 +1,58 @@
+"""Daily and monthly stats rollups
+
+Revision ID: 20240812_stats_daily_monthly
+Revises: 20240805_dialogs_last_message_at_not_null
+Create Date: 2024-08-12 00:00:00.000000
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+
+revision = "20240812_stats_daily_monthly"
+down_revision = "20240805_dialogs_last_message_at_not_null"
+branch_labels = None
+depends_on = None
+
+COUNTERS = (
+    "messages_user",
+    "messages_ai",
+    "messages_admin",
+    "ai_fallback",
+    "ai_used_rag",
+    "ai_during_operator_wait",
+    "dialogs_created",
+    "escalations",
+    "first_response_count",
+    "first_response_within_sla",
+    "handle_count",
+)
+SUM_COUNTERS = ("first_response_seconds_sum", "handle_seconds_sum")
+LEVELS = {"stats_daily": "day", "stats_monthly": "month"}
+
+
+def upgrade() -> None:
+    columns = ", ".join(COUNTERS + SUM_COUNTERS)
+    sums = ", ".join(f"sum({name})" for name in COUNTERS + SUM_COUNTERS)
+    for table, unit in LEVELS.items():
+        op.create_table(
+            table,
+            sa.Column("bucket_start", sa.DateTime(timezone=True), primary_key=True),
+            sa.Column("shard", sa.SmallInteger(), primary_key=True, server_default="0"),
+            *(sa.Column(name, sa.Integer(), nullable=False, server_default="0") for name in COUNTERS),
+            *(sa.Column(name, sa.BigInteger(), nullable=False, server_default="0") for name in SUM_COUNTERS),
+        )
+        # Свёртка накопленной почасовой истории в одну shard-строку на период.
+        op.execute(
+            f"""
+            INSERT INTO {table} (bucket_start, shard, {columns})
+            SELECT date_trunc('{unit}', bucket_start AT TIME ZONE 'UTC') AT TIME ZONE 'UTC', 0, {sums}
+            FROM stats_hourly
+            GROUP BY 1
+            """
+        )
+
+
+def downgrade() -> None:
+    for table in reversed(list(LEVELS)):
+        op.drop_table(table)
@@ -3,17 +3,17 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
-from app.core.db import get_db
+from app.core.db import get_db, get_read_db
 from app.models import Admin
 from app.schemas.admin import AdminCreate, AdminOut, AdminUpdate
 from app.services.audit import log_action
-from app.services.security import get_current_superadmin
+from app.services.security import get_current_superadmin, invalidate_admin_cache
 
 router = APIRouter(prefix="/admin", tags=["admins"])
 
 
 @router.get("/admins", response_model=list[AdminOut])
-def list_admins(db: Session = Depends(get_db), _current_admin: Admin = Depends(get_current_superadmin)):
+def list_admins(db: Session = Depends(get_read_db), _current_admin: Admin = Depends(get_current_superadmin)):
     admins = db.query(Admin).order_by(Admin.id.asc()).all()
     return [AdminOut.model_validate(admin) for admin in admins]
 
@@ -38,6 +38,7 @@ def create_admin(
     db.add(admin)
     db.commit()
     db.refresh(admin)
+    invalidate_admin_cache(admin.id)
 
     log_action(
         db,
@@ -66,6 +67,7 @@ def update_admin(
 
     db.commit()
     db.refresh(admin)
+    invalidate_admin_cache(admin.id)
 
     log_action(
         db,
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db import get_db
+from app.core.timeutils import as_utc
+from app.models import Admin, AuditLog
+from app.schemas.audit import AuditLogOut, AuditLogPage
+from app.services.pagination import decode_cursor, encode_cursor
+from app.services.security import get_current_superadmin
+
+router = APIRouter(prefix="/audit", tags=["audit"])
+
+
+def _encode_audit_cursor(log: AuditLog) -> str:
+    return encode_cursor([as_utc(log.created_at).isoformat(), log.id])
+
+
+def _decode_audit_cursor(cursor: str) -> tuple[datetime, int]:
+    raw_created_at, raw_id = decode_cursor(cursor, size=2)
+    try:
+        return as_utc(datetime.fromisoformat(raw_created_at)), int(raw_id)
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
+@router.get("", response_model=AuditLogPage)
+def list_audit_logs(
+    *,
+    db: Session = Depends(get_db),
+    _current_admin: Admin = Depends(get_current_superadmin),
+    admin_id: int | None = Query(default=None),
+    action: str | None = Query(default=None, min_length=1),
+    since: datetime | None = Query(default=None),
+    until: datetime | None = Query(default=None),
+    cursor: str | None = Query(default=None),
+    limit: int = Query(50, ge=1, le=200),
+) -> AuditLogPage:
+    """
+    Журнал действий администраторов, от новых к старым.
+
+    Интервал [since, until) всегда ограничен: без since берутся последние
+    AUDIT_QUERY_DEFAULT_DAYS дней до until. Благодаря этому PostgreSQL
+    отсекает лишние месячные секции audit_logs ещё при планировании.
+    Следующая страница запрашивается с cursor=<next_cursor>.
+    """
+    until = as_utc(until) if until else datetime.now(timezone.utc)
+    since = as_utc(since) if since else until - timedelta(days=settings.AUDIT_QUERY_DEFAULT_DAYS)
+    if since >= until:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="since must be earlier than until")
+
+    query = db.query(AuditLog).filter(AuditLog.created_at >= since, AuditLog.created_at < until)
+    if admin_id is not None:
+        query = query.filter(AuditLog.admin_id == admin_id)
+    if action:
+        query = query.filter(AuditLog.action == action)
+    if cursor:
+        created_at, last_id = _decode_audit_cursor(cursor)
+        query = query.filter(tuple_(AuditLog.created_at, AuditLog.id) < (created_at, last_id))
+
+    logs = query.order_by(AuditLog.created_at.desc(), AuditLog.id.desc()).limit(limit + 1).all()
+    has_next = len(logs) > limit
+    logs = logs[:limit]
+    return AuditLogPage(
+        items=[AuditLogOut.model_validate(log) for log in logs],
+        since=since,
+        until=until,
+        next_cursor=_encode_audit_cursor(logs[-1]) if has_next else None,
+    )
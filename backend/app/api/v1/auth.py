@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import secrets
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.core.db import get_db
+from app.core.timeutils import as_utc
 from app.models import Admin, PendingLogin
 from app.schemas.admin import AdminOut
 from app.schemas.auth import (
@@ -20,19 +23,20 @@ from app.schemas.auth import (
     TokenResponse,
 )
 from app.services.audit import log_action
+from app.services.login_waiters import get_login_waiters, publish_login_confirmed
 from app.services.security import (
     ACCESS_COOKIE_NAME,
+    PENDING_LOGIN_TTL,
     REFRESH_COOKIE_NAME,
     create_access_token,
     create_refresh_token,
     decode_token,
     get_current_admin,
+    invalidate_admin_cache,
 )
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-PENDING_LOGIN_TTL = timedelta(minutes=10)
-
 
 def _build_login_url(token: str) -> str | None:
     if settings.TELEGRAM_BOT_USERNAME:
@@ -85,7 +89,7 @@ def init_pending_login(request: Request, db: Session = Depends(get_db)):
     )
     db.commit()
 
-    expires_at = pending.created_at + PENDING_LOGIN_TTL
+    expires_at = as_utc(pending.created_at) + PENDING_LOGIN_TTL
     return PendingLoginInitResponse(token=token, login_url=_build_login_url(token), expires_at=expires_at)
 
 
@@ -97,13 +101,12 @@ def _get_pending_login(db: Session, token: str) -> PendingLogin:
 
 
 def _ensure_not_expired(pending: PendingLogin) -> None:
-    created = pending.created_at or datetime.now(timezone.utc)
+    created = as_utc(pending.created_at) or datetime.now(timezone.utc)
     if created + PENDING_LOGIN_TTL < datetime.now(timezone.utc):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Token expired")
 
 
-@router.get("/status", response_model=PendingLoginStatusResponse)
-def pending_login_status(token: str, db: Session = Depends(get_db)):
+def _pending_login_status(db: Session, token: str) -> PendingLoginStatusResponse:
     pending = _get_pending_login(db, token)
     try:
         _ensure_not_expired(pending)
@@ -125,6 +128,45 @@ def pending_login_status(token: str, db: Session = Depends(get_db)):
     )
 
 
+def _read_pending_login_status(db: Session, token: str) -> PendingLoginStatusResponse:
+    """Прочитать статус и сразу вернуть соединение в пул: дальше запрос будет ждать."""
+    try:
+        return _pending_login_status(db, token)
+    finally:
+        db.rollback()
+
+
+@router.get("/status", response_model=PendingLoginStatusResponse)
+def pending_login_status(token: str, db: Session = Depends(get_db)):
+    return _pending_login_status(db, token)
+
+
+@router.get("/status/wait", response_model=PendingLoginStatusResponse)
+async def wait_pending_login_status(
+    token: str,
+    timeout: float | None = Query(default=None, ge=0),
+    db: Session = Depends(get_db),
+):
+    """
+    Long-poll статуса входа: ответ приходит сразу после подтверждения в Telegram
+    или по истечении timeout со статусом "pending" — тогда клиент повторяет запрос.
+    """
+    wait_seconds = min(
+        settings.AUTH_STATUS_WAIT_MAX_SECONDS if timeout is None else timeout,
+        settings.AUTH_STATUS_WAIT_MAX_SECONDS,
+    )
+    # Подписка оформляется до чтения статуса, чтобы не пропустить подтверждение между ними.
+    async with get_login_waiters().subscribe(token) as confirmed:
+        result = await run_in_threadpool(_read_pending_login_status, db, token)
+        if result.status != "pending" or wait_seconds <= 0:
+            return result
+        try:
+            await asyncio.wait_for(confirmed, timeout=wait_seconds)
+        except asyncio.TimeoutError:
+            return result
+    return await run_in_threadpool(_read_pending_login_status, db, token)
+
+
 @router.post("/telegram_callback")
 def telegram_callback(
     payload: TelegramCallbackPayload,
@@ -154,8 +196,11 @@ def telegram_callback(
     pending.telegram_id = str(payload.telegram_id)
     pending.is_confirmed = True
     pending.confirmed_at = datetime.now(timezone.utc)
+    publish_login_confirmed(db, pending.token)
 
     db.commit()
+    invalidate_admin_cache(admin.id)
+    get_login_waiters().notify(pending.token)
 
     log_action(
         db,
@@ -3,94 +3,152 @@ from __future__ import annotations
 from datetime import datetime, timedelta, timezone
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy import select
+from sqlalchemy import func, select, tuple_
 from sqlalchemy.orm import Session, joinedload
 
-from app.core.db import get_db
+from app.core.config import settings
+from app.core.db import get_db, get_read_db
+from app.core.timeutils import as_utc
 from app.core.ws_manager import WebSocketManager, get_ws_manager
 from app.models import Admin, Dialog, DialogStatus, Message
 from app.schemas.dialog import (
     DialogAssignRequest,
     DialogDetail,
     DialogListResponse,
+    DialogSearchHit,
+    DialogSearchResponse,
     DialogShort,
     DialogSwitchAutoResponse,
+    InboxDelta,
+    InboxItem,
+    InboxSnapshot,
 )
-from app.schemas.message import MessageOut
+from app.schemas.message import MessageOut, MessagePage
 from app.services.audit import log_action
+from app.services.dialog_lock import DialogLockService
+from app.services.dialog_search import DialogSearchService
+from app.services.pagination import TotalMode, count_total, decode_cursor, encode_cursor
 from app.services.security import get_current_admin
-from app.services.ws_payloads import dialog_updated_payload
-
-LOCK_TIMEOUT = timedelta(minutes=5)
+from app.services.ws_payloads import dialog_events
 
 router = APIRouter(prefix="/dialogs", tags=["dialogs"])
 
 
-def _release_lock_if_expired(db: Session, dialog: Dialog) -> None:
-    """Если время блокировки истекло — снять блокировку."""
-    now = datetime.now(timezone.utc)
-    if dialog.is_locked and dialog.locked_until and dialog.locked_until < now:
-        dialog.is_locked = False
-        dialog.locked_by_admin_id = None
-        dialog.locked_until = None
-        log_action(
-            db,
-            admin_id=None,
-            action="dialog_unlocked",
-            params={"dialog_id": dialog.id},
-        )
-        db.commit()
-
-
 def _calc_waiting_time(dialog: Dialog) -> int | None:
     """Время ожидания в секундах с момента последнего сообщения."""
     if not dialog.last_message_at:
         return None
-    delta = datetime.now(timezone.utc) - dialog.last_message_at
+    delta = datetime.now(timezone.utc) - as_utc(dialog.last_message_at)
     return max(int(delta.total_seconds()), 0)
 
 
 def _dialog_to_short(dialog: Dialog) -> DialogShort:
     """Преобразование ORM-диалога в короткую схему списка."""
-    return DialogShort.model_validate(
-        dialog,
-        update={"waiting_time_seconds": _calc_waiting_time(dialog)},
-    )
+    update = {"waiting_time_seconds": _calc_waiting_time(dialog)}
+    if dialog.is_locked and dialog.locked_until and as_utc(dialog.locked_until) < datetime.now(timezone.utc):
+        # Протухшая блокировка показывается снятой, даже если в БД её ещё не сбросили.
+        update.update(is_locked=False, locked_until=None)
+    return DialogShort.model_validate(dialog).model_copy(update=update)
 
 
-def _dialog_to_detail(dialog: Dialog) -> DialogDetail:
-    """Преобразование ORM-диалога в детальную схему с сообщениями."""
-    messages = [MessageOut.model_validate(m) for m in sorted(dialog.messages, key=lambda m: m.created_at)]
-    return DialogDetail.model_validate(
-        dialog,
-        update={
-            "messages": messages,
-            "waiting_time_seconds": _calc_waiting_time(dialog),
-        },
+def _load_messages_page(
+    db: Session,
+    dialog_id: int,
+    *,
+    limit: int,
+    before_id: int | None = None,
+    after_id: int | None = None,
+) -> tuple[list[Message], bool]:
+    """
+    Страница сообщений диалога в хронологическом порядке по индексу (dialog_id, id).
+
+    Без курсоров — последние limit сообщений; before_id — более старые,
+    after_id — более новые. Второй элемент — есть ли ещё сообщения в ту же сторону.
+    """
+    query = db.query(Message).filter(Message.dialog_id == dialog_id)
+    if after_id is not None:
+        rows = query.filter(Message.id > after_id).order_by(Message.id.asc()).limit(limit + 1).all()
+        return rows[:limit], len(rows) > limit
+    if before_id is not None:
+        query = query.filter(Message.id < before_id)
+    rows = query.order_by(Message.id.desc()).limit(limit + 1).all()
+    return list(reversed(rows[:limit])), len(rows) > limit
+
+
+def _dialog_to_detail(db: Session, dialog: Dialog) -> DialogDetail:
+    """Преобразование ORM-диалога в детальную схему с последними сообщениями."""
+    messages, has_more = _load_messages_page(db, dialog.id, limit=settings.DIALOG_DETAIL_MESSAGES_LIMIT)
+    # Не model_validate(dialog): from_attributes прочитал бы dialog.messages целиком.
+    return DialogDetail(
+        **_dialog_to_short(dialog).model_dump(),
+        messages=[MessageOut.model_validate(m) for m in messages],
+        has_more_messages=has_more,
+        created_at=dialog.created_at,
+        updated_at=dialog.updated_at,
     )
 
 
+def _dialog_to_inbox_item(dialog: Dialog) -> InboxItem:
+    item = InboxItem.model_validate(dialog)
+    if item.is_locked and item.locked_until and as_utc(item.locked_until) < datetime.now(timezone.utc):
+        return item.model_copy(update={"is_locked": False, "locked_until": None})
+    return item
+
+
+def _encode_inbox_version(watermark: datetime | None) -> str:
+    watermark = as_utc(watermark)
+    return encode_cursor([watermark.isoformat() if watermark else None])
+
+
+def _decode_inbox_version(version: str) -> datetime | None:
+    (raw_watermark,) = decode_cursor(version, size=1)
+    if raw_watermark is None:
+        return None
+    try:
+        return as_utc(datetime.fromisoformat(raw_watermark))
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid version") from exc
+
+
 def _get_dialog(db: Session, dialog_id: int) -> Dialog:
-    """Получить диалог или 404, заодно проверить блокировку на протухание."""
+    """
+    Получить диалог (без сообщений) или 404.
+
+    Протухшие блокировки здесь не снимаются: это делает фоновая задача
+    release_expired_locks, а ответы API показывают их снятыми сразу.
+    """
     dialog = (
         db.query(Dialog)
-        .options(joinedload(Dialog.messages), joinedload(Dialog.assigned_admin))
+        .options(joinedload(Dialog.assigned_admin))
         .filter(Dialog.id == dialog_id)
         .first()
     )
     if not dialog:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dialog not found")
-    _release_lock_if_expired(db, dialog)
     return dialog
 
 
+def _encode_dialog_cursor(dialog: Dialog) -> str:
+    return encode_cursor([as_utc(dialog.last_message_at).isoformat(), dialog.id])
+
+
+def _decode_dialog_cursor(cursor: str) -> tuple[datetime, int]:
+    raw_last_message_at, raw_id = decode_cursor(cursor, size=2)
+    try:
+        return datetime.fromisoformat(raw_last_message_at), int(raw_id)
+    except (TypeError, ValueError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+
+
 @router.get("", response_model=DialogListResponse)
 def list_dialogs(
     *,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _current_admin: Admin = Depends(get_current_admin),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(default=None),
+    total_mode: TotalMode = Query(default=TotalMode.CACHED),
     status: DialogStatus | None = Query(default=None),
     assigned_admin_id: int | None = Query(default=None),
     search: str | None = Query(default=None, min_length=1),
@@ -106,47 +164,187 @@ def list_dialogs(
         "total": <всего_диалогов>,
         "has_next": <true|false>
     }
-    """
-    query = db.query(Dialog).options(joinedload(Dialog.assigned_admin))
 
+    Помимо page/per_page поддерживается keyset-пагинация: ответ содержит
+    next_cursor, и следующий запрос с cursor=<next_cursor> идёт по индексу
+    (last_message_at, id) без OFFSET (page при этом игнорируется).
+    total считается согласно total_mode: exact, cached (короткий TTL),
+    estimate (оценка планировщика) или none.
+    """
+    filters = []
     if status:
-        query = query.filter(Dialog.status == status)
+        filters.append(Dialog.status == status)
     if assigned_admin_id:
-        query = query.filter(Dialog.assigned_admin_id == assigned_admin_id)
+        filters.append(Dialog.assigned_admin_id == assigned_admin_id)
     if search:
-        subq = select(Message.dialog_id).where(Message.content.ilike(f"%{search}%"))
-        query = query.filter(Dialog.id.in_(subq))
-
-    total = query.count()
+        filters.append(Dialog.id.in_(DialogSearchService(db).matching_dialog_ids(search)))
 
-    dialogs = (
-        query.order_by(Dialog.last_message_at.desc())
-        .offset((page - 1) * per_page)
-        .limit(per_page)
-        .all()
+    query = (
+        db.query(Dialog)
+        .options(joinedload(Dialog.assigned_admin))
+        .filter(*filters)
+        .order_by(Dialog.last_message_at.desc(), Dialog.id.desc())
     )
+    if cursor:
+        last_message_at, last_id = _decode_dialog_cursor(cursor)
+        query = query.filter(tuple_(Dialog.last_message_at, Dialog.id) < (last_message_at, last_id))
+    else:
+        query = query.offset((page - 1) * per_page)
 
-    items = [_dialog_to_short(dialog) for dialog in dialogs]
-    has_next = page * per_page < total
+    # Лишняя строка отвечает на вопрос has_next без COUNT(*).
+    dialogs = query.limit(per_page + 1).all()
+    has_next = len(dialogs) > per_page
+    dialogs = dialogs[:per_page]
+
+    total, total_is_estimate = count_total(
+        db,
+        select(Dialog.id).where(*filters),
+        mode=total_mode,
+        cache_key=("dialogs", status, assigned_admin_id, search),
+    )
 
     return DialogListResponse(
-        items=items,
+        items=[_dialog_to_short(dialog) for dialog in dialogs],
         total=total,
-        page=page,
+        total_is_estimate=total_is_estimate,
+        page=None if cursor else page,
         per_page=per_page,
         has_next=has_next,
+        next_cursor=_encode_dialog_cursor(dialogs[-1]) if has_next and dialogs else None,
+    )
+
+
+@router.get("/inbox", response_model=InboxSnapshot)
+def inbox_snapshot(
+    db: Session = Depends(get_read_db),
+    _current_admin: Admin = Depends(get_current_admin),
+) -> InboxSnapshot:
+    """
+    Компактный снимок входящих: последние INBOX_SNAPSHOT_LIMIT диалогов и version.
+
+    Дальше клиент держит список актуальным событиями WebSocket, а после
+    разрыва забирает только изменения через /dialogs/inbox/changes?since=<version>.
+    """
+    # Метка читается до строк: изменения между двумя запросами придут в дельте повторно.
+    watermark = db.query(func.max(Dialog.updated_at)).scalar()
+    limit = settings.INBOX_SNAPSHOT_LIMIT
+    dialogs = (
+        db.query(Dialog)
+        .order_by(Dialog.last_message_at.desc(), Dialog.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+    return InboxSnapshot(
+        items=[_dialog_to_inbox_item(dialog) for dialog in dialogs[:limit]],
+        version=_encode_inbox_version(watermark),
+        truncated=len(dialogs) > limit,
+    )
+
+
+@router.get("/inbox/changes", response_model=InboxDelta)
+def inbox_changes(
+    since: str = Query(..., min_length=1),
+    db: Session = Depends(get_read_db),
+    _current_admin: Admin = Depends(get_current_admin),
+) -> InboxDelta:
+    """
+    Диалоги, изменённые после version из снимка или прошлой дельты.
+
+    Выборка идёт по индексу (updated_at, id) с перекрытием
+    INBOX_DELTA_OVERLAP_SECONDS, поэтому диалог может прийти повторно —
+    клиент применяет элементы идемпотентно. Если изменений больше
+    INBOX_DELTA_LIMIT, возвращается reset=true: дешевле взять новый снимок.
+    """
+    watermark = _decode_inbox_version(since)
+    limit = settings.INBOX_DELTA_LIMIT
+    query = db.query(Dialog)
+    if watermark is not None:
+        query = query.filter(Dialog.updated_at > watermark - timedelta(seconds=settings.INBOX_DELTA_OVERLAP_SECONDS))
+    dialogs = query.order_by(Dialog.updated_at.asc(), Dialog.id.asc()).limit(limit + 1).all()
+    if len(dialogs) > limit:
+        return InboxDelta(items=[], version=since, reset=True)
+    stamps = [as_utc(dialog.updated_at) for dialog in dialogs if dialog.updated_at is not None]
+    if watermark is not None:
+        stamps.append(watermark)
+    return InboxDelta(
+        items=[_dialog_to_inbox_item(dialog) for dialog in dialogs],
+        version=_encode_inbox_version(max(stamps, default=None)),
     )
 
 
+@router.get("/search", response_model=DialogSearchResponse)
+def search_dialogs(
+    *,
+    db: Session = Depends(get_read_db),
+    _current_admin: Admin = Depends(get_current_admin),
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    status: DialogStatus | None = Query(default=None),
+) -> DialogSearchResponse:
+    """
+    Ранжированный поиск диалогов по тексту сообщений.
+
+    Для каждого диалога возвращается число совпавших сообщений и фрагмент
+    последнего из них с подсветкой <mark>…</mark>.
+    """
+    hits, mode = DialogSearchService(db).search(q, limit=limit, status=status)
+    dialogs = {
+        dialog.id: dialog
+        for dialog in db.query(Dialog)
+        .options(joinedload(Dialog.assigned_admin))
+        .filter(Dialog.id.in_([hit.dialog_id for hit in hits]))
+        .all()
+    }
+    items = [
+        DialogSearchHit(
+            dialog=_dialog_to_short(dialogs[hit.dialog_id]),
+            message_id=hit.message_id,
+            rank=hit.rank,
+            match_count=hit.match_count,
+            snippet=hit.snippet,
+        )
+        for hit in hits
+        if hit.dialog_id in dialogs
+    ]
+    return DialogSearchResponse(items=items, query=q, mode=mode)
+
+
 @router.get("/{dialog_id}", response_model=DialogDetail)
 def get_dialog(
     dialog_id: int,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _current_admin: Admin = Depends(get_current_admin),
 ) -> DialogDetail:
     """Получить один диалог с сообщениями."""
     dialog = _get_dialog(db, dialog_id)
-    return _dialog_to_detail(dialog)
+    return _dialog_to_detail(db, dialog)
+
+
+@router.get("/{dialog_id}/messages", response_model=MessagePage)
+def list_dialog_messages(
+    dialog_id: int,
+    db: Session = Depends(get_db),
+    _current_admin: Admin = Depends(get_current_admin),
+    before_id: int | None = Query(default=None, ge=1),
+    after_id: int | None = Query(default=None, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+) -> MessagePage:
+    """История сообщений диалога постранично: before_id — старее, after_id — новее."""
+    if before_id is not None and after_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Use either before_id or after_id",
+        )
+    if not db.query(Dialog.id).filter(Dialog.id == dialog_id).first():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dialog not found")
+    messages, has_more = _load_messages_page(
+        db,
+        dialog_id,
+        limit=limit,
+        before_id=before_id,
+        after_id=after_id,
+    )
+    return MessagePage(items=[MessageOut.model_validate(m) for m in messages], has_more=has_more)
 
 
 @router.post("/{dialog_id}/assign", response_model=DialogDetail)
@@ -164,17 +362,6 @@ async def assign_dialog(
     - если диалог залочен другим админом и блокировка ещё актуальна — 409;
     - переназначать на другого админа может только суперадмин.
     """
-    dialog = _get_dialog(db, dialog_id)
-
-    now = datetime.now(timezone.utc)
-    if dialog.is_locked and dialog.locked_by_admin_id not in {None, current_admin.id}:
-        if dialog.locked_until and dialog.locked_until > now:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="Dialog locked by another admin",
-            )
-
-    target_admin_id = payload.admin_id or current_admin.id
     if payload.admin_id and payload.admin_id != current_admin.id:
         if not current_admin.is_superadmin:
             raise HTTPException(
@@ -190,12 +377,18 @@ async def assign_dialog(
     else:
         target_admin = current_admin
 
-    dialog.assigned_admin_id = target_admin.id
-    dialog.is_locked = True
-    dialog.locked_by_admin_id = target_admin.id
-    dialog.locked_until = now + LOCK_TIMEOUT
+    now = datetime.now(timezone.utc)
+    dialog = DialogLockService(db).acquire(
+        dialog_id,
+        admin_id=current_admin.id,
+        holder_id=target_admin.id,
+        now=now,
+        values={
+            "assigned_admin_id": target_admin.id,
+            "operator_session_started_at": func.coalesce(Dialog.operator_session_started_at, now),
+        },
+    )
 
-    db.commit()
     log_action(
         db,
         admin_id=current_admin.id,
@@ -204,8 +397,9 @@ async def assign_dialog(
         commit=True,
     )
     db.refresh(dialog)
-    await ws_manager.broadcast("dialogs", dialog_updated_payload(dialog))
-    return _dialog_to_detail(dialog)
+    for channel, event in dialog_events(dialog):
+        await ws_manager.broadcast(channel, event)
+    return _dialog_to_detail(db, dialog)
 
 
 @router.post("/{dialog_id}/switch_auto", response_model=DialogSwitchAutoResponse)
@@ -228,7 +422,6 @@ async def switch_to_auto(
     dialog.locked_by_admin_id = None
     dialog.locked_until = None
 
-    db.commit()
     log_action(
         db,
         admin_id=current_admin.id,
@@ -249,5 +442,6 @@ async def switch_to_auto(
         commit=True,
     )
 
-    await ws_manager.broadcast("dialogs", dialog_updated_payload(dialog))
+    for channel, event in dialog_events(dialog):
+        await ws_manager.broadcast(channel, event)
     return DialogSwitchAutoResponse(dialog_id=dialog.id, status=dialog.status)
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends
+
+from app.core.config import settings
+from app.core.db import engine, pool_metrics
+from app.core.ws_manager import WebSocketManager, get_ws_manager
+from app.models import Admin
+from app.services.security import get_current_superadmin
+
+router = APIRouter(prefix="/internal", tags=["system"])
+
+
+@router.get("/db/pool")
+def db_pool_stats(_current_admin: Admin = Depends(get_current_superadmin)) -> dict:
+    """Состояние пула соединений текущего воркера: занятость, overflow, ожидание."""
+    stats = pool_metrics.snapshot(engine.pool)
+    stats["config"] = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    return stats
+
+
+@router.get("/ws")
+def websocket_stats(
+    _current_admin: Admin = Depends(get_current_superadmin),
+    manager: WebSocketManager = Depends(get_ws_manager),
+) -> dict:
+    """WebSocket-соединения текущего воркера: подписчики каналов, задержка отправки, потери."""
+    stats = manager.stats()
+    stats["config"] = {
+        "heartbeat_interval": manager.heartbeat_interval,
+        "idle_timeout": manager.idle_timeout,
+        "max_per_admin": manager.max_per_admin,
+        "queue_size": manager.queue_size,
+        "send_timeout": manager.send_timeout,
+    }
+    return stats
@@ -6,12 +6,13 @@ from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 
-from app.core.db import get_db
+from app.core.db import get_db, get_read_db
 from app.core.ws_manager import WebSocketManager, get_ws_manager
 from app.models import Admin, KnowledgeFile
 from app.schemas.knowledge_file import KnowledgeFileOut
 from app.services.audit import log_action
 from app.services.knowledge_base import KnowledgeBaseService
+from app.services.knowledge_ingestion import KnowledgeIngestion, get_knowledge_ingestion
 from app.services.security import get_current_admin
 from app.services.ws_payloads import knowledge_file_payload
 
@@ -27,19 +28,20 @@ def _get_file(db: Session, file_id: int) -> KnowledgeFile:
 
 @router.get("/files", response_model=list[KnowledgeFileOut])
 def list_files(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     _admin: Admin = Depends(get_current_admin),
 ) -> list[KnowledgeFileOut]:
     files = db.query(KnowledgeFile).order_by(KnowledgeFile.created_at.desc()).all()
     return [KnowledgeFileOut.model_validate(file) for file in files]
 
 
-@router.post("/files", response_model=KnowledgeFileOut, status_code=status.HTTP_201_CREATED)
+@router.post("/files", response_model=KnowledgeFileOut, status_code=status.HTTP_202_ACCEPTED)
 async def upload_file(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
     admin: Admin = Depends(get_current_admin),
     ws_manager: WebSocketManager = Depends(get_ws_manager),
+    ingestion: KnowledgeIngestion = Depends(get_knowledge_ingestion),
 ) -> KnowledgeFileOut:
     service = KnowledgeBaseService(db)
     knowledge_file = await service.create_from_upload(file)
@@ -51,6 +53,8 @@ async def upload_file(
         commit=True,
     )
     await ws_manager.broadcast("system", knowledge_file_payload(knowledge_file, event="knowledge.uploaded"))
+    # Ответ уходит сразу со статусом queued; ход обработки — события knowledge.progress.
+    await ingestion.submit(knowledge_file.id)
     return KnowledgeFileOut.model_validate(knowledge_file)
 
 
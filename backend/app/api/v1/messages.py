@@ -1,30 +1,23 @@
 from __future__ import annotations
 
-from datetime import datetime, timedelta, timezone
+from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi import status
+from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
 from app.bot.utils import send_telegram_message
 from app.core.db import get_db
 from app.core.ws_manager import WebSocketManager, get_ws_manager
-from app.models import Admin, Dialog, DialogStatus, Message, MessageRole
+from app.models import Admin, DialogStatus, Message, MessageRole
 from app.schemas.message import MessageOut, MessageSendRequest
 from app.services.audit import log_action
+from app.services.dialog_lock import DialogLockService
 from app.services.security import get_current_admin
-from app.services.ws_payloads import dialog_updated_payload, message_created_payload
+from app.services.ws_payloads import dialog_events, message_events
 
 router = APIRouter(prefix="/messages", tags=["messages"])
 
 
-def _ensure_dialog(db: Session, dialog_id: int) -> Dialog:
-    dialog = db.query(Dialog).filter(Dialog.id == dialog_id).first()
-    if not dialog:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dialog not found")
-    return dialog
-
-
 @router.post("/send", response_model=MessageOut)
 async def send_message(
     payload: MessageSendRequest,
@@ -32,20 +25,23 @@ async def send_message(
     current_admin: Admin = Depends(get_current_admin),
     ws_manager: WebSocketManager = Depends(get_ws_manager),
 ):
-    dialog = _ensure_dialog(db, payload.dialog_id)
-
     now = datetime.now(timezone.utc)
-    if dialog.is_locked and dialog.locked_by_admin_id not in {None, current_admin.id}:
-        if dialog.locked_until and dialog.locked_until > now:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Dialog locked by another admin")
-
-    if dialog.assigned_admin_id not in {None, current_admin.id} and not current_admin.is_superadmin:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Dialog assigned to another admin")
-
-    dialog.assigned_admin_id = current_admin.id
-    dialog.is_locked = True
-    dialog.locked_by_admin_id = current_admin.id
-    dialog.locked_until = now + timedelta(minutes=5)
+    # Проверка блокировки/назначения и захват диалога — один UPDATE ... RETURNING.
+    # Оператор получает 409 на чужой актуальной блокировке и 403 на диалоге,
+    # назначенном другому; суперадмин отвечает в любой диалог и забирает блокировку.
+    dialog = DialogLockService(db).acquire(
+        payload.dialog_id,
+        admin_id=current_admin.id,
+        force=current_admin.is_superadmin,
+        require_assignment=not current_admin.is_superadmin,
+        now=now,
+        values={
+            "assigned_admin_id": current_admin.id,
+            "status": DialogStatus.WAIT_USER,
+            "last_message_at": now,
+            "unread_messages_count": 0,
+        },
+    )
 
     message = Message(
         dialog_id=dialog.id,
@@ -55,14 +51,7 @@ async def send_message(
         content=payload.content,
     )
     db.add(message)
-
-    dialog.status = DialogStatus.WAIT_USER
-    dialog.last_message_at = now
-    dialog.unread_messages_count = 0
-
-    db.commit()
-    db.refresh(message)
-    db.refresh(dialog)
+    db.flush()
 
     log_action(
         db,
@@ -77,6 +66,8 @@ async def send_message(
         params={"dialog_id": dialog.id, "status": dialog.status},
         commit=True,
     )
+    db.refresh(message)
+    db.refresh(dialog)
 
     if dialog.telegram_user_id:
         try:
@@ -85,7 +76,7 @@ async def send_message(
             # Не прерываем ответ оператору, если Telegram временно недоступен
             pass
 
-    await ws_manager.broadcast("messages", message_created_payload(message))
-    await ws_manager.broadcast("dialogs", dialog_updated_payload(dialog))
+    for channel, event in [*message_events(message, dialog), *dialog_events(dialog)]:
+        await ws_manager.broadcast(channel, event)
 
     return MessageOut.model_validate(message)
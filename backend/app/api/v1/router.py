@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.v1 import admins, ai_instructions, auth, dialogs, knowledge, messages, ws
+from app.api.v1 import admins, ai_instructions, audit, auth, dialogs, internal, knowledge, messages, stats, ws
 
 router = APIRouter()
 
@@ -11,6 +11,9 @@ router.include_router(admins.router)
 router.include_router(knowledge.router)
 router.include_router(ai_instructions.router)
 router.include_router(ws.router)
+router.include_router(audit.router)
+router.include_router(stats.router)
+router.include_router(internal.router)
 
 
 @router.get("/ping", tags=["system"])
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db import get_read_db
+from app.core.timeutils import as_utc
+from app.models import Admin
+from app.schemas.stats import (
+    AiReplies,
+    DurationStats,
+    FirstResponseStats,
+    MessagesByRole,
+    SlaPoint,
+    StatsOverview,
+    StatsSla,
+)
+from app.services.security import get_current_admin
+from app.services.stats import StatsService
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+
+def _period(date_from: datetime | None, date_to: datetime | None, default: timedelta) -> tuple[datetime, datetime]:
+    date_to = as_utc(date_to) if date_to else datetime.now(timezone.utc)
+    date_from = as_utc(date_from) if date_from else date_to - default
+    if date_from >= date_to:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="date_from must be earlier than date_to")
+    return date_from, date_to
+
+
+def _avg(total: int, count: int) -> float | None:
+    return round(total / count, 1) if count else None
+
+
+def _first_response(counters: dict[str, int]) -> FirstResponseStats:
+    count = counters["first_response_count"]
+    return FirstResponseStats(
+        count=count,
+        avg_seconds=_avg(counters["first_response_seconds_sum"], count),
+        within_sla=counters["first_response_within_sla"],
+        sla_ratio=round(counters["first_response_within_sla"] / count, 4) if count else None,
+    )
+
+
+def _handle_time(counters: dict[str, int]) -> DurationStats:
+    return DurationStats(
+        count=counters["handle_count"],
+        avg_seconds=_avg(counters["handle_seconds_sum"], counters["handle_count"]),
+    )
+
+
+@router.get("/overview", response_model=StatsOverview)
+def stats_overview(
+    *,
+    db: Session = Depends(get_read_db),
+    _current_admin: Admin = Depends(get_current_admin),
+    date_from: datetime | None = Query(default=None),
+    date_to: datetime | None = Query(default=None),
+) -> StatsOverview:
+    """
+    Сводка за период (по умолчанию — последние сутки).
+
+    Считается по свёрнутым счётчикам: целые месяцы и сутки берутся из
+    stats_monthly/stats_daily, края периода — из stats_hourly, поэтому
+    стоимость запроса почти не зависит ни от длины периода, ни от объёма
+    сообщений. Границы округляются до часа.
+    """
+    date_from, date_to = _period(date_from, date_to, timedelta(days=1))
+    counters = StatsService(db).totals(date_from, date_to)
+    return StatsOverview(
+        date_from=date_from,
+        date_to=date_to,
+        messages=MessagesByRole(
+            user=counters["messages_user"],
+            ai=counters["messages_ai"],
+            admin=counters["messages_admin"],
+        ),
+        ai=AiReplies(
+            total=counters["messages_ai"],
+            fallback=counters["ai_fallback"],
+            used_rag=counters["ai_used_rag"],
+            during_operator_wait=counters["ai_during_operator_wait"],
+        ),
+        dialogs_created=counters["dialogs_created"],
+        escalations=counters["escalations"],
+        first_response=_first_response(counters),
+        handle_time=_handle_time(counters),
+    )
+
+
+@router.get("/sla", response_model=StatsSla)
+def stats_sla(
+    *,
+    db: Session = Depends(get_read_db),
+    _current_admin: Admin = Depends(get_current_admin),
+    date_from: datetime | None = Query(default=None),
+    date_to: datetime | None = Query(default=None),
+    granularity: Literal["hour", "day"] = Query(default="hour"),
+) -> StatsSla:
+    """Ряд SLA по часам или дням: первый ответ оператора и время обработки."""
+    date_from, date_to = _period(date_from, date_to, timedelta(days=7))
+    series = StatsService(db).series(date_from, date_to, granularity=granularity)
+    return StatsSla(
+        date_from=date_from,
+        date_to=date_to,
+        granularity=granularity,
+        sla_target_seconds=settings.STATS_SLA_TARGET_SECONDS,
+        items=[
+            SlaPoint(
+                bucket_start=bucket,
+                first_response=_first_response(counters),
+                handle_time=_handle_time(counters),
+                escalations=counters["escalations"],
+            )
+            for bucket, counters in series
+        ],
+    )
@@ -1,39 +1,194 @@
 from __future__ import annotations
 
+import asyncio
+import time
+from typing import Any, AsyncIterator, Iterable
+
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, status
 from fastapi.websockets import WebSocketDisconnect
-from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 
-from app.core.db import get_db
-from app.core.ws_manager import WebSocketManager, get_ws_manager
-from app.services.security import ACCESS_COOKIE_NAME, verify_token
+from app.core.db import SessionLocal
+from app.core.json_codec import loads
+from app.core.ws_manager import HEARTBEAT, WebSocketManager, get_ws_manager
+from app.models import Admin
+from app.services.security import ACCESS_COOKIE_NAME, decode_token, get_cached_admin, verify_token
 
 router = APIRouter(prefix="/events", tags=["events"])
 
+CHANNELS = frozenset({"dialogs", "messages", "operators", "system"})
+CONTROL_ACTIONS = frozenset({"subscribe", "unsubscribe"})
+DIALOG_TOPIC_PREFIX = "dialog:"
+ASSIGNED_TOPIC_PREFIX = "assigned:"
+
+
+def _topic_id(channel: str, prefix: str) -> int | None:
+    suffix = channel[len(prefix) :]
+    return int(suffix) if channel.startswith(prefix) and suffix.isdigit() else None
+
+
+def channel_allowed(channel: str, admin: Admin) -> bool:
+    """
+    Доступен ли канал администратору.
+
+    Кроме общих каналов это топики dialog:<id> (полные сообщения открытого
+    диалога) и assigned:<admin_id> — только свой, суперадмину любой.
+    """
+    if channel in CHANNELS or _topic_id(channel, DIALOG_TOPIC_PREFIX) is not None:
+        return True
+    assigned_id = _topic_id(channel, ASSIGNED_TOPIC_PREFIX)
+    return assigned_id is not None and (assigned_id == admin.id or bool(admin.is_superadmin))
+
+
+def _verify_token_in_short_session(token: str) -> Admin:
+    db = SessionLocal()
+    try:
+        return verify_token(token, db=db)
+    finally:
+        db.close()
+
+
+async def _authorize_websocket(websocket: WebSocket) -> Admin | None:
+    """
+    Проверить токен соединения.
 
-async def _authorize_websocket(websocket: WebSocket, db: Session) -> bool:
+    Сессия БД не живёт дольше проверки: администратор берётся из кэша
+    процесса, а при промахе загружается в короткой сессии в пуле потоков,
+    и соединение сразу возвращается в пул. Открытые сокеты пул не держат.
+    """
     token = websocket.query_params.get("token") or websocket.cookies.get(ACCESS_COOKIE_NAME)
     if not token:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Missing token")
-        return False
+        return None
     try:
-        verify_token(token, db=db)
+        payload = decode_token(token)
+        admin_id = payload.get("sub") if payload.get("type") == "access" else None
+        cached = get_cached_admin(int(admin_id)) if admin_id else None
+        if cached is not None and cached.is_active:
+            return cached
+        return await run_in_threadpool(_verify_token_in_short_session, token)
     except HTTPException as exc:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=exc.detail)
-        return False
-    return True
+        return None
+
+
+def _apply_subscription(
+    websocket: WebSocket,
+    action: str,
+    channels: Iterable[Any],
+    *,
+    admin: Admin,
+    manager: WebSocketManager,
+    since: int | None = None,
+    stream: str | None = None,
+) -> None:
+    """
+    Подписать/отписать соединение и ответить текущим набором каналов.
+
+    В ответе — поток и последний номер события; при since подписка сразу
+    досылает пропущенные события этих каналов (или resync.required).
+    """
+    requested = {channel for channel in channels if isinstance(channel, str) and channel}
+    allowed = {channel for channel in requested if channel_allowed(channel, admin)}
+    unknown = sorted(requested - allowed)
+    for channel in allowed:
+        if action == "subscribe":
+            manager.subscribe(websocket, channel)
+        else:
+            manager.unsubscribe(websocket, channel)
+    reply: dict[str, Any] = {
+        "event": "subscriptions",
+        "channels": sorted(manager.channels_of(websocket)),
+        "stream": manager.history.stream,
+        "seq": manager.history.seq,
+    }
+    if unknown:
+        reply["unknown"] = unknown
+    manager.send(websocket, reply)
+    if action == "subscribe" and since is not None:
+        manager.resume(websocket, allowed, since, stream=stream)
+
+
+def _parse_since(value: Any) -> int | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if value >= 0 else None
+    if isinstance(value, str) and value.isdigit():
+        return int(value)
+    return None
+
+
+def _handle_control_frame(
+    websocket: WebSocket,
+    frame: str,
+    *,
+    admin: Admin,
+    manager: WebSocketManager,
+) -> None:
+    try:
+        message = loads(frame)
+    except ValueError:
+        # Текстовые ping от клиента и прочий мусор игнорируются.
+        return
+    if not isinstance(message, dict) or message.get("action") not in CONTROL_ACTIONS:
+        manager.send(websocket, {"event": "error", "detail": "Unknown control frame"})
+        return
+    channels = message.get("channels")
+    if not isinstance(channels, list):
+        channels = [message.get("channel")]
+    stream = message.get("stream")
+    _apply_subscription(
+        websocket,
+        message["action"],
+        channels,
+        admin=admin,
+        manager=manager,
+        since=_parse_since(message.get("since")),
+        stream=stream if isinstance(stream, str) else None,
+    )
+
+
+async def _receive_frames(websocket: WebSocket, *, manager: WebSocketManager) -> AsyncIterator[str]:
+    """
+    Кадры клиента с серверным heartbeat.
+
+    Если клиент молчит heartbeat_interval, ему уходит {"event": "ping"}: запись
+    в мёртвое TCP-соединение упрётся в send_timeout писателя. Соединение, от
+    которого ничего не приходило idle_timeout, закрывается. Ожидание через
+    asyncio.wait, чтобы не отменять незавершённый receive.
+    """
+    last_seen = time.monotonic()
+    receive: asyncio.Task[str] = asyncio.ensure_future(websocket.receive_text())
+    try:
+        while True:
+            done, _ = await asyncio.wait({receive}, timeout=manager.heartbeat_interval)
+            if done:
+                frame = receive.result()
+                last_seen = time.monotonic()
+                receive = asyncio.ensure_future(websocket.receive_text())
+                yield frame
+                continue
+            if time.monotonic() - last_seen >= manager.idle_timeout:
+                manager.metrics.increment("idle_evictions_total")
+                manager.close(websocket, code=status.WS_1001_GOING_AWAY)
+                return
+            manager.send(websocket, HEARTBEAT)
+    finally:
+        receive.cancel()
 
 
 async def _subscribe(
     websocket: WebSocket,
     channel: str,
     *,
+    admin: Admin,
     manager: WebSocketManager,
 ) -> None:
-    await manager.connect(websocket, channel)
+    await manager.connect(websocket, channel, admin_id=admin.id)
     try:
-        while True:
-            await websocket.receive_text()
+        async for _ in _receive_frames(websocket, manager=manager):
+            pass
     except WebSocketDisconnect:
         pass
     finally:
@@ -43,46 +198,79 @@ async def _subscribe(
 async def _ws_endpoint(
     websocket: WebSocket,
     channel: str,
-    db: Session,
     manager: WebSocketManager,
 ) -> None:
-    authorized = await _authorize_websocket(websocket, db)
-    if not authorized:
+    admin = await _authorize_websocket(websocket)
+    if admin is None:
         return
-    await _subscribe(websocket, channel, manager=manager)
+    await _subscribe(websocket, channel, admin=admin, manager=manager)
+
+
+@router.websocket("")
+async def multiplexed_events(
+    websocket: WebSocket,
+    manager: WebSocketManager = Depends(get_ws_manager),
+) -> None:
+    """
+    Единый сокет событий: клиент управляет подписками кадрами
+    {"action": "subscribe" | "unsubscribe", "channels": [...]};
+    начальный набор можно передать в ?channels=dialogs,messages.
+    Помимо общих каналов доступны топики dialog:<id> и assigned:<admin_id>.
+    После переподключения клиент передаёт since=<seq> и stream из прошлого
+    ответа subscriptions (в кадре subscribe или в query) и получает только
+    пропущенные события.
+    """
+    admin = await _authorize_websocket(websocket)
+    if admin is None:
+        return
+    await manager.accept(websocket, admin_id=admin.id)
+    try:
+        initial = websocket.query_params.get("channels")
+        if initial:
+            _apply_subscription(
+                websocket,
+                "subscribe",
+                initial.split(","),
+                admin=admin,
+                manager=manager,
+                since=_parse_since(websocket.query_params.get("since")),
+                stream=websocket.query_params.get("stream"),
+            )
+        async for frame in _receive_frames(websocket, manager=manager):
+            _handle_control_frame(websocket, frame, admin=admin, manager=manager)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        manager.release(websocket)
 
 
 @router.websocket("/dialogs")
 async def dialogs_events(
     websocket: WebSocket,
-    db: Session = Depends(get_db),
     manager: WebSocketManager = Depends(get_ws_manager),
 ) -> None:
-    await _ws_endpoint(websocket, "dialogs", db, manager)
+    await _ws_endpoint(websocket, "dialogs", manager)
 
 
 @router.websocket("/messages")
 async def messages_events(
     websocket: WebSocket,
-    db: Session = Depends(get_db),
     manager: WebSocketManager = Depends(get_ws_manager),
 ) -> None:
-    await _ws_endpoint(websocket, "messages", db, manager)
+    await _ws_endpoint(websocket, "messages", manager)
 
 
 @router.websocket("/operators")
 async def operators_events(
     websocket: WebSocket,
-    db: Session = Depends(get_db),
     manager: WebSocketManager = Depends(get_ws_manager),
 ) -> None:
-    await _ws_endpoint(websocket, "operators", db, manager)
+    await _ws_endpoint(websocket, "operators", manager)
 
 
 @router.websocket("/system")
 async def system_events(
     websocket: WebSocket,
-    db: Session = Depends(get_db),
     manager: WebSocketManager = Depends(get_ws_manager),
 ) -> None:
-    await _ws_endpoint(websocket, "system", db, manager)
+    await _ws_endpoint(websocket, "system", manager)
@@ -10,8 +10,9 @@ from app.core.ws_manager import get_ws_manager
 from app.models import Dialog, DialogStatus, Message, MessageRole
 from app.services.ai_responder import AiReplyResult, FALLBACK_TEXT, generate_ai_reply
 from app.services.audit import log_action
+from app.services.dialog_lock import DialogLockService
 from app.services.rag_service import RAGService
-from app.services.ws_payloads import dialog_updated_payload, message_created_payload
+from app.services.ws_payloads import dialog_events, message_events
 
 OPERATOR_KEYWORDS = [
     "оператор",
@@ -21,20 +22,6 @@ OPERATOR_KEYWORDS = [
 ]
 
 
-def _release_lock_if_needed(db: Session, dialog: Dialog) -> None:
-    now = datetime.now(timezone.utc)
-    if dialog.is_locked and dialog.locked_until and dialog.locked_until < now:
-        dialog.is_locked = False
-        dialog.locked_by_admin_id = None
-        dialog.locked_until = None
-        log_action(
-            db,
-            admin_id=None,
-            action="dialog_unlocked",
-            params={"dialog_id": dialog.id},
-        )
-
-
 def _find_or_create_dialog(db: Session, telegram_user_id: int) -> Dialog:
     dialog = (
         db.query(Dialog)
@@ -43,7 +30,6 @@ def _find_or_create_dialog(db: Session, telegram_user_id: int) -> Dialog:
         .first()
     )
     if dialog:
-        _release_lock_if_needed(db, dialog)
         return dialog
 
     dialog = Dialog(telegram_user_id=telegram_user_id, status=DialogStatus.AUTO)
@@ -115,7 +101,7 @@ async def handle_update(update: dict, db: Session) -> None:
         else:
             ai_result = await generate_ai_reply(db, dialog=dialog, user_text=content)
 
-    events: list[tuple[str, dict]] = [("messages", message_created_payload(db_message))]
+    events: list[tuple[str, dict]] = message_events(db_message, dialog)
 
     if ai_result:
         metadata = None
@@ -145,9 +131,11 @@ async def handle_update(update: dict, db: Session) -> None:
             else:
                 dialog.status = DialogStatus.AUTO
                 dialog.unread_messages_count = 0
+                # Диалог снова ведёт AI — блокировка оператора больше не нужна.
+                DialogLockService(db).release(dialog.id)
 
         db.flush()
-        events.append(("messages", message_created_payload(ai_message)))
+        events.extend(message_events(ai_message, dialog))
 
         log_action(
             db,
@@ -175,6 +163,5 @@ async def handle_update(update: dict, db: Session) -> None:
 
     db.commit()
 
-    for channel, payload in events:
+    for channel, payload in [*events, *dialog_events(dialog)]:
         await ws_manager.broadcast(channel, payload)
-    await ws_manager.broadcast("dialogs", dialog_updated_payload(dialog))
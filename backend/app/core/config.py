@@ -19,10 +19,86 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = "gigaotvet"
     POSTGRES_PASSWORD: str = "change_me"
 
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # DSN реплик для read-only эндпоинтов; пусто — всё читается с primary.
+    DB_REPLICA_URLS: list[str] = []
+    DB_REPLICA_MAX_LAG_SECONDS: float = 5.0
+    DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS: float = 2.0
+    # Проверка отставания не должна держать запрос: таймаут подключения к реплике
+    # и statement_timeout самого запроса проверки.
+    DB_REPLICA_CONNECT_TIMEOUT_SECONDS: int = 2
+    DB_REPLICA_PROBE_TIMEOUT_MS: int = 500
+
+    LIST_COUNT_CACHE_TTL_SECONDS: float = 5.0
+    DIALOG_DETAIL_MESSAGES_LIMIT: int = 50
+    # Синхронизация входящих: снимок последних диалогов и дельта по updated_at.
+    # Перекрытие покрывает транзакции, закоммиченные позже снимка, но с более ранним now().
+    INBOX_SNAPSHOT_LIMIT: int = 1000
+    INBOX_DELTA_LIMIT: int = 500
+    INBOX_DELTA_OVERLAP_SECONDS: float = 5.0
+
+    AUDIT_BUFFER_ENABLED: bool = True
+    AUDIT_BUFFER_MAX_SIZE: int = 10000
+    AUDIT_BATCH_SIZE: int = 200
+    AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    # Столько раз повторяется пачка целиком, затем строки пишутся по одной.
+    AUDIT_FLUSH_MAX_RETRIES: int = 3
+    AUDIT_RETENTION_MONTHS: int = 12
+    AUDIT_ARCHIVE_DIR: str | None = None
+    AUDIT_PARTITIONS_AHEAD: int = 2
+    AUDIT_QUERY_DEFAULT_DAYS: int = 30
+
+    MAINTENANCE_ENABLED: bool = True
+    MAINTENANCE_TICK_SECONDS: float = 5.0
+    MAINTENANCE_INTERVAL_SECONDS: float = 15.0
+    MAINTENANCE_PENDING_LOGIN_GRACE_SECONDS: int = 3600
+    AUDIT_MAINTENANCE_INTERVAL_SECONDS: float = 3600.0
+
+    STATS_SLA_TARGET_SECONDS: int = 300
+    STATS_ROLLUP_SHARDS: int = 4
+
     JWT_SECRET: str = "change_me_secret_key"
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
     REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Кэш администраторов по id в памяти воркера; 0 — отключён.
+    ADMIN_CACHE_TTL_SECONDS: float = 30.0
+    ADMIN_CACHE_MAX_SIZE: int = 1024
+    # Кэш проверенных JWT (по sha256 токена), запись живёт до exp токена.
+    JWT_CACHE_MAX_SIZE: int = 4096
+    # Long-poll /auth/status/wait и LISTEN подтверждений входа между воркерами.
+    AUTH_STATUS_WAIT_MAX_SECONDS: float = 25.0
+    LOGIN_NOTIFY_LISTENER_ENABLED: bool = True
+
+    # Исходящая очередь каждого WebSocket; при переполнении — "resync" или "close".
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_SEND_TIMEOUT_SECONDS: float = 10.0
+    WS_OVERFLOW_POLICY: str = "resync"
+    # Шина событий между воркерами: "postgres" (LISTEN/NOTIFY) или "memory" (один процесс).
+    WS_EVENT_BUS: str = "postgres"
+    WS_EVENT_PAYLOAD_RETENTION_SECONDS: int = 300
+    # Публикация в шину идёт из фоновой задачи: очередь событий и число NOTIFY на транзакцию.
+    WS_EVENT_BUS_QUEUE_SIZE: int = 10000
+    WS_EVENT_BUS_BATCH_SIZE: int = 100
+    # Окно склейки dialog.updated по dialog_id; 0 — отправлять сразу.
+    WS_COALESCE_WINDOW_SECONDS: float = 0.05
+    # Буфер докачки: последние события каждого канала для since=<seq> после переподключения.
+    # Топики dialog:<id>/assigned:<id> хранят меньше; общий объём ограничен WS_REPLAY_MAX_BYTES.
+    WS_REPLAY_BUFFER_SIZE: int = 500
+    WS_REPLAY_TOPIC_BUFFER_SIZE: int = 20
+    WS_REPLAY_MAX_CHANNELS: int = 2048
+    WS_REPLAY_MAX_BYTES: int = 16 * 1024 * 1024
+    # Сервер шлёт {"event": "ping"} при тишине дольше интервала и закрывает сокет,
+    # от которого ничего не приходило WS_IDLE_TIMEOUT_SECONDS (клиент пингует раз в 20 с).
+    WS_HEARTBEAT_INTERVAL_SECONDS: float = 25.0
+    WS_IDLE_TIMEOUT_SECONDS: float = 75.0
+    # Сверх лимита закрывается самое старое соединение администратора; 0 — без лимита.
+    WS_MAX_CONNECTIONS_PER_ADMIN: int = 10
 
     TELEGRAM_BOT_TOKEN: str | None = None
     TELEGRAM_WEBHOOK_SECRET: str | None = None
@@ -38,6 +114,8 @@ class Settings(BaseSettings):
     KNOWLEDGE_FILES_DIR: str = "app_data/knowledge_files"
     KNOWLEDGE_MAX_FILE_SIZE_MB: int = 2
     KNOWLEDGE_TOTAL_STORAGE_MB: int = 10
+    KNOWLEDGE_EMBEDDING_BATCH_SIZE: int = 16
+    KNOWLEDGE_INGESTION_RESUME_ENABLED: bool = True
 
     RAG_MIN_CHUNK_SIZE: int = 500
     RAG_MAX_CHUNK_SIZE: int = 1500
@@ -1,7 +1,18 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, DeclarativeBase
+import itertools
+import logging
+import threading
+import time
+from typing import Callable
+
+from fastapi import Depends
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker, DeclarativeBase
 
 from app.core.config import settings
+from app.core.metrics import PoolMetrics
+
+logger = logging.getLogger(__name__)
 
 
 class Base(DeclarativeBase):
@@ -15,9 +26,135 @@ def _build_db_url() -> str:
     )
 
 
-engine = create_engine(_build_db_url(), echo=False, future=True)
+def _pool_options() -> dict:
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+pool_metrics = PoolMetrics()
+
+engine = create_engine(
+    _build_db_url(),
+    echo=False,
+    future=True,
+    poolclass=pool_metrics.pool_class(),
+    **_pool_options(),
+)
+pool_metrics.attach(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Отставание реплики в секундах; 0, если она успела применить весь полученный WAL.
+_PG_REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE extract(epoch FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+def probe_replica_lag(replica: Engine) -> float | None:
+    """Отставание реплики в секундах или None, если реплика недоступна."""
+    if replica.dialect.name != "postgresql":
+        return 0.0
+    try:
+        with replica.connect() as connection:
+            # SET LOCAL действует только до конца транзакции проверки.
+            connection.execute(text(f"SET LOCAL statement_timeout = {int(settings.DB_REPLICA_PROBE_TIMEOUT_MS)}"))
+            lag = connection.execute(_PG_REPLICA_LAG_SQL).scalar()
+    except Exception:
+        logger.warning("Replica %s is unavailable", replica.url.render_as_string(hide_password=True))
+        return None
+    return float(lag or 0.0)
+
+
+class ReplicaRouter:
+    """Выбор engine для read-only сессий.
+
+    Реплики перебираются по кругу; реплика, чьё отставание больше max_lag
+    (или которая не ответила), пропускается до следующей проверки. Если
+    подходящих реплик нет, чтение идёт с primary. Отставание кэшируется на
+    check_interval секунд, чтобы не спрашивать реплику на каждый запрос.
+    Реплику проверяет один запрос за раз; остальные, пока идёт проверка,
+    берут прежнее значение (а без него считают реплику недоступной).
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: list[Engine],
+        *,
+        max_lag: float,
+        check_interval: float,
+        lag_probe: Callable[[Engine], float | None] = probe_replica_lag,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.primary = primary
+        self.replicas = list(replicas)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+        self._clock = clock
+        self._lag: dict[int, tuple[float, float | None]] = {}
+        self._lock = threading.Lock()
+        self._probing: set[int] = set()
+        self._counter = itertools.count()
+
+    def lag(self, index: int) -> float | None:
+        now = self._clock()
+        with self._lock:
+            cached = self._lag.get(index)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+            if index in self._probing:
+                return cached[1] if cached is not None else None
+            self._probing.add(index)
+        try:
+            lag = self.lag_probe(self.replicas[index])
+        finally:
+            with self._lock:
+                self._probing.discard(index)
+        with self._lock:
+            self._lag[index] = (now + self.check_interval, lag)
+        return lag
+
+    def pick(self) -> Engine:
+        if not self.replicas:
+            return self.primary
+        start = next(self._counter)
+        for offset in range(len(self.replicas)):
+            index = (start + offset) % len(self.replicas)
+            lag = self.lag(index)
+            if lag is not None and lag <= self.max_lag:
+                return self.replicas[index]
+        return self.primary
+
+
+replica_router = ReplicaRouter(
+    engine,
+    [
+        create_engine(
+            url,
+            echo=False,
+            future=True,
+            connect_args={"connect_timeout": settings.DB_REPLICA_CONNECT_TIMEOUT_SECONDS},
+            **_pool_options(),
+        )
+        for url in settings.DB_REPLICA_URLS
+    ],
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.DB_REPLICA_LAG_CHECK_INTERVAL_SECONDS,
+)
+
+
+@event.listens_for(Session, "before_flush")
+def _forbid_replica_writes(session: Session, _flush_context, _instances) -> None:
+    if session.info.get("read_only") and (session.new or session.dirty or session.deleted):
+        raise RuntimeError("Attempt to write through a read-only replica session")
+
 
 def get_db():
     """DI-зависимость для FastAPI — сессия БД."""
@@ -26,3 +163,22 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db(db: Session = Depends(get_db)):
+    """
+    DI-зависимость для read-only эндпоинтов — сессия на реплике.
+
+    Без реплик (или если все отстают) возвращается обычная сессия запроса,
+    так что лишнее соединение с primary не открывается.
+    """
+    target = replica_router.pick()
+    if target is replica_router.primary:
+        yield db
+        return
+    replica_db = SessionLocal(bind=target)
+    replica_db.info["read_only"] = True
+    try:
+        yield replica_db
+    finally:
+        replica_db.close()
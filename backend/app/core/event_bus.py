@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Callable, Protocol
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.db import engine as default_engine
+from app.core.json_codec import dumps, loads
+from app.core.pg_listener import PgNotifyListener
+from app.models import WsEventPayload
+
+logger = logging.getLogger(__name__)
+
+WS_NOTIFY_CHANNEL = "ws_events"
+# pg_notify принимает payload до 8000 байт; оставляем запас на имя канала.
+NOTIFY_PAYLOAD_LIMIT = 7900
+
+_MISSING: Any = object()
+
+
+class EncodedEvent:
+    """Событие, сериализованное один раз для всех получателей."""
+
+    __slots__ = ("_payload", "data", "_text")
+
+    def __init__(self, payload: Any = _MISSING, *, data: bytes | None = None) -> None:
+        self._payload = payload
+        self.data = dumps(payload) if data is None else data
+        self._text: str | None = None
+
+    @classmethod
+    def from_data(cls, data: bytes) -> EncodedEvent:
+        """Событие из уже сериализованного JSON (например, полученного от шины)."""
+        return cls(data=data)
+
+    @property
+    def payload(self) -> Any:
+        if self._payload is _MISSING:
+            self._payload = loads(self.data)
+        return self._payload
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = self.data.decode()
+        return self._text
+
+
+def encode_event(payload: Any) -> EncodedEvent:
+    return payload if isinstance(payload, EncodedEvent) else EncodedEvent(payload)
+
+
+Deliver = Callable[[str, EncodedEvent], Any]
+
+
+class EventBus(Protocol):
+    """Шина событий между воркерами.
+
+    Событие публикуется один раз; каждый воркер, подписавшийся через start,
+    получает его в deliver и рассылает своим соединениям сам.
+    """
+
+    async def start(self, deliver: Deliver) -> None: ...
+
+    async def stop(self, deliver: Deliver) -> None: ...
+
+    async def publish(self, channel: str, event: EncodedEvent) -> None: ...
+
+
+class EventBusOverflow(RuntimeError):
+    """Очередь публикации переполнена; событие нужно доставить локально."""
+
+
+class InProcessEventBus:
+    """Шина в памяти процесса: для тестов и запуска в один воркер."""
+
+    def __init__(self) -> None:
+        self._subscribers: list[Deliver] = []
+
+    async def start(self, deliver: Deliver) -> None:
+        if deliver not in self._subscribers:
+            self._subscribers.append(deliver)
+
+    async def stop(self, deliver: Deliver) -> None:
+        if deliver in self._subscribers:
+            self._subscribers.remove(deliver)
+
+    async def publish(self, channel: str, event: EncodedEvent) -> None:
+        for deliver in list(self._subscribers):
+            deliver(channel, event)
+
+
+class PostgresEventBus:
+    """Шина на LISTEN/NOTIFY.
+
+    Событие уходит в pg_notify как "<channel>\\n<json>". Если оно не помещается
+    в лимит NOTIFY, тело пишется в ws_event_payloads, а в уведомлении
+    передаётся "<channel>\\n@<id>". Поток LISTEN передаёт события в цикл
+    событий каждого подписчика через call_soon_threadsafe.
+
+    publish не ходит в БД: события кладутся в ограниченную очередь, а фоновая
+    задача отправляет их пачками до batch_size уведомлений в одной транзакции.
+    При переполнении очереди publish бросает EventBusOverflow, а если пачку
+    не удалось отправить, её события получают только подписчики этого воркера.
+    """
+
+    def __init__(
+        self,
+        *,
+        engine: Engine = default_engine,
+        channel: str = WS_NOTIFY_CHANNEL,
+        notify_limit: int = NOTIFY_PAYLOAD_LIMIT,
+        queue_size: int | None = None,
+        batch_size: int | None = None,
+    ) -> None:
+        self.engine = engine
+        self.channel = channel
+        self.notify_limit = notify_limit
+        self.queue_size = queue_size or settings.WS_EVENT_BUS_QUEUE_SIZE
+        self.batch_size = batch_size or settings.WS_EVENT_BUS_BATCH_SIZE
+        self._subscribers: list[tuple[asyncio.AbstractEventLoop, Deliver]] = []
+        self._listener: PgNotifyListener | None = None
+        self._queue: asyncio.Queue[tuple[str, EncodedEvent]] | None = None
+        self._publisher: asyncio.Task | None = None
+
+    async def start(self, deliver: Deliver) -> None:
+        self._subscribers.append((asyncio.get_running_loop(), deliver))
+        if self._publisher is None:
+            self._queue = asyncio.Queue(self.queue_size)
+            self._publisher = asyncio.create_task(self._run_publisher(), name="ws-event-publisher")
+        if self._listener is None:
+            self._listener = PgNotifyListener(self.channel, self._on_notify, engine=self.engine)
+            await self._listener.start()
+
+    async def stop(self, deliver: Deliver) -> None:
+        self._subscribers = [item for item in self._subscribers if item[1] is not deliver]
+        if self._subscribers:
+            return
+        publisher, self._publisher = self._publisher, None
+        if publisher is not None:
+            publisher.cancel()
+            try:
+                await publisher
+            except asyncio.CancelledError:
+                pass
+            # Остаток очереди отправляется до остановки слушателя.
+            await self._publish_pending(deliver)
+        if self._listener is not None:
+            listener, self._listener = self._listener, None
+            await listener.stop()
+
+    async def publish(self, channel: str, event: EncodedEvent) -> None:
+        if self._queue is None:
+            await asyncio.to_thread(self._publish_batch, [(channel, event)])
+            return
+        try:
+            self._queue.put_nowait((channel, event))
+        except asyncio.QueueFull:
+            raise EventBusOverflow(f"WebSocket event queue is full ({self.queue_size})") from None
+
+    def _take_batch(self, batch: list[tuple[str, EncodedEvent]] | None = None) -> list[tuple[str, EncodedEvent]]:
+        assert self._queue is not None
+        batch = batch if batch is not None else []
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run_publisher(self) -> None:
+        assert self._queue is not None
+        while True:
+            batch = self._take_batch([await self._queue.get()])
+            await self._send(batch)
+
+    async def _publish_pending(self, deliver: Deliver) -> None:
+        if self._queue is None:
+            return
+        while not self._queue.empty():
+            batch = self._take_batch()
+            try:
+                await asyncio.to_thread(self._publish_batch, batch)
+            except Exception:
+                logger.exception("Failed to publish %s WebSocket events on shutdown", len(batch))
+                for channel, event in batch:
+                    deliver(channel, event)
+        self._queue = None
+
+    async def _send(self, batch: list[tuple[str, EncodedEvent]]) -> None:
+        try:
+            await asyncio.to_thread(self._publish_batch, batch)
+        except Exception:
+            logger.exception("Event bus publish of %s events failed, delivering locally", len(batch))
+            for channel, event in batch:
+                self._dispatch(channel, event)
+
+    def _publish_batch(self, batch: list[tuple[str, EncodedEvent]]) -> None:
+        """Отправить пачку уведомлений; одинаковые NOTIFY в одной транзакции
+        PostgreSQL склеивает, поэтому на повторе начинается новая транзакция."""
+        index = 0
+        while index < len(batch):
+            seen: set[str] = set()
+            with self.engine.begin() as connection:
+                while index < len(batch):
+                    channel, event = batch[index]
+                    message = f"{channel}\n{event.text}"
+                    if message in seen:
+                        break
+                    seen.add(message)
+                    index += 1
+                    if len(message.encode()) > self.notify_limit:
+                        payload_id = connection.execute(
+                            insert(WsEventPayload)
+                            .values(channel=channel, payload=event.text)
+                            .returning(WsEventPayload.id)
+                        ).scalar_one()
+                        message = f"{channel}\n@{payload_id}"
+                    connection.execute(
+                        text("SELECT pg_notify(:channel, :message)"), {"channel": self.channel, "message": message}
+                    )
+
+    def _load_payload(self, payload_id: int) -> str | None:
+        with self.engine.connect() as connection:
+            return connection.execute(
+                select(WsEventPayload.payload).where(WsEventPayload.id == payload_id)
+            ).scalar_one_or_none()
+
+    def _on_notify(self, message: str) -> None:
+        channel, _, body = message.partition("\n")
+        if body.startswith("@"):
+            loaded = self._load_payload(int(body[1:]))
+            if loaded is None:
+                logger.warning("WebSocket event payload %s is gone", body[1:])
+                return
+            body = loaded
+        self._dispatch(channel, EncodedEvent.from_data(body.encode()))
+
+    def _dispatch(self, channel: str, event: EncodedEvent) -> None:
+        for loop, deliver in list(self._subscribers):
+            loop.call_soon_threadsafe(deliver, channel, event)
+
+
+def create_event_bus() -> EventBus:
+    """Шина по настройке WS_EVENT_BUS; вне PostgreSQL — всегда в памяти процесса."""
+    if settings.WS_EVENT_BUS == "postgres" and default_engine.dialect.name == "postgresql":
+        return PostgresEventBus()
+    return InProcessEventBus()
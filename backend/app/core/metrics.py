@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool, QueuePool
+
+# Границы корзин в секундах: от «мгновенно» до упора в pool_timeout.
+DEFAULT_LATENCY_BUCKETS: tuple[float, ...] = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Потокобезопасная гистограмма с фиксированными корзинами."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> None:
+        self._bounds = tuple(sorted(buckets))
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total_sum = self._sum
+            total_count = self._count
+        buckets: dict[str, int] = {}
+        cumulative = 0
+        for bound, count in zip(self._bounds, counts):
+            cumulative += count
+            buckets[f"le_{bound:g}"] = cumulative
+        buckets["le_inf"] = cumulative + counts[-1]
+        return {"count": total_count, "sum": round(total_sum, 6), "buckets": buckets}
+
+
+class PoolMetrics:
+    """Счётчики пула соединений SQLAlchemy, собираемые через pool events."""
+
+    def __init__(self) -> None:
+        self.wait_seconds = Histogram()
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.peak_checked_out = 0
+        self.checkouts_total = 0
+        self.connects_total = 0
+        self.invalidations_total = 0
+        self.timeouts_total = 0
+
+    def pool_class(self, base: type[QueuePool] = QueuePool) -> type[QueuePool]:
+        """Подкласс QueuePool, который меряет время ожидания свободного соединения.
+
+        У пула нет события «перед checkout», поэтому ожидание меряется вокруг
+        ``_do_get`` — именно там запрос стоит в очереди, если пул исчерпан.
+        """
+        metrics = self
+
+        class InstrumentedQueuePool(base):  # type: ignore[valid-type, misc]
+            def _do_get(self):  # type: ignore[override]
+                started = time.perf_counter()
+                try:
+                    return super()._do_get()
+                except PoolTimeoutError:
+                    metrics._increment("timeouts_total")
+                    raise
+                finally:
+                    metrics.wait_seconds.observe(time.perf_counter() - started)
+
+        return InstrumentedQueuePool
+
+    def attach(self, target: Engine | Pool) -> None:
+        event.listen(target, "connect", self._on_connect)
+        event.listen(target, "checkout", self._on_checkout)
+        event.listen(target, "checkin", self._on_checkin)
+        event.listen(target, "invalidate", self._on_invalidate)
+
+    def _increment(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _on_connect(self, _dbapi_connection, _connection_record) -> None:
+        self._increment("connects_total")
+
+    def _on_checkout(self, _dbapi_connection, _connection_record, _connection_proxy) -> None:
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts_total += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def _on_checkin(self, _dbapi_connection, _connection_record) -> None:
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def _on_invalidate(self, _dbapi_connection, _connection_record, _exception) -> None:
+        self._increment("invalidations_total")
+
+    def snapshot(self, pool: Pool | None = None) -> dict[str, Any]:
+        with self._lock:
+            data: dict[str, Any] = {
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "checkouts_total": self.checkouts_total,
+                "connects_total": self.connects_total,
+                "invalidations_total": self.invalidations_total,
+                "timeouts_total": self.timeouts_total,
+            }
+        if isinstance(pool, QueuePool):
+            data.update(
+                {
+                    "pool_size": pool.size(),
+                    "checked_in": pool.checkedin(),
+                    "overflow": max(pool.overflow(), 0),
+                }
+            )
+        data["wait_seconds"] = self.wait_seconds.snapshot()
+        return data
+
+
+class WebSocketMetrics:
+    """Счётчики WebSocket-рассылки воркера: отправки, задержка, потери, вытеснения."""
+
+    def __init__(self) -> None:
+        self.send_seconds = Histogram()
+        self._lock = threading.Lock()
+        self.accepted_total = 0
+        self.sent_total = 0
+        self.dropped_total = 0
+        self.send_failures_total = 0
+        self.idle_evictions_total = 0
+        self.cap_evictions_total = 0
+
+    def increment(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def observe_send(self, seconds: float) -> None:
+        self.send_seconds.observe(seconds)
+        self.increment("sent_total")
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            data: dict[str, Any] = {
+                "accepted_total": self.accepted_total,
+                "sent_total": self.sent_total,
+                "dropped_total": self.dropped_total,
+                "send_failures_total": self.send_failures_total,
+                "idle_evictions_total": self.idle_evictions_total,
+                "cap_evictions_total": self.cap_evictions_total,
+            }
+        data["send_seconds"] = self.send_seconds.snapshot()
+        return data
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import select
+import threading
+from typing import Callable
+
+from sqlalchemy.engine import Engine
+
+from app.core.db import engine as default_engine
+
+logger = logging.getLogger(__name__)
+
+
+class PgNotifyListener:
+    """LISTEN на канале PostgreSQL в отдельном потоке.
+
+    Держит собственное соединение вне пула и передаёт payload каждого
+    уведомления в handler (вызывается из потока слушателя). При обрыве
+    соединения переподключается.
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        handler: Callable[[str], None],
+        *,
+        engine: Engine = default_engine,
+        poll_interval: float = 1.0,
+        retry_interval: float = 5.0,
+    ) -> None:
+        self.channel = channel
+        self.handler = handler
+        self.engine = engine
+        self.poll_interval = poll_interval
+        self.retry_interval = retry_interval
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _listen_once(self) -> None:
+        raw = self.engine.raw_connection()
+        # Соединение с LISTEN нельзя возвращать в пул.
+        raw.detach()
+        try:
+            connection = raw.driver_connection
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            while not self._stopping.is_set():
+                if select.select([connection], [], [], self.poll_interval) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    payload = connection.notifies.pop(0).payload
+                    try:
+                        self.handler(payload)
+                    except Exception:
+                        logger.exception("Handler for %s notification failed", self.channel)
+        finally:
+            raw.close()
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                self._listen_once()
+            except Exception:
+                logger.exception("Listener on %s failed, reconnecting", self.channel)
+                self._stopping.wait(self.retry_interval)
+
+    async def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name=f"listen-{self.channel}", daemon=True)
+            self._thread.start()
+
+    async def stop(self) -> None:
+        thread, self._thread = self._thread, None
+        self._stopping.set()
+        if thread is not None:
+            await asyncio.to_thread(thread.join, self.poll_interval * 2)
@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+
+def as_utc(value: datetime | None) -> datetime | None:
+    """Привести дату к UTC: SQLite возвращает naive-значения, считаем их UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
@@ -1,44 +1,525 @@
 from __future__ import annotations
 
 import asyncio
-import json
-from collections import defaultdict
-from typing import Any, DefaultDict
+import logging
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque
+from typing import Any, Callable, DefaultDict, Iterable
 
-from fastapi import WebSocket
+from fastapi import WebSocket, status
+
+from app.core.config import settings
+from app.core.event_bus import EncodedEvent, EventBus, EventBusOverflow, InProcessEventBus, encode_event
+from app.core.metrics import WebSocketMetrics
+
+logger = logging.getLogger(__name__)
+
+RESYNC_REQUIRED_EVENT = "resync.required"
+COALESCED_EVENT = "dialog.updated"
+BATCH_EVENT = "dialogs.updated"
+OVERFLOW_RESYNC = "resync"
+OVERFLOW_CLOSE = "close"
+
+
+HEARTBEAT_EVENT = "ping"
+
+
+_RESYNC_REQUIRED = EncodedEvent({"event": RESYNC_REQUIRED_EVENT})
+HEARTBEAT = EncodedEvent({"event": HEARTBEAT_EVENT})
+
+
+class ClientConnection:
+    """Одно WebSocket-соединение: ограниченная исходящая очередь и задача-писатель.
+
+    Рассылка только кладёт сообщение в очередь; медленный клиент задерживает
+    лишь собственного писателя. При переполнении очередь либо сбрасывается и
+    заменяется маркером resync.required, либо соединение закрывается.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        *,
+        queue_size: int,
+        send_timeout: float,
+        overflow_policy: str,
+        on_close: Callable[[ClientConnection], None],
+        admin_id: int | None = None,
+        metrics: WebSocketMetrics | None = None,
+    ) -> None:
+        self.websocket = websocket
+        self.admin_id = admin_id
+        self.channels: set[str] = set()
+        self.closed = False
+        self.dropped = 0
+        self.metrics = metrics or WebSocketMetrics()
+        self._queue: asyncio.Queue[EncodedEvent] = asyncio.Queue(maxsize=queue_size)
+        self._send_timeout = send_timeout
+        self._overflow_policy = overflow_policy
+        self._on_close = on_close
+        self._writer = asyncio.create_task(self._write_loop())
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize()
+
+    def enqueue(self, event: EncodedEvent) -> bool:
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self.metrics.increment("dropped_total")
+            self._handle_overflow()
+            return False
+
+    def _handle_overflow(self) -> None:
+        if self._overflow_policy == OVERFLOW_CLOSE:
+            logger.warning("Closing slow WebSocket consumer")
+            self.close(code=status.WS_1013_TRY_AGAIN_LATER)
+            return
+        # Пропущенные события клиент восстановит перезапросом состояния.
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self.dropped += 1
+            self.metrics.increment("dropped_total")
+        self._queue.put_nowait(_RESYNC_REQUIRED)
+
+    async def _write_loop(self) -> None:
+        try:
+            while True:
+                event = await self._queue.get()
+                await self._send(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.debug("WebSocket send failed, dropping connection", exc_info=True)
+            self.metrics.increment("send_failures_total")
+            self.close()
+
+    async def _send(self, event: EncodedEvent) -> None:
+        # asyncio.wait вместо wait_for: до Python 3.12 wait_for может проглотить
+        # отмену писателя, если отправка завершилась одновременно с ней.
+        started = time.perf_counter()
+        send = asyncio.ensure_future(self.websocket.send_bytes(event.data))
+        try:
+            done, _ = await asyncio.wait({send}, timeout=self._send_timeout)
+        finally:
+            if not send.done():
+                send.cancel()
+        if not done:
+            raise TimeoutError("WebSocket send timed out")
+        send.result()
+        self.metrics.observe_send(time.perf_counter() - started)
+
+    def close(self, *, code: int | None = None) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._on_close(self)
+        if asyncio.current_task() is not self._writer:
+            self._writer.cancel()
+        if code is not None:
+            asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int) -> None:
+        try:
+            await self.websocket.close(code=code)
+        except Exception:
+            pass
+
+
+def _with_seq(event: EncodedEvent, seq: int) -> EncodedEvent:
+    """Добавить "seq" в уже сериализованный объект без повторного кодирования."""
+    data = event.data
+    if data[:1] != b"{":
+        return event
+    separator = b"" if data[1:2] == b"}" else b","
+    return EncodedEvent.from_data(b'{"seq":%d%s%s' % (seq, separator, data[1:]))
+
+
+class _ChannelHistory:
+    __slots__ = ("events", "size", "evicted_upto")
+
+    def __init__(self, size: int) -> None:
+        self.events: deque[tuple[int, EncodedEvent]] = deque()
+        self.size = size
+        # Наибольший seq, вытесненный из буфера: докачка с меньшего since невозможна.
+        self.evicted_upto = 0
+
+
+class ReplayBuffer:
+    """
+    Последние события каналов этого воркера с порядковыми номерами.
+
+    Номера монотонны в пределах потока stream (один процесс); клиент,
+    переподключившийся с since=<seq> и stream, получает пропущенное из буфера,
+    а если часть истории уже вытеснена или поток другой — сигнал
+    resync.required.
+
+    Память ограничена трижды: size событий на общий канал, topic_size — на
+    топик вида dialog:<id> (там полные тела сообщений), не больше max_channels
+    каналов и max_bytes сериализованных событий на весь буфер. При превышении
+    бюджета вытесняются старейшие события давно не писавших каналов.
+    """
+
+    def __init__(self, *, size: int, topic_size: int, max_channels: int, max_bytes: int) -> None:
+        self.stream = uuid.uuid4().hex[:12]
+        self.seq = 0
+        self.bytes = 0
+        self._size = size
+        self._topic_size = topic_size
+        self._max_channels = max_channels
+        self._max_bytes = max_bytes
+        self._channels: OrderedDict[str, _ChannelHistory] = OrderedDict()
+        # Граница для каналов, вытесненных целиком.
+        self._forgotten_upto = 0
+
+    def append(self, channel: str, event: EncodedEvent) -> EncodedEvent:
+        self.seq += 1
+        sequenced = _with_seq(event, self.seq)
+        history = self._channels.get(channel)
+        if history is None:
+            history = self._channels[channel] = _ChannelHistory(self._topic_size if ":" in channel else self._size)
+            if len(self._channels) > self._max_channels:
+                self._forget_channel(next(iter(self._channels)))
+        else:
+            self._channels.move_to_end(channel)
+        history.events.append((self.seq, sequenced))
+        self.bytes += len(sequenced.data)
+        if len(history.events) > history.size:
+            self._evict_oldest(history)
+        while self.bytes > self._max_bytes:
+            oldest_channel, oldest = next(iter(self._channels.items()))
+            if oldest is history and len(history.events) == 1:
+                # Только что записанное событие остаётся даже сверх бюджета.
+                break
+            self._evict_oldest(oldest)
+            if not oldest.events:
+                self._forget_channel(oldest_channel)
+        return sequenced
+
+    def _evict_oldest(self, history: _ChannelHistory) -> None:
+        seq, event = history.events.popleft()
+        history.evicted_upto = seq
+        self.bytes -= len(event.data)
+
+    def _forget_channel(self, channel: str) -> None:
+        history = self._channels.pop(channel)
+        for _, event in history.events:
+            self.bytes -= len(event.data)
+        last = history.events[-1][0] if history.events else history.evicted_upto
+        self._forgotten_upto = max(self._forgotten_upto, last)
+
+    def replay(self, channels: Iterable[str], since: int) -> list[EncodedEvent] | None:
+        """События каналов с seq > since по порядку; None — разрыв не восполнить."""
+        if since > self.seq:
+            return None
+        missed: list[tuple[int, EncodedEvent]] = []
+        for channel in channels:
+            history = self._channels.get(channel)
+            if history is None:
+                if since < self._forgotten_upto:
+                    return None
+                continue
+            if history.evicted_upto > since:
+                return None
+            missed.extend(item for item in history.events if item[0] > since)
+        missed.sort(key=lambda item: item[0])
+        return [event for _, event in missed]
 
 
 class WebSocketManager:
-    """Tracks WebSocket connections per logical channel."""
+    """Tracks WebSocket connections per logical channel.
+
+    Одно соединение может быть подписано на несколько каналов; индекс
+    канал → соединения позволяет рассылке обходить только заинтересованных.
+    Все изменения реестра выполняются синхронно внутри цикла событий, поэтому
+    общий lock не нужен: ни рассылка, ни отключение упавшего клиента не ждут
+    друг друга.
+    """
+
+    def __init__(
+        self,
+        *,
+        queue_size: int | None = None,
+        send_timeout: float | None = None,
+        overflow_policy: str | None = None,
+        coalesce_window: float | None = None,
+        replay_size: int | None = None,
+        heartbeat_interval: float | None = None,
+        idle_timeout: float | None = None,
+        max_per_admin: int | None = None,
+        bus: EventBus | None = None,
+    ) -> None:
+        self.bus: EventBus = bus or InProcessEventBus()
+        self._bus_started = False
+        self.queue_size = queue_size or settings.WS_SEND_QUEUE_SIZE
+        self.send_timeout = send_timeout or settings.WS_SEND_TIMEOUT_SECONDS
+        self.overflow_policy = overflow_policy or settings.WS_OVERFLOW_POLICY
+        self.coalesce_window = settings.WS_COALESCE_WINDOW_SECONDS if coalesce_window is None else coalesce_window
+        # Накопленные dialog.updated: канал → dialog_id → последнее состояние.
+        self._pending: dict[str, dict[Any, dict]] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_tasks: set[asyncio.Task] = set()
+        self.history = ReplayBuffer(
+            size=replay_size or settings.WS_REPLAY_BUFFER_SIZE,
+            topic_size=settings.WS_REPLAY_TOPIC_BUFFER_SIZE,
+            max_channels=settings.WS_REPLAY_MAX_CHANNELS,
+            max_bytes=settings.WS_REPLAY_MAX_BYTES,
+        )
+        self.heartbeat_interval = heartbeat_interval or settings.WS_HEARTBEAT_INTERVAL_SECONDS
+        self.idle_timeout = idle_timeout or settings.WS_IDLE_TIMEOUT_SECONDS
+        self.max_per_admin = settings.WS_MAX_CONNECTIONS_PER_ADMIN if max_per_admin is None else max_per_admin
+        self.metrics = WebSocketMetrics()
+        self._clients: dict[WebSocket, ClientConnection] = {}
+        self._connections: DefaultDict[str, set[ClientConnection]] = defaultdict(set)
+        # Соединения администратора в порядке открытия (dict как упорядоченное множество).
+        self._by_admin: dict[int, dict[ClientConnection, None]] = {}
+
+    async def start(self, bus: EventBus | None = None) -> None:
+        """Подписаться на шину событий; до этого broadcast рассылает только локально."""
+        if self._bus_started:
+            return
+        if bus is not None:
+            self.bus = bus
+        await self.bus.start(self.deliver_local)
+        self._bus_started = True
+
+    async def stop(self) -> None:
+        await self.flush()
+        if self._bus_started:
+            self._bus_started = False
+            await self.bus.stop(self.deliver_local)
+
+    async def accept(self, websocket: WebSocket, *, admin_id: int | None = None) -> ClientConnection:
+        """
+        Принять соединение и завести ему очередь; каналы добавляются через subscribe.
+
+        Если у администратора уже max_per_admin соединений, самое старое из них
+        закрывается: обычно это вкладка, которую закрыли без закрытия сокета.
+        """
+        client = self._clients.get(websocket)
+        if client is None:
+            await websocket.accept()
+            client = ClientConnection(
+                websocket,
+                queue_size=self.queue_size,
+                send_timeout=self.send_timeout,
+                overflow_policy=self.overflow_policy,
+                on_close=self._forget,
+                admin_id=admin_id,
+                metrics=self.metrics,
+            )
+            self._clients[websocket] = client
+            self.metrics.increment("accepted_total")
+            if admin_id is not None:
+                owned = self._by_admin.setdefault(admin_id, {})
+                owned[client] = None
+                while 0 < self.max_per_admin < len(owned):
+                    oldest = next(iter(owned))
+                    logger.info("Admin %s exceeded WebSocket limit, closing oldest connection", admin_id)
+                    self.metrics.increment("cap_evictions_total")
+                    oldest.close(code=status.WS_1008_POLICY_VIOLATION)
+        return client
+
+    def close(self, websocket: WebSocket, *, code: int) -> None:
+        """Закрыть соединение с кодом (например, по тишине клиента)."""
+        client = self._clients.get(websocket)
+        if client is not None:
+            client.close(code=code)
+
+    def subscribe(self, websocket: WebSocket, channel: str) -> bool:
+        client = self._clients.get(websocket)
+        if client is None or client.closed:
+            return False
+        client.channels.add(channel)
+        self._connections[channel].add(client)
+        return True
+
+    def unsubscribe(self, websocket: WebSocket, channel: str) -> None:
+        client = self._clients.get(websocket)
+        if client is None:
+            return
+        client.channels.discard(channel)
+        self._discard(client, channel)
+
+    def connection_count(self) -> int:
+        return len(self._clients)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Снимок для мониторинга: соединения, подписчики каналов, счётчики.
+
+        Топики dialog:<id> и assigned:<id> сводятся в dialog:* и assigned:*,
+        чтобы размер ответа не зависел от числа открытых диалогов.
+        """
+        channels: dict[str, int] = defaultdict(int)
+        for channel, clients in self._connections.items():
+            prefix, separator, _ = channel.partition(":")
+            channels[f"{prefix}:*" if separator else channel] += len(clients)
+        data = self.metrics.snapshot()
+        data.update(
+            {
+                "connections": len(self._clients),
+                "admins": len(self._by_admin),
+                "channels": dict(sorted(channels.items())),
+                "queued": sum(client.queued for client in self._clients.values()),
+                "replay_buffer": {"stream": self.history.stream, "seq": self.history.seq, "bytes": self.history.bytes},
+            }
+        )
+        return data
+
+    def channels_of(self, websocket: WebSocket) -> set[str]:
+        client = self._clients.get(websocket)
+        return set(client.channels) if client is not None else set()
 
-    def __init__(self) -> None:
-        self._connections: DefaultDict[str, set[WebSocket]] = defaultdict(set)
-        self._lock = asyncio.Lock()
+    def send(self, websocket: WebSocket, payload: Any) -> bool:
+        """Отправить служебный кадр одному соединению в общем порядке с событиями."""
+        client = self._clients.get(websocket)
+        return client is not None and client.enqueue(encode_event(payload))
 
-    async def connect(self, websocket: WebSocket, channel: str) -> None:
-        await websocket.accept()
-        async with self._lock:
-            self._connections[channel].add(websocket)
+    def resume(self, websocket: WebSocket, channels: Iterable[str], since: int, *, stream: str | None) -> bool:
+        """
+        Дослать соединению события каналов после since.
+
+        Номер имеет смысл только в своём потоке: без stream, с чужим потоком
+        (рестарт, другой воркер) или если история уже вытеснена, отправляется
+        resync.required и возвращается False.
+        """
+        client = self._clients.get(websocket)
+        if client is None:
+            return False
+        missed = None
+        if stream is not None and stream == self.history.stream:
+            missed = self.history.replay(channels, since)
+        if missed is None:
+            client.enqueue(_RESYNC_REQUIRED)
+            return False
+        for event in missed:
+            client.enqueue(event)
+        return True
+
+    def release(self, websocket: WebSocket) -> None:
+        """Снять все подписки соединения и остановить его писателя."""
+        client = self._clients.get(websocket)
+        if client is not None:
+            client.close()
+
+    async def connect(self, websocket: WebSocket, channel: str, *, admin_id: int | None = None) -> None:
+        await self.accept(websocket, admin_id=admin_id)
+        self.subscribe(websocket, channel)
 
     async def disconnect(self, websocket: WebSocket, channel: str) -> None:
-        async with self._lock:
-            connections = self._connections.get(channel)
-            if not connections:
-                return
-            connections.discard(websocket)
-            if not connections:
-                self._connections.pop(channel, None)
+        self.unsubscribe(websocket, channel)
+        if not self.channels_of(websocket):
+            self.release(websocket)
+
+    def _discard(self, client: ClientConnection, channel: str) -> None:
+        connections = self._connections.get(channel)
+        if not connections:
+            return
+        connections.discard(client)
+        if not connections:
+            self._connections.pop(channel, None)
+
+    def _forget(self, client: ClientConnection) -> None:
+        self._clients.pop(client.websocket, None)
+        if client.admin_id is not None:
+            owned = self._by_admin.get(client.admin_id)
+            if owned is not None:
+                owned.pop(client, None)
+                if not owned:
+                    del self._by_admin[client.admin_id]
+        for channel in list(client.channels):
+            self._discard(client, channel)
 
     async def broadcast(self, channel: str, payload: Any) -> None:
-        message = json.dumps(payload, default=str)
-        connections: list[WebSocket]
-        async with self._lock:
-            connections = list(self._connections.get(channel, set()))
-        for connection in connections:
-            try:
-                await connection.send_text(message)
-            except Exception:
-                await self.disconnect(connection, channel)
+        """
+        Опубликовать событие для подписчиков канала во всех воркерах.
+
+        payload сериализуется один раз; в словарь добавляется поле "channel",
+        по которому клиент единого /events раскладывает события по подпискам.
+        Готовый EncodedEvent отправляется как есть. dialog.updated копятся
+        coalesce_window секунд и уходят одним кадром (см. flush). Если шина
+        недоступна, событие получают хотя бы локальные соединения.
+        """
+        if isinstance(payload, dict) and "channel" not in payload:
+            payload = {"channel": channel, **payload}
+        if self.coalesce_window > 0 and _is_coalescible(payload):
+            self._coalesce(channel, payload)
+            return
+        # Отложенные обновления канала не должны обогнать более новое событие.
+        await self._flush_channel(channel)
+        await self._publish(channel, encode_event(payload))
+
+    async def _publish(self, channel: str, event: EncodedEvent) -> None:
+        if not self._bus_started:
+            self.deliver_local(channel, event)
+            return
+        try:
+            await self.bus.publish(channel, event)
+        except EventBusOverflow as exc:
+            logger.warning("%s, delivering locally", exc)
+            self.deliver_local(channel, event)
+        except Exception:
+            logger.exception("Event bus publish failed, delivering locally")
+            self.deliver_local(channel, event)
+
+    def _coalesce(self, channel: str, payload: dict) -> None:
+        updates = self._pending.setdefault(channel, {})
+        dialog_id = payload["dialog_id"]
+        updates[dialog_id] = {**updates.get(dialog_id, {}), **payload}
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.coalesce_window, self._start_flush)
+
+    def _start_flush(self) -> None:
+        self._flush_handle = None
+        task = asyncio.create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def flush(self) -> None:
+        """
+        Отправить накопленные dialog.updated.
+
+        Одно обновление уходит как есть, несколько — одним кадром
+        {"event": "dialogs.updated", "dialogs": [...]} на канал.
+        """
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        for channel in list(self._pending):
+            await self._flush_channel(channel)
+
+    async def _flush_channel(self, channel: str) -> None:
+        updates = self._pending.pop(channel, None)
+        if not updates:
+            return
+        payloads = list(updates.values())
+        if len(payloads) == 1:
+            frame = payloads[0]
+        else:
+            frame = {"channel": channel, "event": BATCH_EVENT, "dialogs": payloads}
+        await self._publish(channel, encode_event(frame))
+
+    def deliver_local(self, channel: str, event: EncodedEvent) -> int:
+        """
+        Присвоить событию номер, сохранить его в буфере докачки и поставить
+        в очереди соединений этого воркера; вернуть число принявших.
+        """
+        event = self.history.append(channel, event)
+        clients = self._connections.get(channel)
+        if not clients:
+            return 0
+        return sum(client.enqueue(event) for client in tuple(clients))
+
+
+def _is_coalescible(payload: Any) -> bool:
+    return isinstance(payload, dict) and payload.get("event") == COALESCED_EVENT and "dialog_id" in payload
 
 
 _ws_manager = WebSocketManager()
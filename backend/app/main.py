@@ -1,14 +1,58 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1.router import api_router
 from app.bot.router import router as bot_router
 from app.core.config import settings
+from app.core.db import engine
+from app.core.event_bus import create_event_bus
+from app.core.ws_manager import get_ws_manager
 from app.middleware.admin_context import AdminContextMiddleware
+from app.services.audit import get_audit_sink
+from app.services.knowledge_ingestion import get_knowledge_ingestion
+from app.services.login_waiters import LoginNotifyListener, get_login_waiters
+from app.services.maintenance import get_maintenance_scheduler
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    ws_manager = get_ws_manager()
+    await ws_manager.start(create_event_bus())
+    audit_sink = get_audit_sink()
+    if settings.AUDIT_BUFFER_ENABLED:
+        await audit_sink.start()
+    scheduler = get_maintenance_scheduler() if settings.MAINTENANCE_ENABLED else None
+    if scheduler is not None:
+        await scheduler.start()
+    login_listener = (
+        LoginNotifyListener(get_login_waiters())
+        if settings.LOGIN_NOTIFY_LISTENER_ENABLED and engine.dialect.name == "postgresql"
+        else None
+    )
+    if login_listener is not None:
+        await login_listener.start()
+    ingestion = get_knowledge_ingestion()
+    if settings.KNOWLEDGE_INGESTION_RESUME_ENABLED:
+        await ingestion.start()
+    try:
+        yield
+    finally:
+        await ingestion.stop()
+        if login_listener is not None:
+            await login_listener.stop()
+        if scheduler is not None:
+            await scheduler.stop()
+        # Остаток буфера аудита дописывается до завершения процесса.
+        await audit_sink.stop()
+        await ws_manager.stop()
+
 
 app = FastAPI(
     title=settings.APP_NAME,
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS
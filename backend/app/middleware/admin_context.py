@@ -1,34 +1,56 @@
 from __future__ import annotations
 
-from fastapi import HTTPException, Request
-from starlette.middleware.base import BaseHTTPMiddleware
+import asyncio
+
+from fastapi import HTTPException
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from app.core.db import SessionLocal
 from app.models import Admin
-from app.services.security import decode_token, extract_token_from_request
-
-
-class AdminContextMiddleware(BaseHTTPMiddleware):
-    """Извлекает текущего администратора из JWT и сохраняет в request.state."""
-
-    async def dispatch(self, request: Request, call_next):  # type: ignore[override]
-        request.state.admin = None
-        token = extract_token_from_request(request)
-        if token:
-            try:
-                payload = decode_token(token)
-                if payload.get("type") == "access" and payload.get("sub"):
-                    admin_id = int(payload["sub"])
-                    db = SessionLocal()
-                    try:
-                        admin = db.query(Admin).filter(Admin.id == admin_id).first()
-                        if admin and admin.is_active:
-                            request.state.admin = admin
-                    finally:
-                        db.close()
-            except HTTPException:
-                pass
-            except Exception:
-                pass
-        response = await call_next(request)
-        return response
+from app.services.security import decode_token, extract_token_from_request, get_cached_admin, load_admin
+
+
+def _load_admin_from_db(admin_id: int) -> Admin | None:
+    db = SessionLocal()
+    try:
+        return load_admin(admin_id, db=db)
+    finally:
+        db.close()
+
+
+class AdminContextMiddleware:
+    """Извлекает текущего администратора из JWT и сохраняет в request.state.
+
+    Чистый ASGI: не оборачивает тело ответа, как BaseHTTPMiddleware, и не
+    берёт соединение из пула, если администратор уже есть в кэше процесса.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            state = scope.setdefault("state", {})
+            state["admin"] = None
+            token = extract_token_from_request(HTTPConnection(scope))  # type: ignore[arg-type]
+            if token:
+                try:
+                    state["admin"] = await self._resolve_admin(token)
+                except HTTPException:
+                    pass
+                except Exception:
+                    pass
+        await self.app(scope, receive, send)
+
+    async def _resolve_admin(self, token: str) -> Admin | None:
+        payload = decode_token(token)
+        if payload.get("type") != "access" or not payload.get("sub"):
+            return None
+        admin_id = int(payload["sub"])
+        admin = get_cached_admin(admin_id)
+        if admin is None:
+            admin = await asyncio.to_thread(_load_admin_from_db, admin_id)
+        if admin and admin.is_active:
+            return admin
+        return None
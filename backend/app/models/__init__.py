@@ -1,20 +1,28 @@
 from .admin import Admin
 from .dialog import Dialog, DialogStatus
-from .message import Message
+from .message import Message, MessageRole
 from .auth import PendingLogin
 from .audit import AuditLog
 from .ai_instruction import AIInstructions
-from .knowledge_file import KnowledgeFile
+from .knowledge_file import KnowledgeFile, KnowledgeFileStatus
 from .knowledge_chunk import KnowledgeChunk
+from .stats import StatsDaily, StatsHourly, StatsMonthly
+from .event_payload import WsEventPayload
 
 __all__ = [
     "Admin",
     "Dialog",
     "DialogStatus",
     "Message",
+    "MessageRole",
     "PendingLogin",
     "AuditLog",
     "AIInstructions",
     "KnowledgeFile",
+    "KnowledgeFileStatus",
     "KnowledgeChunk",
+    "StatsDaily",
+    "StatsHourly",
+    "StatsMonthly",
+    "WsEventPayload",
 ]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, JSON, String, func
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, JSON, String, func
 from sqlalchemy.orm import relationship
 
 from app.core.db import Base
@@ -6,11 +6,17 @@ from app.core.db import Base
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
+    # В PostgreSQL таблица секционирована по месяцам created_at (см. миграцию
+    # 20240701_audit_logs_partitioning); первичный ключ там — (id, created_at).
+    __table_args__ = (
+        Index("ix_audit_logs_admin_id_created_at", "admin_id", "created_at"),
+        Index("ix_audit_logs_action_created_at", "action", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     admin_id = Column(Integer, ForeignKey("admins.id"), nullable=True)
     action = Column(String(128), nullable=False)
     params = Column(JSON, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
 
     admin = relationship("Admin", back_populates="audit_logs")
@@ -1,5 +1,5 @@
 import enum
-from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, Integer, func
+from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, Index, Integer, func
 from sqlalchemy.orm import relationship
 
 from app.core.db import Base
@@ -13,6 +13,11 @@ class DialogStatus(str, enum.Enum):
 
 class Dialog(Base):
     __tablename__ = "dialogs"
+    __table_args__ = (
+        Index("ix_dialogs_status_last_message_at", "status", "last_message_at"),
+        Index("ix_dialogs_last_message_at_id", "last_message_at", "id"),
+        Index("ix_dialogs_updated_at_id", "updated_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     telegram_user_id = Column(Integer, index=True, nullable=False)
@@ -27,7 +32,8 @@ class Dialog(Base):
         foreign_keys=[assigned_admin_id],
     )
 
-    last_message_at = Column(DateTime(timezone=True), server_default=func.now())
+    # NOT NULL: по (last_message_at, id) идёт keyset-пагинация, NULL в ней не сравним.
+    last_message_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     is_locked = Column(Boolean, default=False)
     locked_by_admin_id = Column(Integer, ForeignKey("admins.id"), nullable=True)
     locked_by_admin = relationship(
@@ -37,6 +43,9 @@ class Dialog(Base):
     )
     locked_until = Column(DateTime(timezone=True), nullable=True)
     unread_messages_count = Column(Integer, default=0)
+    # Отметки для почасовой статистики (app.services.stats).
+    waiting_operator_since = Column(DateTime(timezone=True), nullable=True)
+    operator_session_started_at = Column(DateTime(timezone=True), nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from sqlalchemy import Column, DateTime, Integer, String, Text, func
+
+from app.core.db import Base
+
+
+class WsEventPayload(Base):
+    """Тела WebSocket-событий, не помещающиеся в pg_notify (лимит ~8000 байт).
+
+    В NOTIFY уходит только ссылка на строку; воркеры читают тело по id.
+    Строки живут несколько минут и удаляются фоновой задачей обслуживания.
+    """
+
+    __tablename__ = "ws_event_payloads"
+
+    id = Column(Integer, primary_key=True)
+    channel = Column(String(128), nullable=False)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
@@ -1,11 +1,22 @@
 from __future__ import annotations
 
+import enum
+
 from sqlalchemy import Column, DateTime, Integer, String, Text, func
 from sqlalchemy.orm import relationship
 
 from app.core.db import Base
 
 
+class KnowledgeFileStatus(str, enum.Enum):
+    QUEUED = "queued"  # Загружен, ждёт фоновой обработки
+    EXTRACTING = "extracting"  # Извлекается текст
+    CHUNKING = "chunking"  # Текст режется на чанки
+    EMBEDDING = "embedding"  # Считаются эмбеддинги чанков
+    READY = "ready"  # Участвует в поиске RAG
+    FAILED = "failed"  # Обработка завершилась ошибкой
+
+
 class KnowledgeFile(Base):
     """Файлы базы знаний для RAG."""
 
@@ -17,6 +28,15 @@ class KnowledgeFile(Base):
     mime_type = Column(String(128), nullable=True)
     size_bytes = Column(Integer, nullable=False)
     total_chunks = Column(Integer, default=0, nullable=False)
+    # Строка, а не native enum: новые стадии не требуют ALTER TYPE.
+    status = Column(
+        String(16),
+        default=KnowledgeFileStatus.QUEUED.value,
+        server_default=KnowledgeFileStatus.READY.value,
+        nullable=False,
+    )
+    embedded_chunks = Column(Integer, default=0, server_default="0", nullable=False)
+    error_message = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     chunks = relationship("KnowledgeChunk", back_populates="file", cascade="all, delete-orphan")
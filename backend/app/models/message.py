@@ -1,5 +1,6 @@
-from sqlalchemy import Column, DateTime, Enum, ForeignKey, Integer, JSON, String, Text, func, Boolean
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, Integer, JSON, String, Text, func, Boolean
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 import enum
 
 from app.core.db import Base
@@ -13,6 +14,17 @@ class MessageRole(str, enum.Enum):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        Index("ix_messages_dialog_id_created_at", "dialog_id", "created_at"),
+        Index("ix_messages_dialog_id_id", "dialog_id", "id"),
+        Index("ix_messages_search_vector", "search_vector", postgresql_using="gin").ddl_if(dialect="postgresql"),
+        Index(
+            "ix_messages_content_trgm",
+            "content",
+            postgresql_using="gin",
+            postgresql_ops={"content": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     dialog_id = Column(Integer, ForeignKey("dialogs.id", ondelete="CASCADE"), nullable=False)
@@ -28,6 +40,8 @@ class Message(Base):
     is_fallback = Column(Boolean, default=False, nullable=False)
     used_rag = Column(Boolean, default=False, nullable=False)
     ai_reply_during_operator_wait = Column(Boolean, default=False, nullable=False)
+    # Заполняется триггером в PostgreSQL (russian + simple); в SQLite остаётся пустым.
+    search_vector = deferred(Column(Text().with_variant(TSVECTOR(), "postgresql"), nullable=True))
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, SmallInteger
+
+from app.core.db import Base
+
+
+class StatsCounters:
+    """Счётчики /api/stats, общие для всех уровней свёртки."""
+
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True, default=0)
+
+    messages_user = Column(Integer, default=0, nullable=False)
+    messages_ai = Column(Integer, default=0, nullable=False)
+    messages_admin = Column(Integer, default=0, nullable=False)
+    ai_fallback = Column(Integer, default=0, nullable=False)
+    ai_used_rag = Column(Integer, default=0, nullable=False)
+    ai_during_operator_wait = Column(Integer, default=0, nullable=False)
+
+    dialogs_created = Column(Integer, default=0, nullable=False)
+    escalations = Column(Integer, default=0, nullable=False)
+
+    # Первый ответ оператора после перевода диалога в WAIT_OPERATOR.
+    first_response_count = Column(Integer, default=0, nullable=False)
+    first_response_seconds_sum = Column(BigInteger, default=0, nullable=False)
+    first_response_within_sla = Column(Integer, default=0, nullable=False)
+
+    # Работа оператора с диалогом: от назначения/первого ответа до возврата в AUTO.
+    handle_count = Column(Integer, default=0, nullable=False)
+    handle_seconds_sum = Column(BigInteger, default=0, nullable=False)
+
+
+class StatsHourly(StatsCounters, Base):
+    """Почасовые счётчики для /api/stats.
+
+    Обновляются инкрементально при записи сообщений и диалогов
+    (см. app.services.stats). Каждый час разбит на несколько shard-строк,
+    чтобы параллельные транзакции не ждали блокировку одной строки;
+    при чтении строки суммируются.
+    """
+
+    __tablename__ = "stats_hourly"
+
+
+class StatsDaily(StatsCounters, Base):
+    """Те же счётчики, свёрнутые по суткам (UTC); пишутся вместе с почасовыми."""
+
+    __tablename__ = "stats_daily"
+
+
+class StatsMonthly(StatsCounters, Base):
+    """Те же счётчики, свёрнутые по календарным месяцам (UTC)."""
+
+    __tablename__ = "stats_monthly"
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class AuditLogOut(BaseModel):
+    id: int
+    admin_id: int | None = None
+    action: str
+    params: dict[str, Any] | None = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class AuditLogPage(BaseModel):
+    items: list[AuditLogOut]
+    since: datetime
+    until: datetime
+    next_cursor: str | None = None
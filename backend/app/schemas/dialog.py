@@ -25,17 +25,63 @@ class DialogShort(BaseModel):
 
 
 class DialogDetail(DialogShort):
-    messages: list[MessageOut]
+    messages: list[MessageOut]  # только последние DIALOG_DETAIL_MESSAGES_LIMIT
+    has_more_messages: bool = False
     created_at: datetime | None = None
     updated_at: datetime | None = None
 
 
 class DialogListResponse(BaseModel):
     items: list[DialogShort]
-    total: int
-    page: int
+    total: int | None = None
+    total_is_estimate: bool = False
+    page: int | None = None
     per_page: int
     has_next: bool  # <-- исправлено, теперь здесь есть поле has_next
+    next_cursor: str | None = None
+
+
+class InboxItem(BaseModel):
+    """Компактное состояние диалога для синхронизации входящих."""
+
+    id: int
+    status: DialogStatus
+    assigned_admin_id: int | None = None
+    unread_messages_count: int
+    is_locked: bool
+    locked_until: datetime | None = None
+    last_message_at: datetime | None = None
+    updated_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class InboxSnapshot(BaseModel):
+    items: list[InboxItem]
+    version: str
+    truncated: bool = False
+
+
+class InboxDelta(BaseModel):
+    items: list[InboxItem]
+    version: str
+    # Изменений больше лимита: клиенту нужен новый снимок.
+    reset: bool = False
+
+
+class DialogSearchHit(BaseModel):
+    dialog: DialogShort
+    message_id: int
+    rank: float
+    match_count: int
+    snippet: str
+
+
+class DialogSearchResponse(BaseModel):
+    items: list[DialogSearchHit]
+    query: str
+    mode: str  # fulltext | trigram | like
 
 
 class DialogAssignRequest(BaseModel):
@@ -10,6 +10,9 @@ class KnowledgeFileOut(BaseModel):
     filename_original: str
     size_bytes: int
     total_chunks: int
+    status: str
+    embedded_chunks: int = 0
+    error_message: str | None = None
     created_at: datetime
 
     class Config:
@@ -29,6 +29,11 @@ class MessageOut(BaseModel):
         populate_by_name = True
 
 
+class MessagePage(BaseModel):
+    items: list[MessageOut]
+    has_more: bool
+
+
 class MessageSendRequest(BaseModel):
     dialog_id: int
     content: str = Field(..., min_length=1)
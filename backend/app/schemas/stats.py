@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel
+
+
+class MessagesByRole(BaseModel):
+    user: int
+    ai: int
+    admin: int
+
+
+class AiReplies(BaseModel):
+    total: int
+    fallback: int
+    used_rag: int
+    during_operator_wait: int
+
+
+class DurationStats(BaseModel):
+    count: int
+    avg_seconds: float | None = None
+
+
+class FirstResponseStats(DurationStats):
+    within_sla: int
+    sla_ratio: float | None = None
+
+
+class StatsOverview(BaseModel):
+    date_from: datetime
+    date_to: datetime
+    messages: MessagesByRole
+    ai: AiReplies
+    dialogs_created: int
+    escalations: int
+    first_response: FirstResponseStats
+    handle_time: DurationStats
+
+
+class SlaPoint(BaseModel):
+    bucket_start: datetime
+    first_response: FirstResponseStats
+    handle_time: DurationStats
+    escalations: int
+
+
+class StatsSla(BaseModel):
+    date_from: datetime
+    date_to: datetime
+    granularity: Literal["hour", "day"]
+    sla_target_seconds: int
+    items: list[SlaPoint]
@@ -1,11 +1,182 @@
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable
 
+from sqlalchemy import insert
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.db import SessionLocal
 from app.models import AuditLog
 
+logger = logging.getLogger(__name__)
+
+# Действия, которые всегда пишутся синхронно в транзакции запроса.
+SECURITY_ACTIONS = frozenset(
+    {
+        "pending_login_confirmed",
+        "admin_login",
+        "admin_logout",
+        "admin_created",
+        "admin_updated",
+        "update_ai_instructions",
+    }
+)
+
+
+class AuditSink:
+    """Буфер записей аудита с пакетной вставкой из фоновой задачи.
+
+    Буфер ограничен AUDIT_BUFFER_MAX_SIZE: если он заполнен (или задача не
+    запущена), submit возвращает False и запись идёт синхронным путём.
+    При остановке всё накопленное сбрасывается в БД.
+
+    Пачка, которую не удалось вставить, повторяется до AUDIT_FLUSH_MAX_RETRIES
+    раз, после чего строки пишутся по одной: строка с ошибкой данных
+    логируется и отбрасывается, чтобы не блокировать остальной буфер.
+    """
+
+    def __init__(
+        self,
+        *,
+        session_factory: Callable[[], Session] = SessionLocal,
+        max_size: int | None = None,
+        batch_size: int | None = None,
+        flush_interval: float | None = None,
+        max_retries: int | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self.max_size = max_size or settings.AUDIT_BUFFER_MAX_SIZE
+        self.batch_size = batch_size or settings.AUDIT_BATCH_SIZE
+        self.flush_interval = flush_interval or settings.AUDIT_FLUSH_INTERVAL_SECONDS
+        self.max_retries = max_retries if max_retries is not None else settings.AUDIT_FLUSH_MAX_RETRIES
+        self._buffer: deque[dict[str, Any]] = deque()
+        # Пачка после неудачной вставки и число попыток её записать.
+        self._retry: list[dict[str, Any]] = []
+        self._retry_attempts = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._buffer) + len(self._retry)
+
+    def submit(self, row: dict[str, Any]) -> bool:
+        if not self.running:
+            return False
+        with self._lock:
+            if len(self._buffer) >= self.max_size:
+                return False
+            self._buffer.append(row)
+            should_wake = len(self._buffer) >= self.batch_size
+        if should_wake and self._loop is not None and self._wakeup is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return True
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="audit-sink")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        while len(self):
+            if not await asyncio.to_thread(self.flush):
+                break
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while len(self):
+                if not await asyncio.to_thread(self.flush):
+                    break
+
+    def flush(self) -> int:
+        """Записать одну пачку; вернуть число вставленных строк (0 при ошибке)."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._retry = self._retry, []
+                if not batch:
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            if not batch:
+                return 0
+            if self._retry_attempts >= self.max_retries:
+                return self._flush_rows(batch)
+            db = self.session_factory()
+            try:
+                db.execute(insert(AuditLog), batch)
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._retry_attempts += 1
+                logger.exception(
+                    "Failed to flush %s audit records (attempt %s)", len(batch), self._retry_attempts
+                )
+                with self._lock:
+                    self._retry = batch
+                return 0
+            finally:
+                db.close()
+            self._retry_attempts = 0
+            return len(batch)
+
+    def _flush_rows(self, batch: list[dict[str, Any]]) -> int:
+        """Вставить пачку построчно, отбросив строки, которые БД не принимает."""
+        written = 0
+        for index, row in enumerate(batch):
+            db = self.session_factory()
+            try:
+                db.execute(insert(AuditLog), [row])
+                db.commit()
+                written += 1
+            except OperationalError:
+                # БД недоступна — дело не в строке; остаток ждёт следующего flush.
+                db.rollback()
+                logger.warning("Audit database unavailable, keeping %s records", len(batch) - index)
+                with self._lock:
+                    self._retry = batch[index:]
+                return written
+            except Exception:
+                db.rollback()
+                logger.exception("Dropping audit record %s: %r", row.get("action"), row)
+            finally:
+                db.close()
+        self._retry_attempts = 0
+        return written
+
+
+_audit_sink = AuditSink()
+
+
+def get_audit_sink() -> AuditSink:
+    return _audit_sink
+
 
 def log_action(
     db: Session,
@@ -14,10 +185,30 @@ def log_action(
     action: str,
     params: dict[str, Any] | None = None,
     commit: bool = False,
-) -> AuditLog:
-    """Сохраняет запись аудита."""
+    sync: bool | None = None,
+) -> AuditLog | None:
+    """
+    Сохраняет запись аудита.
+
+    По умолчанию запись уходит в буфер AuditSink и вставляется пачкой в фоне.
+    sync=True (и все действия из SECURITY_ACTIONS) пишет её в сессию запроса,
+    чтобы она была зафиксирована вместе с остальными изменениями. Возвращает
+    ORM-объект только для синхронной записи.
+    """
+
+    durable = sync if sync is not None else action in SECURITY_ACTIONS
+    row = {
+        "admin_id": admin_id,
+        "action": action,
+        "params": params or {},
+        "created_at": datetime.now(timezone.utc),
+    }
+    if not durable and _audit_sink.submit(row):
+        if commit:
+            db.commit()
+        return None
 
-    log = AuditLog(admin_id=admin_id, action=action, params=params or {})
+    log = AuditLog(**row)
     db.add(log)
     db.flush()
     if commit:
@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.timeutils import as_utc
+from app.models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+PARENT_TABLE = "audit_logs"
+DEFAULT_PARTITION = "audit_logs_default"
+_PARTITION_RE = re.compile(r"^audit_logs_y(\d{4})m(\d{2})$")
+_ARCHIVE_COLUMNS = ("id", "admin_id", "action", "params", "created_at")
+_ARCHIVE_CHUNK_SIZE = 1000
+
+
+def month_start(value: datetime) -> datetime:
+    value = as_utc(value)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + (value.month - 1) + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARENT_TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+@dataclass
+class AuditPartition:
+    name: str
+    start: datetime
+    end: datetime
+
+
+@dataclass
+class RetentionResult:
+    partition: str
+    rows: int
+    archive_path: str | None = None
+
+
+class AuditRetentionService:
+    """Секции audit_logs и политика хранения.
+
+    В PostgreSQL секции создаются заранее на months_ahead месяцев вперёд, а
+    секции старше keep_months отсоединяются (DETACH) и удаляются целиком —
+    без DELETE и последующего VACUUM. Перед удалением строки секции можно
+    выгрузить в ``<archive_dir>/audit_logs_yYYYYmMM.jsonl.gz``.
+    В остальных СУБД (SQLite в тестах) те же месяцы архивируются и удаляются
+    обычным DELETE по диапазону created_at.
+    """
+
+    def __init__(self, db: Session, *, archive_dir: str | Path | None = None) -> None:
+        self.db = db
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+        self.is_postgres = db.get_bind().dialect.name == "postgresql"
+
+    def list_partitions(self) -> list[AuditPartition]:
+        """Помесячные секции audit_logs (default-секция не включается)."""
+        if not self.is_postgres:
+            return []
+        names = self.db.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = :parent"
+            ),
+            {"parent": PARENT_TABLE},
+        ).scalars()
+        partitions = []
+        for name in names:
+            match = _PARTITION_RE.match(name)
+            if not match:
+                continue
+            start = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+            partitions.append(AuditPartition(name=name, start=start, end=add_months(start, 1)))
+        return sorted(partitions, key=lambda partition: partition.start)
+
+    def ensure_partitions(self, *, months_ahead: int | None = None, now: datetime | None = None) -> list[str]:
+        """Создать недостающие секции с текущего месяца на months_ahead вперёд.
+
+        Если строки месяца уже попали в default-секцию (например, обслуживание
+        не работало), секция создаётся с переносом этих строк, см.
+        _create_partition_from_default.
+        """
+        if not self.is_postgres:
+            return []
+        months_ahead = settings.AUDIT_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+        current = month_start(now or datetime.now(timezone.utc))
+        existing = {partition.name for partition in self.list_partitions()}
+        created = []
+        for offset in range(months_ahead + 1):
+            start = add_months(current, offset)
+            name = partition_name(start)
+            if name in existing:
+                continue
+            end = add_months(start, 1)
+            try:
+                if self._default_rows(start, end):
+                    self._create_partition_from_default(name, start, end)
+                else:
+                    self.db.execute(text(self._create_partition_sql(name, start, end)))
+                self.db.commit()
+            except Exception:
+                # Ошибка одного месяца не мешает создать остальные; повтор — на следующем запуске.
+                self.db.rollback()
+                logger.exception("Failed to create audit partition %s", name)
+                continue
+            created.append(name)
+        return created
+
+    @staticmethod
+    def _create_partition_sql(name: str, start: datetime, end: datetime) -> str:
+        return (
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF {PARENT_TABLE} '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+    def _default_rows(self, start: datetime, end: datetime) -> int:
+        return self.db.execute(
+            text(
+                f"SELECT count(*) FROM {DEFAULT_PARTITION} "
+                "WHERE created_at >= :start AND created_at < :end"
+            ),
+            {"start": start, "end": end},
+        ).scalar() or 0
+
+    def _create_partition_from_default(self, name: str, start: datetime, end: datetime) -> None:
+        """Создать секцию месяца, строки которого уже лежат в default-секции.
+
+        CREATE ... PARTITION OF в этом случае падает: PostgreSQL проверяет, что
+        default-секция не содержит строк нового диапазона. Поэтому в одной
+        транзакции default отсоединяется, строки месяца переносятся в новую
+        секцию и default подсоединяется обратно. Вставки в audit_logs на это
+        время ждут блокировки, а не падают.
+        """
+        window = {"start": start, "end": end}
+        in_month = "created_at >= :start AND created_at < :end"
+        self.db.execute(text(f"ALTER TABLE {PARENT_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+        self.db.execute(text(self._create_partition_sql(name, start, end)))
+        moved = self.db.execute(
+            text(f'INSERT INTO "{name}" SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}'), window
+        ).rowcount
+        self.db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}"), window)
+        self.db.execute(text(f"ALTER TABLE {PARENT_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+        logger.warning("Moved %s audit rows from %s into new partition %s", moved, DEFAULT_PARTITION, name)
+
+    def apply_retention(self, *, keep_months: int | None = None, now: datetime | None = None) -> list[RetentionResult]:
+        """Удалить (и при archive_dir — заархивировать) месяцы старше keep_months."""
+        keep_months = settings.AUDIT_RETENTION_MONTHS if keep_months is None else keep_months
+        if keep_months <= 0:
+            return []
+        cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -keep_months)
+        if self.is_postgres:
+            return self._drop_partitions(cutoff)
+        return self._delete_months(cutoff)
+
+    def _drop_partitions(self, cutoff: datetime) -> list[RetentionResult]:
+        results = []
+        for partition in self.list_partitions():
+            if partition.end > cutoff:
+                break
+            archive_path = None
+            if self.archive_dir:
+                archive_path = self._archive(
+                    partition.name,
+                    select(*(text(column) for column in _ARCHIVE_COLUMNS))
+                    .select_from(text(f'"{partition.name}"'))
+                    .order_by(text("id")),
+                )
+            rows = self.db.execute(text(f'SELECT count(*) FROM "{partition.name}"')).scalar() or 0
+            self.db.execute(text(f'ALTER TABLE {PARENT_TABLE} DETACH PARTITION "{partition.name}"'))
+            self.db.execute(text(f'DROP TABLE "{partition.name}"'))
+            self.db.commit()
+            logger.info("Dropped audit partition %s (%s rows)", partition.name, rows)
+            results.append(RetentionResult(partition=partition.name, rows=rows, archive_path=archive_path))
+        return results
+
+    def _delete_months(self, cutoff: datetime) -> list[RetentionResult]:
+        oldest = self.db.execute(select(func.min(AuditLog.created_at))).scalar()
+        if oldest is None:
+            return []
+        results = []
+        start = month_start(oldest)
+        while start < cutoff:
+            end = add_months(start, 1)
+            in_month = (AuditLog.created_at >= start, AuditLog.created_at < end)
+            name = partition_name(start)
+            archive_path = None
+            if self.archive_dir:
+                archive_path = self._archive(
+                    name,
+                    select(*(getattr(AuditLog, column) for column in _ARCHIVE_COLUMNS))
+                    .where(*in_month)
+                    .order_by(AuditLog.id),
+                )
+            rows = self.db.execute(delete(AuditLog).where(*in_month)).rowcount or 0
+            self.db.commit()
+            if rows:
+                results.append(RetentionResult(partition=name, rows=rows, archive_path=archive_path))
+            start = end
+        return results
+
+    def _archive(self, name: str, stmt) -> str | None:
+        """Выгрузить строки в gzip JSONL; файл появляется только после полной записи."""
+        assert self.archive_dir is not None
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        target = self.archive_dir / f"{name}.jsonl.gz"
+        partial = target.with_name(target.name + ".part")
+        written = 0
+        with gzip.open(partial, "wt", encoding="utf-8") as archive:
+            result = self.db.execute(stmt.execution_options(yield_per=_ARCHIVE_CHUNK_SIZE))
+            for row in result:
+                record = dict(zip(_ARCHIVE_COLUMNS, row))
+                if isinstance(record["params"], str):
+                    record["params"] = json.loads(record["params"])
+                archive.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                written += 1
+        if not written:
+            partial.unlink()
+            return None
+        os.replace(partial, target)
+        return str(target)
+
+
+def run_audit_maintenance(db: Session) -> list[RetentionResult]:
+    """Создать будущие секции и применить политику хранения из настроек."""
+    service = AuditRetentionService(db, archive_dir=settings.AUDIT_ARCHIVE_DIR)
+    service.ensure_partitions()
+    return service.apply_retention()
+
+
+if __name__ == "__main__":
+    from app.core.db import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    session = SessionLocal()
+    try:
+        for item in run_audit_maintenance(session):
+            print(f"{item.partition}: {item.rows} rows" + (f" -> {item.archive_path}" if item.archive_path else ""))
+    finally:
+        session.close()
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from fastapi import HTTPException, status
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
+
+from app.core.timeutils import as_utc
+from app.models import Dialog
+
+LOCK_TIMEOUT = timedelta(minutes=5)
+
+
+class DialogLockService:
+    """Блокировка диалога оператором через compare-and-set.
+
+    Проверка «свободен / истёк / уже мой» и захват выполняются одним
+    ``UPDATE ... WHERE ... RETURNING``: из нескольких одновременных попыток
+    побеждает ровно одна, без отдельного SELECT перед записью. Причина отказа
+    (404/403/409) выясняется дополнительным запросом только на неудачном пути.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    def acquire(
+        self,
+        dialog_id: int,
+        *,
+        admin_id: int,
+        holder_id: int | None = None,
+        force: bool = False,
+        require_assignment: bool = False,
+        ttl: timedelta = LOCK_TIMEOUT,
+        now: datetime | None = None,
+        values: dict[str, Any] | None = None,
+    ) -> Dialog:
+        """
+        Захватить (или продлить) блокировку и вернуть обновлённый диалог.
+
+        admin_id — кто выполняет действие: чужая актуальная блокировка даёт 409.
+        holder_id — на кого оформить блокировку (по умолчанию admin_id).
+        force — игнорировать чужую блокировку (суперадмин).
+        require_assignment — диалог не назначен никому или назначен admin_id, иначе 403.
+        values — дополнительные поля, записываемые тем же UPDATE. Это Core-запрос,
+        слушатели статистики (app.services.stats) его не видят.
+        """
+        now = now or datetime.now(timezone.utc)
+        holder_id = admin_id if holder_id is None else holder_id
+        conditions = [Dialog.id == dialog_id]
+        if not force:
+            conditions.append(
+                or_(
+                    Dialog.is_locked.is_not(True),
+                    Dialog.locked_by_admin_id.is_(None),
+                    Dialog.locked_by_admin_id == admin_id,
+                    Dialog.locked_until.is_(None),
+                    Dialog.locked_until <= now,
+                )
+            )
+        if require_assignment:
+            conditions.append(or_(Dialog.assigned_admin_id.is_(None), Dialog.assigned_admin_id == admin_id))
+
+        stmt = (
+            update(Dialog)
+            .where(*conditions)
+            .values(
+                is_locked=True,
+                locked_by_admin_id=holder_id,
+                locked_until=now + ttl,
+                **(values or {}),
+            )
+            .returning(Dialog)
+        )
+        dialog = self.db.scalars(
+            stmt,
+            execution_options={"synchronize_session": False, "populate_existing": True},
+        ).first()
+        if dialog is None:
+            self._raise_failure(
+                dialog_id, admin_id=admin_id, force=force, require_assignment=require_assignment, now=now
+            )
+        return dialog
+
+    def release(self, dialog_id: int, *, admin_id: int | None = None) -> bool:
+        """Снять блокировку; с admin_id — только если она принадлежит ему или истекла."""
+        conditions = [Dialog.id == dialog_id, Dialog.is_locked.is_(True)]
+        if admin_id is not None:
+            conditions.append(
+                or_(
+                    Dialog.locked_by_admin_id.is_(None),
+                    Dialog.locked_by_admin_id == admin_id,
+                    Dialog.locked_until <= datetime.now(timezone.utc),
+                )
+            )
+        result = self.db.execute(
+            update(Dialog)
+            .where(*conditions)
+            .values(is_locked=False, locked_by_admin_id=None, locked_until=None),
+            execution_options={"synchronize_session": "fetch"},
+        )
+        return bool(result.rowcount)
+
+    def _raise_failure(
+        self,
+        dialog_id: int,
+        *,
+        admin_id: int,
+        force: bool,
+        require_assignment: bool,
+        now: datetime,
+    ) -> None:
+        current = self.db.get(Dialog, dialog_id, populate_existing=True)
+        if current is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Dialog not found")
+        locked_by_other = (
+            current.is_locked
+            and current.locked_by_admin_id not in {None, admin_id}
+            and current.locked_until is not None
+            and as_utc(current.locked_until) > now
+        )
+        if not force and locked_by_other:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Dialog locked by another admin")
+        if require_assignment and current.assigned_admin_id not in {None, admin_id}:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Dialog assigned to another admin")
+        # Состояние успело измениться между UPDATE и чтением — отвечаем конфликтом.
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Dialog locked by another admin")
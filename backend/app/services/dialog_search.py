@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import html
+import re
+from dataclasses import dataclass
+
+from sqlalchemy import Select, desc, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.models import Dialog, DialogStatus, Message
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+SNIPPET_RADIUS = 60
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_HEADLINE_OPTIONS = (
+    f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_STOP}, "
+    "MaxWords=25, MinWords=8, MaxFragments=2, FragmentDelimiter= … "
+)
+
+
+@dataclass
+class DialogSearchHit:
+    dialog_id: int
+    message_id: int
+    rank: float
+    match_count: int
+    snippet: str
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def build_prefix_query(term: str) -> str | None:
+    """Запрос для to_tsquery('simple', ...): каждое слово — префикс (``слово:*``)."""
+    tokens = _TOKEN_RE.findall(term.lower())
+    if not tokens:
+        return None
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def _escape(value: str) -> str:
+    return html.escape(value, quote=False)
+
+
+def _sql_escape(column):
+    """То же экранирование в SQL: ts_headline должен получить уже безопасный текст."""
+    for char, entity in (("&", "&amp;"), ("<", "&lt;"), (">", "&gt;")):
+        column = func.replace(column, char, entity)
+    return column
+
+
+def make_snippet(content: str, term: str, *, radius: int = SNIPPET_RADIUS) -> str:
+    """Фрагмент вокруг первого вхождения term с подсветкой (для trigram/SQLite).
+
+    Результат — HTML: текст сообщения экранируется, размечены только <mark>.
+    """
+    lowered = content.lower()
+    position = lowered.find(term.lower())
+    if position < 0:
+        return _escape(content[: radius * 2].strip())
+    start = max(position - radius, 0)
+    end = min(position + len(term) + radius, len(content))
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if end < len(content) else ""
+    return (
+        f"{prefix}{_escape(content[start:position])}{HIGHLIGHT_START}"
+        f"{_escape(content[position:position + len(term)])}{HIGHLIGHT_STOP}"
+        f"{_escape(content[position + len(term):end])}{suffix}"
+    )
+
+
+class DialogSearchService:
+    """Поиск диалогов по тексту сообщений.
+
+    В PostgreSQL используется tsvector (russian + simple) с GIN-индексом, а для
+    частей слов и опечаток — pg_trgm. В остальных СУБД (SQLite в тестах) —
+    подстрочный поиск через ILIKE.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+        self.is_postgres = db.get_bind().dialect.name == "postgresql"
+
+    def _ts_query(self, term: str):
+        query = func.websearch_to_tsquery("russian", term)
+        prefix = build_prefix_query(term)
+        if prefix:
+            query = query.op("||")(func.to_tsquery("simple", prefix))
+        return query
+
+    def matching_dialog_ids(self, term: str) -> Select:
+        """Подзапрос id диалогов, в сообщениях которых встречается term."""
+        pattern = _like_pattern(term)
+        if self.is_postgres:
+            condition = or_(
+                Message.search_vector.op("@@")(self._ts_query(term)),
+                Message.content.ilike(pattern, escape="\\"),
+            )
+        else:
+            condition = Message.content.ilike(pattern, escape="\\")
+        return select(Message.dialog_id).where(condition)
+
+    def search(
+        self,
+        term: str,
+        *,
+        limit: int = 20,
+        status: DialogStatus | None = None,
+    ) -> tuple[list[DialogSearchHit], str]:
+        """Ранжированный список совпадений и режим поиска (fulltext/trigram/like)."""
+        term = term.strip()
+        if not term:
+            return [], "like"
+        if self.is_postgres:
+            hits = self._search_fulltext(term, limit=limit, status=status)
+            if hits:
+                return hits, "fulltext"
+            return self._search_substring(term, limit=limit, status=status, fuzzy=True), "trigram"
+        return self._search_substring(term, limit=limit, status=status, fuzzy=False), "like"
+
+    def _grouped(self, condition, rank, *, limit: int, status: DialogStatus | None) -> list:
+        """Совпадения, сгруппированные по диалогу; rank — агрегатное выражение."""
+        stmt = (
+            select(
+                Message.dialog_id,
+                func.count(Message.id).label("match_count"),
+                rank.label("rank"),
+                func.max(Message.id).label("message_id"),
+            )
+            .where(condition)
+            .group_by(Message.dialog_id)
+            .order_by(desc("rank"), desc("message_id"))
+            .limit(limit)
+        )
+        if status:
+            stmt = stmt.join(Dialog, Dialog.id == Message.dialog_id).where(Dialog.status == status)
+        return self.db.execute(stmt).all()
+
+    def _search_fulltext(self, term: str, *, limit: int, status: DialogStatus | None) -> list[DialogSearchHit]:
+        ts_query = self._ts_query(term)
+        rows = self._grouped(
+            Message.search_vector.op("@@")(ts_query),
+            func.max(func.ts_rank_cd(Message.search_vector, ts_query)),
+            limit=limit,
+            status=status,
+        )
+        if not rows:
+            return []
+        headlines = dict(
+            self.db.execute(
+                select(
+                    Message.id,
+                    func.ts_headline("russian", _sql_escape(Message.content), ts_query, _HEADLINE_OPTIONS),
+                ).where(Message.id.in_([row.message_id for row in rows]))
+            ).all()
+        )
+        return [
+            DialogSearchHit(
+                dialog_id=row.dialog_id,
+                message_id=row.message_id,
+                rank=float(row.rank or 0.0),
+                match_count=row.match_count,
+                snippet=headlines.get(row.message_id, ""),
+            )
+            for row in rows
+        ]
+
+    def _search_substring(
+        self,
+        term: str,
+        *,
+        limit: int,
+        status: DialogStatus | None,
+        fuzzy: bool,
+    ) -> list[DialogSearchHit]:
+        condition = Message.content.ilike(_like_pattern(term), escape="\\")
+        if fuzzy:
+            # word_similarity покрывает опечатки и части слов; оба условия идут по trigram-индексу.
+            condition = or_(condition, Message.content.op("%>")(term))
+            rank = func.max(func.word_similarity(term, Message.content))
+        else:
+            rank = func.count(Message.id)
+        rows = self._grouped(condition, rank, limit=limit, status=status)
+        if not rows:
+            return []
+        contents = dict(
+            self.db.execute(
+                select(Message.id, Message.content).where(Message.id.in_([row.message_id for row in rows]))
+            ).all()
+        )
+        return [
+            DialogSearchHit(
+                dialog_id=row.dialog_id,
+                message_id=row.message_id,
+                rank=float(row.rank or 0.0),
+                match_count=row.match_count,
+                snippet=make_snippet(contents.get(row.message_id, ""), term),
+            )
+            for row in rows
+        ]
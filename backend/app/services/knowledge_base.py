@@ -9,8 +9,8 @@ from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.models import KnowledgeChunk, KnowledgeFile
-from app.services import chunking, embedding_service, text_extractor
+from app.models import KnowledgeFile, KnowledgeFileStatus
+from app.services import text_extractor
 
 logger = logging.getLogger(__name__)
 
@@ -43,6 +43,7 @@ class KnowledgeBaseService:
         return content, ext
 
     async def create_from_upload(self, upload_file: UploadFile) -> KnowledgeFile:
+        """Сохранить файл в очередь на обработку; текст и эмбеддинги считает KnowledgeIngestion."""
         content, ext = await self._read_file(upload_file)
         unique_name = f"{uuid4().hex}{ext}"
         stored_path = self.storage_dir / unique_name
@@ -54,19 +55,16 @@ class KnowledgeBaseService:
             mime_type=upload_file.content_type,
             size_bytes=len(content),
             total_chunks=0,
+            status=KnowledgeFileStatus.QUEUED.value,
         )
         self.db.add(knowledge_file)
-        self.db.commit()
-        self.db.refresh(knowledge_file)
-
         try:
-            await self._process_file(knowledge_file, ext)
+            self.db.commit()
         except Exception:
-            logger.exception("Failed to process knowledge file %s", knowledge_file.id)
+            self.db.rollback()
             self._safe_delete_file(stored_path)
-            self.db.delete(knowledge_file)
-            self.db.commit()
             raise
+        self.db.refresh(knowledge_file)
         return knowledge_file
 
     def _safe_delete_file(self, stored_path: Path | str) -> None:
@@ -81,33 +79,3 @@ class KnowledgeBaseService:
         self._safe_delete_file(file.stored_path)
         self.db.delete(file)
         self.db.commit()
-
-    async def _process_file(self, knowledge_file: KnowledgeFile, ext: str) -> None:
-        text = text_extractor.extract_text(Path(knowledge_file.stored_path), extension=ext)
-        chunks = chunking.split_into_chunks(text)
-        if not chunks:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Не удалось подготовить чанк")
-        existing = self.db.query(KnowledgeChunk).filter(KnowledgeChunk.file_id == knowledge_file.id)
-        for chunk in existing:
-            self.db.delete(chunk)
-        self.db.flush()
-
-        for index, chunk_text in enumerate(chunks):
-            chunk = KnowledgeChunk(file_id=knowledge_file.id, chunk_index=index, text=chunk_text)
-            self.db.add(chunk)
-        knowledge_file.total_chunks = len(chunks)
-        self.db.commit()
-
-        await self._recompute_embeddings(knowledge_file.id)
-
-    async def _recompute_embeddings(self, file_id: int) -> None:
-        chunks = (
-            self.db.query(KnowledgeChunk)
-            .filter(KnowledgeChunk.file_id == file_id)
-            .order_by(KnowledgeChunk.chunk_index.asc())
-            .all()
-        )
-        for chunk in chunks:
-            chunk.embedding = await embedding_service.get_text_embedding(chunk.text)
-            self.db.add(chunk)
-        self.db.commit()
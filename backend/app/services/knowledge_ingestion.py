@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, Callable
+
+from fastapi import HTTPException
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.ws_manager import WebSocketManager, get_ws_manager
+from app.models import KnowledgeChunk, KnowledgeFile, KnowledgeFileStatus
+from app.services import chunking, embedding_service, text_extractor
+from app.services.ws_payloads import knowledge_file_payload
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVENT = "knowledge.progress"
+
+# Стадии, на которых файл мог остаться после падения процесса.
+IN_PROGRESS_STATUSES = (
+    KnowledgeFileStatus.EXTRACTING.value,
+    KnowledgeFileStatus.CHUNKING.value,
+    KnowledgeFileStatus.EMBEDDING.value,
+)
+
+
+class _FileDeleted(Exception):
+    """Файл удалили, пока он обрабатывался."""
+
+
+class KnowledgeIngestion:
+    """Фоновая обработка загруженных файлов базы знаний.
+
+    Загрузка только сохраняет файл со статусом queued; извлечение текста,
+    нарезка и эмбеддинги выполняются здесь, по одному файлу за раз. Каждая
+    смена стадии и каждая пачка эмбеддингов рассылается в канал system
+    событием knowledge.progress. В поиск RAG файл попадает только в ready.
+    """
+
+    def __init__(
+        self,
+        *,
+        session_factory: Callable[[], Session] = SessionLocal,
+        ws_manager: WebSocketManager | None = None,
+        batch_size: int | None = None,
+    ) -> None:
+        self.session_factory = session_factory
+        self._ws_manager = ws_manager
+        self.batch_size = batch_size or settings.KNOWLEDGE_EMBEDDING_BATCH_SIZE
+        self._queue: asyncio.Queue[int] | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def ws_manager(self) -> WebSocketManager:
+        return self._ws_manager or get_ws_manager()
+
+    def _ensure_worker(self) -> asyncio.Queue[int]:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._worker(), name="knowledge-ingestion")
+        return self._queue
+
+    async def submit(self, file_id: int) -> None:
+        self._ensure_worker().put_nowait(file_id)
+
+    async def join(self) -> None:
+        """Дождаться обработки всего, что уже поставлено в очередь."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def start(self) -> None:
+        """Вернуть в очередь файлы, обработка которых прервалась перезапуском."""
+        file_ids = await asyncio.to_thread(self._pending_file_ids)
+        for file_id in file_ids:
+            await self.submit(file_id)
+        if file_ids:
+            logger.info("Requeued %s unfinished knowledge files", len(file_ids))
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        self._queue = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def _pending_file_ids(self) -> list[int]:
+        db = self.session_factory()
+        try:
+            db.query(KnowledgeFile).filter(KnowledgeFile.status.in_(IN_PROGRESS_STATUSES)).update(
+                {KnowledgeFile.status: KnowledgeFileStatus.QUEUED.value}, synchronize_session=False
+            )
+            db.commit()
+            rows = (
+                db.query(KnowledgeFile.id)
+                .filter(KnowledgeFile.status == KnowledgeFileStatus.QUEUED.value)
+                .order_by(KnowledgeFile.id.asc())
+                .all()
+            )
+            return [row.id for row in rows]
+        finally:
+            db.close()
+
+    async def _worker(self) -> None:
+        queue = self._queue
+        assert queue is not None
+        while True:
+            file_id = await queue.get()
+            try:
+                await self.process(file_id)
+            except Exception:
+                logger.exception("Knowledge ingestion of file %s crashed", file_id)
+            finally:
+                queue.task_done()
+
+    async def process(self, file_id: int) -> None:
+        try:
+            if not await self._run(self._claim, file_id):
+                return
+            await self._run_stages(file_id)
+        except _FileDeleted:
+            logger.info("Knowledge file %s was deleted during ingestion", file_id)
+        except Exception as exc:
+            logger.exception("Failed to process knowledge file %s", file_id)
+            await self._fail(file_id, exc)
+
+    async def _run(self, stage: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Выполнить стадию в пуле потоков на короткой собственной сессии."""
+
+        def call() -> Any:
+            db = self.session_factory()
+            try:
+                return stage(db, *args, **kwargs)
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        return await asyncio.to_thread(call)
+
+    def _claim(self, db: Session, file_id: int) -> bool:
+        # Условный UPDATE: при нескольких воркерах файл достанется одному.
+        claimed = (
+            db.query(KnowledgeFile)
+            .filter(
+                KnowledgeFile.id == file_id,
+                KnowledgeFile.status == KnowledgeFileStatus.QUEUED.value,
+            )
+            .update(
+                {KnowledgeFile.status: KnowledgeFileStatus.EXTRACTING.value, KnowledgeFile.error_message: None},
+                synchronize_session=False,
+            )
+        )
+        db.commit()
+        return bool(claimed)
+
+    def _load(self, db: Session, file_id: int) -> KnowledgeFile:
+        knowledge_file = db.get(KnowledgeFile, file_id)
+        if knowledge_file is None:
+            raise _FileDeleted(file_id)
+        return knowledge_file
+
+    def _progress(self, db: Session, knowledge_file: KnowledgeFile) -> dict:
+        """Зафиксировать изменения и собрать событие, пока сессия открыта."""
+        db.commit()
+        db.refresh(knowledge_file)
+        return knowledge_file_payload(knowledge_file, event=PROGRESS_EVENT)
+
+    def _snapshot(self, db: Session, file_id: int) -> tuple[str, dict]:
+        knowledge_file = self._load(db, file_id)
+        return knowledge_file.stored_path, knowledge_file_payload(knowledge_file, event=PROGRESS_EVENT)
+
+    def _set_status(self, db: Session, file_id: int, status: KnowledgeFileStatus, **values: Any) -> dict:
+        knowledge_file = self._load(db, file_id)
+        knowledge_file.status = status.value
+        for key, value in values.items():
+            setattr(knowledge_file, key, value)
+        return self._progress(db, knowledge_file)
+
+    async def _report(self, payload: dict) -> None:
+        await self.ws_manager.broadcast("system", payload)
+
+    async def _run_stages(self, file_id: int) -> None:
+        stored_path, payload = await self._run(self._snapshot, file_id)
+        await self._report(payload)
+        path = Path(stored_path)
+        text = await asyncio.to_thread(text_extractor.extract_text, path, extension=path.suffix.lower())
+
+        await self._report(await self._run(self._set_status, file_id, KnowledgeFileStatus.CHUNKING))
+        chunks = await asyncio.to_thread(chunking.split_into_chunks, text)
+        if not chunks:
+            raise HTTPException(status_code=400, detail="Не удалось подготовить чанк")
+        chunk_ids = await self._run(self._replace_chunks, file_id, chunks)
+
+        await self._report(
+            await self._run(self._set_status, file_id, KnowledgeFileStatus.EMBEDDING, embedded_chunks=0)
+        )
+        for start in range(0, len(chunks), self.batch_size):
+            batch_ids = chunk_ids[start : start + self.batch_size]
+            # Эмбеддинги пачки запрашиваются параллельно; размер пачки ограничивает нагрузку на API.
+            vectors = await asyncio.gather(
+                *(embedding_service.get_text_embedding(text) for text in chunks[start : start + self.batch_size])
+            )
+            await self._report(await self._run(self._store_embeddings, file_id, batch_ids, list(vectors)))
+
+        await self._report(await self._run(self._set_status, file_id, KnowledgeFileStatus.READY))
+
+    def _replace_chunks(self, db: Session, file_id: int, chunks: list[str]) -> list[int]:
+        knowledge_file = self._load(db, file_id)
+        db.query(KnowledgeChunk).filter(KnowledgeChunk.file_id == file_id).delete(synchronize_session=False)
+        rows = [KnowledgeChunk(file_id=file_id, chunk_index=index, text=text) for index, text in enumerate(chunks)]
+        db.add_all(rows)
+        knowledge_file.total_chunks = len(chunks)
+        db.commit()
+        return [row.id for row in rows]
+
+    def _store_embeddings(
+        self, db: Session, file_id: int, chunk_ids: list[int], vectors: list[list[float]]
+    ) -> dict:
+        knowledge_file = self._load(db, file_id)
+        # Один executemany на пачку вместо UPDATE на каждый чанк.
+        db.execute(
+            update(KnowledgeChunk),
+            [{"id": chunk_id, "embedding": vector} for chunk_id, vector in zip(chunk_ids, vectors)],
+        )
+        knowledge_file.embedded_chunks = (knowledge_file.embedded_chunks or 0) + len(chunk_ids)
+        return self._progress(db, knowledge_file)
+
+    async def _fail(self, file_id: int, exc: Exception) -> None:
+        message = exc.detail if isinstance(exc, HTTPException) else "Не удалось обработать файл"
+        try:
+            payload = await self._run(self._mark_failed, file_id, str(message))
+        except _FileDeleted:
+            return
+        await self._report(payload)
+
+    def _mark_failed(self, db: Session, file_id: int, message: str) -> dict:
+        db.query(KnowledgeChunk).filter(KnowledgeChunk.file_id == file_id).delete(synchronize_session=False)
+        return self._set_status(
+            db,
+            file_id,
+            KnowledgeFileStatus.FAILED,
+            error_message=message,
+            total_chunks=0,
+            embedded_chunks=0,
+        )
+
+
+_knowledge_ingestion: KnowledgeIngestion | None = None
+
+
+def get_knowledge_ingestion() -> KnowledgeIngestion:
+    global _knowledge_ingestion
+    if _knowledge_ingestion is None:
+        _knowledge_ingestion = KnowledgeIngestion()
+    return _knowledge_ingestion
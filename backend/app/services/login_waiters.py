@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.core.db import engine as default_engine
+from app.core.pg_listener import PgNotifyListener
+
+LOGIN_NOTIFY_CHANNEL = "pending_login_confirmed"
+
+
+class LoginWaiters:
+    """Реестр ожидающих подтверждения входа запросов в памяти воркера.
+
+    Ожидание — future в цикле событий запроса; notify можно вызывать из любого
+    потока (синхронные эндпоинты, поток LISTEN), результат доставляется через
+    call_soon_threadsafe.
+    """
+
+    def __init__(self) -> None:
+        self._waiters: dict[str, set[asyncio.Future[None]]] = {}
+        self._lock = threading.Lock()
+
+    @asynccontextmanager
+    async def subscribe(self, token: str) -> AsyncIterator[asyncio.Future[None]]:
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        with self._lock:
+            self._waiters.setdefault(token, set()).add(future)
+        try:
+            yield future
+        finally:
+            with self._lock:
+                futures = self._waiters.get(token)
+                if futures is not None:
+                    futures.discard(future)
+                    if not futures:
+                        del self._waiters[token]
+
+    def notify(self, token: str) -> int:
+        """Разбудить всех ожидающих token; вернуть их количество."""
+        with self._lock:
+            futures = list(self._waiters.get(token, ()))
+        for future in futures:
+            future.get_loop().call_soon_threadsafe(_resolve, future)
+        return len(futures)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(futures) for futures in self._waiters.values())
+
+
+def _resolve(future: asyncio.Future[None]) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+def publish_login_confirmed(db: Session, token: str) -> None:
+    """
+    Поставить уведомление о подтверждении входа для других воркеров.
+
+    В PostgreSQL это pg_notify в текущей транзакции: слушатели получат его
+    только после commit. Ожидающих в своём процессе будит notify реестра.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_notify(:channel, :token)"), {"channel": LOGIN_NOTIFY_CHANNEL, "token": token})
+
+
+class LoginNotifyListener(PgNotifyListener):
+    """LISTEN подтверждений входа: токены из других воркеров будят ожидающих здесь."""
+
+    def __init__(self, waiters: LoginWaiters, *, engine: Engine = default_engine) -> None:
+        super().__init__(LOGIN_NOTIFY_CHANNEL, waiters.notify, engine=engine)
+
+
+_login_waiters = LoginWaiters()
+
+
+def get_login_waiters() -> LoginWaiters:
+    return _login_waiters
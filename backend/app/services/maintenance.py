@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import delete, or_, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.db import SessionLocal, engine as default_engine
+from app.core.ws_manager import get_ws_manager
+from app.models import Dialog, PendingLogin, WsEventPayload
+from app.services.audit import log_action
+from app.services.audit_partitions import run_audit_maintenance
+from app.services.security import PENDING_LOGIN_TTL
+from app.services.ws_payloads import dialogs_unlocked_payload
+
+logger = logging.getLogger(__name__)
+
+# Ключ pg_advisory_lock, которым воркеры выбирают единственного исполнителя задач.
+ADVISORY_LOCK_KEY = 0x67_6F_74_76  # "gotv"
+UNLOCK_NOTIFY_BATCH_SIZE = 500
+
+
+def release_expired_locks(db: Session, *, now: datetime | None = None) -> list[int]:
+    """
+    Снять все протухшие блокировки диалогов одним UPDATE; вернуть id диалогов.
+
+    Блокировка без locked_until тоже считается снятой: DialogLockService
+    такую не соблюдает, а в списке диалог висел бы запертым.
+    """
+    now = now or datetime.now(timezone.utc)
+    dialog_ids = list(
+        db.execute(
+            update(Dialog)
+            .where(Dialog.is_locked.is_(True), or_(Dialog.locked_until.is_(None), Dialog.locked_until < now))
+            .values(is_locked=False, locked_by_admin_id=None, locked_until=None)
+            .returning(Dialog.id)
+            .execution_options(synchronize_session=False)
+        ).scalars()
+    )
+    for dialog_id in dialog_ids:
+        log_action(db, admin_id=None, action="dialog_unlocked", params={"dialog_id": dialog_id})
+    db.commit()
+    return dialog_ids
+
+
+async def notify_unlocked(dialog_ids: list[int]) -> None:
+    """Разослать снятые блокировки пачками, а не отдельным событием на диалог."""
+    ws_manager = get_ws_manager()
+    for start in range(0, len(dialog_ids), UNLOCK_NOTIFY_BATCH_SIZE):
+        batch = dialog_ids[start:start + UNLOCK_NOTIFY_BATCH_SIZE]
+        await ws_manager.broadcast("dialogs", dialogs_unlocked_payload(batch))
+
+
+def purge_pending_logins(db: Session, *, now: datetime | None = None) -> int:
+    """
+    Удалить давно истёкшие pending_login.
+
+    Строки живут ещё MAINTENANCE_PENDING_LOGIN_GRACE_SECONDS после истечения,
+    чтобы /auth/status успел ответить клиенту "expired", а не 404.
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - PENDING_LOGIN_TTL - timedelta(seconds=settings.MAINTENANCE_PENDING_LOGIN_GRACE_SECONDS)
+    deleted = db.execute(
+        delete(PendingLogin)
+        .where(PendingLogin.created_at < cutoff)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return deleted or 0
+
+
+def purge_event_payloads(db: Session, *, now: datetime | None = None) -> int:
+    """Удалить тела событий шины, которые воркеры уже успели прочитать."""
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=settings.WS_EVENT_PAYLOAD_RETENTION_SECONDS)
+    deleted = db.execute(
+        delete(WsEventPayload)
+        .where(WsEventPayload.created_at < cutoff)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.commit()
+    return deleted or 0
+
+
+@dataclass
+class MaintenanceJob:
+    name: str
+    interval: float
+    run: Callable[[Session], Any]
+    notify: Callable[[Any], Awaitable[None]] | None = None
+    next_run: float = field(default=0.0, compare=False)
+
+
+def default_jobs() -> list[MaintenanceJob]:
+    return [
+        MaintenanceJob(
+            "release_expired_locks",
+            settings.MAINTENANCE_INTERVAL_SECONDS,
+            release_expired_locks,
+            notify=notify_unlocked,
+        ),
+        MaintenanceJob("purge_pending_logins", settings.MAINTENANCE_INTERVAL_SECONDS, purge_pending_logins),
+        MaintenanceJob("purge_event_payloads", settings.MAINTENANCE_INTERVAL_SECONDS, purge_event_payloads),
+        MaintenanceJob("audit_partitions", settings.AUDIT_MAINTENANCE_INTERVAL_SECONDS, run_audit_maintenance),
+    ]
+
+
+class MaintenanceScheduler:
+    """Периодические служебные задачи внутри процесса приложения.
+
+    Задачи выполняет только лидер: в PostgreSQL им становится воркер, взявший
+    сессионный pg_try_advisory_lock на отдельном соединении; остальные воркеры
+    каждый тик лишь пробуют перехватить лидерство. Если соединение лидера
+    обрывается, блокировка снимается сервером и её забирает другой воркер.
+    """
+
+    def __init__(
+        self,
+        *,
+        jobs: list[MaintenanceJob] | None = None,
+        engine: Engine = default_engine,
+        session_factory: Callable[[], Session] = SessionLocal,
+        tick: float | None = None,
+        lock_key: int = ADVISORY_LOCK_KEY,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.jobs = jobs if jobs is not None else default_jobs()
+        self.engine = engine
+        self.session_factory = session_factory
+        self.tick = tick or settings.MAINTENANCE_TICK_SECONDS
+        self.lock_key = lock_key
+        self._clock = clock
+        self._leader_connection: Connection | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self.engine.dialect.name != "postgresql" or self._leader_connection is not None
+
+    def _ensure_leadership(self) -> bool:
+        if self.engine.dialect.name != "postgresql":
+            return True
+        if self._leader_connection is not None:
+            try:
+                self._leader_connection.execute(text("SELECT 1"))
+                self._leader_connection.commit()
+                return True
+            except Exception:
+                logger.warning("Lost maintenance leader connection")
+                self._release_leadership()
+        connection = self.engine.connect()
+        try:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+            ).scalar()
+            # Блокировка сессионная: транзакцию можно закрыть, соединение — нет.
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return False
+        logger.info("Acquired maintenance leadership")
+        self._leader_connection = connection
+        return True
+
+    def _release_leadership(self) -> None:
+        connection, self._leader_connection = self._leader_connection, None
+        if connection is None:
+            return
+        try:
+            connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key})
+            connection.commit()
+        except Exception:
+            pass
+        finally:
+            connection.close()
+
+    def _run_job(self, job: MaintenanceJob) -> Any:
+        db = self.session_factory()
+        try:
+            return job.run(db)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def run_pending(self) -> dict[str, Any]:
+        """Выполнить задачи, у которых подошёл срок; вернуть их результаты."""
+        if not await asyncio.to_thread(self._ensure_leadership):
+            return {}
+        results: dict[str, Any] = {}
+        for job in self.jobs:
+            now = self._clock()
+            if job.next_run > now:
+                continue
+            job.next_run = now + job.interval
+            try:
+                result = await asyncio.to_thread(self._run_job, job)
+            except Exception:
+                logger.exception("Maintenance job %s failed", job.name)
+                continue
+            results[job.name] = result
+            if job.notify is not None and result:
+                await job.notify(result)
+        return results
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await self.run_pending()
+            except Exception:
+                logger.exception("Maintenance tick failed")
+            await asyncio.sleep(self.tick)
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop(), name="maintenance")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await asyncio.to_thread(self._release_leadership)
+
+
+_scheduler: MaintenanceScheduler | None = None
+
+
+def get_maintenance_scheduler() -> MaintenanceScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = MaintenanceScheduler()
+    return _scheduler
@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from enum import Enum
+from typing import Any, Hashable
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+
+class TotalMode(str, Enum):
+    EXACT = "exact"  # COUNT(*) на каждый запрос
+    CACHED = "cached"  # COUNT(*), переиспользуемый в течение короткого TTL
+    ESTIMATE = "estimate"  # оценка планировщика (PostgreSQL), иначе cached
+    NONE = "none"  # не считать вовсе
+
+
+_count_cache: TTLCache[Hashable, int] = TTLCache(maxsize=512, ttl=settings.LIST_COUNT_CACHE_TTL_SECONDS)
+
+
+class ExplainJson(Executable, ClauseElement):
+    """``EXPLAIN (FORMAT JSON) <select>`` с обычной обработкой параметров."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select) -> None:
+        self.statement = statement
+
+
+@compiles(ExplainJson, "postgresql")
+def _compile_explain_json(element: ExplainJson, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def encode_cursor(values: list[Any]) -> str:
+    """Непрозрачный курсор: base64url от JSON-массива значений ключа сортировки."""
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, *, size: int) -> list[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from exc
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+def _exact_count(db: Session, stmt: Select) -> int:
+    return int(db.execute(select(func.count()).select_from(stmt.order_by(None).subquery())).scalar() or 0)
+
+
+def _planner_estimate(db: Session, stmt: Select) -> int | None:
+    """Оценка числа строк из EXPLAIN — без выполнения самого запроса."""
+    bind = db.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    plan = db.execute(ExplainJson(stmt.order_by(None))).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    try:
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+
+
+def count_total(
+    db: Session,
+    stmt: Select,
+    *,
+    mode: TotalMode,
+    cache_key: Hashable,
+) -> tuple[int | None, bool]:
+    """Вернуть (total, is_estimate) для выборки stmt согласно режиму подсчёта."""
+    if mode == TotalMode.NONE:
+        return None, False
+    if mode == TotalMode.ESTIMATE:
+        estimate = _planner_estimate(db, stmt)
+        if estimate is not None:
+            return estimate, True
+        mode = TotalMode.CACHED
+    if mode == TotalMode.CACHED:
+        cached = _count_cache.get(cache_key)
+        if cached is not None:
+            return cached, True
+    total = _exact_count(db, stmt)
+    _count_cache.set(cache_key, total)
+    return total, False
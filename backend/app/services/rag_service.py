@@ -6,7 +6,7 @@ from typing import List
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.models import KnowledgeChunk
+from app.models import KnowledgeChunk, KnowledgeFile, KnowledgeFileStatus
 from app.services.embedding_service import cosine_similarity, get_text_embedding
 
 
@@ -32,7 +32,11 @@ class RAGService:
         vector = await get_text_embedding(query)
         chunks = (
             self.db.query(KnowledgeChunk)
-            .filter(KnowledgeChunk.embedding.isnot(None))
+            .join(KnowledgeFile, KnowledgeFile.id == KnowledgeChunk.file_id)
+            .filter(
+                KnowledgeFile.status == KnowledgeFileStatus.READY.value,
+                KnowledgeChunk.embedding.isnot(None),
+            )
             .order_by(KnowledgeChunk.chunk_index.asc())
             .all()
         )
@@ -1,17 +1,27 @@
 from __future__ import annotations
 
+import hashlib
+import time
 from datetime import datetime, timedelta, timezone
 
 from fastapi import Depends, HTTPException, Query, Request, status
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session, make_transient_to_detached
 
+from app.core.cache import TTLCache
 from app.core.config import settings
 from app.core.db import get_db
 from app.models import Admin
 
 ACCESS_COOKIE_NAME = "access_token"
 REFRESH_COOKIE_NAME = "refresh_token"
+PENDING_LOGIN_TTL = timedelta(minutes=10)
+
+_token_cache: TTLCache[bytes, dict] = TTLCache(maxsize=settings.JWT_CACHE_MAX_SIZE, ttl=0)
+_admin_cache: TTLCache[int, Admin] = TTLCache(
+    maxsize=settings.ADMIN_CACHE_MAX_SIZE, ttl=settings.ADMIN_CACHE_TTL_SECONDS
+)
 
 
 def _create_token(*, data: dict, expires_delta: timedelta, token_type: str) -> str:
@@ -38,10 +48,29 @@ def create_refresh_token(admin_id: int) -> str:
 
 
 def decode_token(token: str) -> dict:
+    """
+    Проверить подпись и срок JWT и вернуть claims.
+
+    Успешно проверенные claims кэшируются по sha256 токена до его exp, поэтому
+    middleware, зависимости и WebSocket не повторяют проверку подписи для
+    одного и того же токена. Ошибки не кэшируются.
+    """
+    digest = hashlib.sha256(token.encode()).digest()
+    cached = _token_cache.get(digest)
+    if cached is not None:
+        return dict(cached)
     try:
-        return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+        payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
     except JWTError as exc:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token") from exc
+    expires_at = payload.get("exp")
+    if settings.JWT_CACHE_MAX_SIZE > 0 and isinstance(expires_at, (int, float)):
+        _token_cache.set(digest, dict(payload), ttl=expires_at - time.time())
+    return payload
+
+
+def clear_token_cache() -> None:
+    _token_cache.clear()
 
 
 def extract_token_from_request(request: Request, *, cookie_name: str | None = ACCESS_COOKIE_NAME) -> str | None:
@@ -63,6 +92,43 @@ def access_token_dependency(
     return token_value
 
 
+def _admin_snapshot(admin: Admin) -> Admin:
+    """Отсоединённая копия администратора, не привязанная ни к одной сессии."""
+    snapshot = Admin(**{attr.key: getattr(admin, attr.key) for attr in inspect(Admin).column_attrs})
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+def get_cached_admin(admin_id: int) -> Admin | None:
+    return _admin_cache.get(admin_id)
+
+
+def load_admin(admin_id: int, *, db: Session) -> Admin | None:
+    """
+    Администратор по id: из кэша процесса или из БД с сохранением в кэш.
+
+    Возвращается отсоединённая копия — её можно держать между запросами,
+    но не использовать для ленивой загрузки связей и изменений.
+    """
+    admin = _admin_cache.get(admin_id)
+    if admin is not None:
+        return admin
+    stored = db.query(Admin).filter(Admin.id == admin_id).first()
+    if stored is None:
+        return None
+    admin = _admin_snapshot(stored)
+    _admin_cache.set(admin_id, admin)
+    return admin
+
+
+def invalidate_admin_cache(admin_id: int | None = None) -> None:
+    """Сбросить закэшированного администратора (или весь кэш) после изменения."""
+    if admin_id is None:
+        _admin_cache.clear()
+    else:
+        _admin_cache.pop(admin_id)
+
+
 def verify_token(
     token: str,
     *,
@@ -74,7 +140,7 @@ def verify_token(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
 
     admin_id = payload.get("sub")
-    admin = db.query(Admin).filter(Admin.id == int(admin_id)).first() if admin_id else None
+    admin = load_admin(int(admin_id), db=db) if admin_id else None
     if not admin:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Admin not found")
     if require_active and not admin.is_active:
@@ -100,8 +166,7 @@ def get_current_admin(
     return admin
 
 
-def get_current_superadmin(request: Request, db: Session = Depends(get_db)) -> Admin:
-    admin = get_current_admin(request, db)
+def get_current_superadmin(admin: Admin = Depends(get_current_admin)) -> Admin:
     if not admin.is_superadmin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Superadmin privileges required")
     return admin
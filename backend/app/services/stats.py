@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import random
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Literal
+
+from sqlalchemy import event, func, inspect, select, union_all, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import settings
+from app.core.db import SessionLocal
+from app.core.timeutils import as_utc
+from app.models import Dialog, DialogStatus, Message, MessageRole, StatsDaily, StatsHourly, StatsMonthly
+from app.models.stats import StatsCounters
+
+COUNTERS = (
+    "messages_user",
+    "messages_ai",
+    "messages_admin",
+    "ai_fallback",
+    "ai_used_rag",
+    "ai_during_operator_wait",
+    "dialogs_created",
+    "escalations",
+    "first_response_count",
+    "first_response_seconds_sum",
+    "first_response_within_sla",
+    "handle_count",
+    "handle_seconds_sum",
+)
+
+_ROLE_COUNTERS = {
+    MessageRole.USER: "messages_user",
+    MessageRole.AI: "messages_ai",
+    MessageRole.ADMIN: "messages_admin",
+}
+
+
+def hour_bucket(value: datetime) -> datetime:
+    return as_utc(value).replace(minute=0, second=0, microsecond=0)
+
+
+def day_bucket(value: datetime) -> datetime:
+    return hour_bucket(value).replace(hour=0)
+
+
+def month_bucket(value: datetime) -> datetime:
+    return day_bucket(value).replace(day=1)
+
+
+def _next_month(value: datetime) -> datetime:
+    return value.replace(year=value.year + value.month // 12, month=value.month % 12 + 1)
+
+
+# Уровни свёртки: каждое приращение пишется во все три таблицы.
+_LEVELS = (
+    (StatsHourly, hour_bucket),
+    (StatsDaily, day_bucket),
+    (StatsMonthly, month_bucket),
+)
+
+
+def bump(db: Session, at: datetime, **deltas: int) -> None:
+    """Отложить приращение счётчиков часа at до ближайшего flush этой сессии."""
+    pending: dict[datetime, Counter] = db.info.setdefault("stats_pending", defaultdict(Counter))
+    pending[hour_bucket(at)].update(deltas)
+
+
+def _on_new_message(db: Session, message: Message, now: datetime) -> None:
+    at = as_utc(message.created_at) if isinstance(message.created_at, datetime) else now
+    deltas = Counter({_ROLE_COUNTERS[MessageRole(message.role)]: 1})
+    if message.role == MessageRole.AI:
+        deltas.update(
+            ai_fallback=int(bool(message.is_fallback)),
+            ai_used_rag=int(bool(message.used_rag)),
+            ai_during_operator_wait=int(bool(message.ai_reply_during_operator_wait)),
+        )
+    elif message.role == MessageRole.ADMIN:
+        dialog = message.dialog or db.get(Dialog, message.dialog_id)
+        if dialog is not None:
+            if dialog.waiting_operator_since:
+                seconds = max(int((at - as_utc(dialog.waiting_operator_since)).total_seconds()), 0)
+                deltas.update(
+                    first_response_count=1,
+                    first_response_seconds_sum=seconds,
+                    first_response_within_sla=int(seconds <= settings.STATS_SLA_TARGET_SECONDS),
+                )
+                dialog.waiting_operator_since = None
+            if dialog.operator_session_started_at is None:
+                dialog.operator_session_started_at = at
+    bump(db, at, **deltas)
+
+
+def _on_dialog_change(db: Session, dialog: Dialog, now: datetime, *, is_new: bool) -> None:
+    state = inspect(dialog)
+    if is_new:
+        bump(db, now, dialogs_created=1)
+    status_added = state.attrs.status.history.added
+    new_status = DialogStatus(status_added[0]) if status_added and status_added[0] is not None else None
+    if new_status == DialogStatus.WAIT_OPERATOR:
+        bump(db, now, escalations=1)
+        if dialog.waiting_operator_since is None:
+            dialog.waiting_operator_since = now
+    elif new_status == DialogStatus.AUTO and not is_new:
+        dialog.waiting_operator_since = None
+        if dialog.operator_session_started_at is not None:
+            seconds = max(int((now - as_utc(dialog.operator_session_started_at)).total_seconds()), 0)
+            bump(db, now, handle_count=1, handle_seconds_sum=seconds)
+            dialog.operator_session_started_at = None
+    if (
+        state.attrs.assigned_admin_id.history.added
+        and dialog.assigned_admin_id is not None
+        and dialog.operator_session_started_at is None
+    ):
+        dialog.operator_session_started_at = now
+
+
+def _collect_stats(session: Session, _flush_context, _instances) -> None:
+    if session.info.get("read_only"):
+        return
+    now = datetime.now(timezone.utc)
+    new_objects = list(session.new)
+    for obj in new_objects:
+        if isinstance(obj, Message):
+            _on_new_message(session, obj, now)
+    for obj in new_objects:
+        if isinstance(obj, Dialog):
+            _on_dialog_change(session, obj, now, is_new=True)
+    for obj in list(session.dirty):
+        if isinstance(obj, Dialog):
+            _on_dialog_change(session, obj, now, is_new=False)
+
+
+def _write_stats(session: Session, _flush_context) -> None:
+    pending = session.info.pop("stats_pending", None)
+    if not pending:
+        return
+    rollups: dict[tuple[type[StatsCounters], datetime], Counter] = defaultdict(Counter)
+    for hour, deltas in pending.items():
+        for model, to_bucket in _LEVELS:
+            rollups[model, to_bucket(hour)].update(deltas)
+    connection = session.connection()
+    for (model, bucket), deltas in rollups.items():
+        deltas = {name: value for name, value in deltas.items() if value}
+        if deltas:
+            _upsert(connection, model, bucket, deltas)
+
+
+def _discard_stats(session: Session, _previous_transaction) -> None:
+    session.info.pop("stats_pending", None)
+
+
+def install_rollups(factory: sessionmaker) -> None:
+    """
+    Вести счётчики в сессиях factory.
+
+    Слушатели видят только изменения объектов в ORM-сессии. Core-запросы
+    update(Dialog) мимо них: захват блокировки в DialogLockService и
+    release_expired_locks трогают только поля блокировки, а отметки для
+    статистики, которые DialogLockService.acquire пишет через values
+    (назначение диалога), вызывающий код выставляет сам.
+    """
+    event.listen(factory, "before_flush", _collect_stats)
+    event.listen(factory, "after_flush", _write_stats)
+    event.listen(factory, "after_soft_rollback", _discard_stats)
+
+
+install_rollups(SessionLocal)
+
+
+def _upsert(connection, model: type[StatsCounters], bucket: datetime, deltas: dict[str, int]) -> None:
+    """Прибавить deltas к случайной shard-строке периода bucket в таблице model."""
+    shard = random.randrange(max(settings.STATS_ROLLUP_SHARDS, 1))
+    dialect = connection.dialect.name
+    if dialect in {"postgresql", "sqlite"}:
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        values = {**dict.fromkeys(COUNTERS, 0), **deltas}
+        stmt = insert(model).values(bucket_start=bucket, shard=shard, **values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[model.bucket_start, model.shard],
+            set_={name: getattr(model, name) + stmt.excluded[name] for name in deltas},
+        )
+        connection.execute(stmt)
+        return
+    result = connection.execute(
+        update(model)
+        .where(model.bucket_start == bucket, model.shard == shard)
+        .values({name: getattr(model, name) + value for name, value in deltas.items()})
+    )
+    if not result.rowcount:
+        connection.execute(
+            model.__table__.insert().values(
+                bucket_start=bucket, shard=shard, **{**dict.fromkeys(COUNTERS, 0), **deltas}
+            )
+        )
+
+
+class StatsService:
+    """
+    Чтение счётчиков без сканирования messages.
+
+    Диапазон раскладывается на уровни свёртки: целые месяцы берутся из
+    stats_monthly, целые сутки по краям — из stats_daily, неполные сутки —
+    из stats_hourly. Поэтому число читаемых строк почти не зависит от длины
+    периода: не больше двух суток часов и двух месяцев дней плюс по строке на месяц.
+    """
+
+    def __init__(self, db: Session) -> None:
+        self.db = db
+
+    @staticmethod
+    def _bounds(date_from: datetime, date_to: datetime) -> tuple[datetime, datetime]:
+        start = hour_bucket(date_from)
+        end = hour_bucket(date_to)
+        if end < as_utc(date_to):
+            end += timedelta(hours=1)
+        return start, end
+
+    @staticmethod
+    def _parts(
+        start: datetime, end: datetime, *, monthly: bool = True
+    ) -> list[tuple[type[StatsCounters], datetime, datetime]]:
+        """Разбить [start, end) на куски вида (таблица, начало, конец)."""
+        day_lo = day_bucket(start)
+        if day_lo < start:
+            day_lo += timedelta(days=1)
+        day_hi = day_bucket(end)
+        if day_lo >= day_hi:
+            return [(StatsHourly, start, end)] if start < end else []
+        month_lo = month_bucket(day_lo)
+        if month_lo < day_lo:
+            month_lo = _next_month(month_lo)
+        month_hi = month_bucket(day_hi)
+        parts = [(StatsHourly, start, day_lo)]
+        if monthly and month_lo < month_hi:
+            parts += [(StatsDaily, day_lo, month_lo), (StatsMonthly, month_lo, month_hi), (StatsDaily, month_hi, day_hi)]
+        else:
+            parts.append((StatsDaily, day_lo, day_hi))
+        parts.append((StatsHourly, day_hi, end))
+        return [(model, lo, hi) for model, lo, hi in parts if lo < hi]
+
+    @staticmethod
+    def _rows(parts: list[tuple[type[StatsCounters], datetime, datetime]]):
+        selects = [
+            select(model.bucket_start, *(getattr(model, name) for name in COUNTERS)).where(
+                model.bucket_start >= lo, model.bucket_start < hi
+            )
+            for model, lo, hi in parts
+        ]
+        return (selects[0] if len(selects) == 1 else union_all(*selects)).subquery()
+
+    def totals(self, date_from: datetime, date_to: datetime) -> dict[str, int]:
+        parts = self._parts(*self._bounds(date_from, date_to))
+        if not parts:
+            return dict.fromkeys(COUNTERS, 0)
+        rows = self._rows(parts)
+        row = self.db.execute(
+            select(*(func.coalesce(func.sum(rows.c[name]), 0).label(name) for name in COUNTERS))
+        ).one()
+        return {name: int(getattr(row, name)) for name in COUNTERS}
+
+    def series(
+        self,
+        date_from: datetime,
+        date_to: datetime,
+        *,
+        granularity: Literal["hour", "day"] = "hour",
+    ) -> list[tuple[datetime, dict[str, int]]]:
+        start, end = self._bounds(date_from, date_to)
+        if granularity == "day":
+            parts = self._parts(start, end, monthly=False)
+        else:
+            parts = [(StatsHourly, start, end)] if start < end else []
+        if not parts:
+            return []
+        rows = self._rows(parts)
+        result = self.db.execute(
+            select(rows.c.bucket_start, *(func.sum(rows.c[name]).label(name) for name in COUNTERS))
+            .group_by(rows.c.bucket_start)
+            .order_by(rows.c.bucket_start)
+        ).all()
+        buckets: dict[datetime, Counter] = {}
+        for row in result:
+            bucket = as_utc(row.bucket_start)
+            if granularity == "day":
+                bucket = day_bucket(bucket)
+            buckets.setdefault(bucket, Counter()).update({name: int(getattr(row, name) or 0) for name in COUNTERS})
+        return [(bucket, {name: counters[name] for name in COUNTERS}) for bucket, counters in buckets.items()]
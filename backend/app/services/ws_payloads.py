@@ -2,17 +2,68 @@ from __future__ import annotations
 
 from app.models import Dialog, KnowledgeFile, Message
 from app.schemas.knowledge_file import KnowledgeFileOut
-from app.schemas.message import MessageOut
+
+MESSAGE_PREVIEW_LENGTH = 140
+
+
+def dialog_topic(dialog_id: int) -> str:
+    """Топик тех, кто открыл диалог: полные тела сообщений."""
+    return f"dialog:{dialog_id}"
+
+
+def assigned_topic(admin_id: int) -> str:
+    """Топик оператора: сводки по назначенным ему диалогам."""
+    return f"assigned:{admin_id}"
+
+
+def message_out(message: Message) -> dict:
+    """Поля MessageOut без прохода через pydantic: событие строится на каждое сообщение."""
+    return {
+        "id": message.id,
+        "dialog_id": message.dialog_id,
+        "role": message.role,
+        "sender_id": message.sender_id,
+        "sender_name": message.sender_name,
+        "content": message.content,
+        "attachments": message.attachments,
+        "message_type": message.message_type,
+        "metadata": message.metadata_json,
+        "is_fallback": bool(message.is_fallback),
+        "used_rag": bool(message.used_rag),
+        "ai_reply_during_operator_wait": bool(message.ai_reply_during_operator_wait),
+        "created_at": message.created_at,
+    }
 
 
 def message_created_payload(message: Message) -> dict:
     return {
         "event": "message.created",
         "dialog_id": message.dialog_id,
-        "message": MessageOut.model_validate(message).model_dump(),
+        "message": message_out(message),
     }
 
 
+def message_summary_payload(message: Message) -> dict:
+    """Компактная сводка для списка диалогов: без полного текста и вложений."""
+    return {
+        "event": "message.summary",
+        "dialog_id": message.dialog_id,
+        "message_id": message.id,
+        "role": message.role,
+        "created_at": message.created_at,
+        "preview": (message.content or "")[:MESSAGE_PREVIEW_LENGTH],
+    }
+
+
+def message_events(message: Message, dialog: Dialog) -> list[tuple[str, dict]]:
+    """Рассылка нового сообщения: тело — смотрящим диалог, сводка — во входящие."""
+    summary = message_summary_payload(message)
+    events = [(dialog_topic(message.dialog_id), message_created_payload(message)), ("messages", summary)]
+    if dialog.assigned_admin_id is not None:
+        events.append((assigned_topic(dialog.assigned_admin_id), summary))
+    return events
+
+
 def dialog_updated_payload(dialog: Dialog, *, event: str = "dialog.updated") -> dict:
     return {
         "event": event,
@@ -27,6 +78,25 @@ def dialog_updated_payload(dialog: Dialog, *, event: str = "dialog.updated") ->
     }
 
 
+def dialog_events(dialog: Dialog, *, event: str = "dialog.updated") -> list[tuple[str, dict]]:
+    payload = dialog_updated_payload(dialog, event=event)
+    events = [("dialogs", payload)]
+    if dialog.assigned_admin_id is not None:
+        events.append((assigned_topic(dialog.assigned_admin_id), payload))
+    return events
+
+
+def dialogs_unlocked_payload(dialog_ids: list[int]) -> dict:
+    """Пачка диалогов, чьи блокировки сняты по истечении времени."""
+    return {
+        "event": "dialogs.unlocked",
+        "dialog_ids": dialog_ids,
+        "is_locked": False,
+        "locked_by_admin_id": None,
+        "locked_until": None,
+    }
+
+
 def knowledge_file_payload(knowledge_file: KnowledgeFile, *, event: str) -> dict:
     return {
         "event": event,
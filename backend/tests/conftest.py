@@ -7,7 +7,7 @@ import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -15,22 +15,49 @@ BASE_DIR = Path(__file__).resolve().parents[1]
 if str(BASE_DIR) not in sys.path:
     sys.path.insert(0, str(BASE_DIR))
 
+import app.api.v1.ws as ws_api
 import app.middleware.admin_context as admin_context
+from app.core.config import settings
 from app.core.db import Base, get_db
 from app.core.ws_manager import WebSocketManager, get_ws_manager
 from app.main import app as fastapi_app
 from app.models import Admin
-from app.services.security import create_access_token
+from app.services import pagination
+from app.services.knowledge_ingestion import KnowledgeIngestion, get_knowledge_ingestion
+from app.services.security import clear_token_cache, create_access_token, invalidate_admin_cache
+from app.services.stats import install_rollups
+
+
+@pytest.fixture(autouse=True)
+def _reset_caches(monkeypatch):
+    pagination._count_cache.clear()
+    invalidate_admin_cache()
+    clear_token_cache()
+    # Аудит в тестах пишется синхронно в сессию запроса, фоновых задач нет.
+    monkeypatch.setattr(settings, "AUDIT_BUFFER_ENABLED", False)
+    monkeypatch.setattr(settings, "MAINTENANCE_ENABLED", False)
+    monkeypatch.setattr(settings, "LOGIN_NOTIFY_LISTENER_ENABLED", False)
+    monkeypatch.setattr(settings, "WS_EVENT_BUS", "memory")
+    monkeypatch.setattr(settings, "KNOWLEDGE_INGESTION_RESUME_ENABLED", False)
+    yield
 
 
 @pytest.fixture()
-def engine():
-    engine = create_engine(
-        "sqlite+pysqlite:///:memory:",
-        future=True,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
+def database_url(tmp_path) -> str:
+    # Файл, а не :memory:, чтобы фоновые задачи могли открыть к той же БД своё соединение.
+    return f"sqlite+pysqlite:///{tmp_path / 'test.db'}"
+
+
+def _sqlite_engine(url: str, **kwargs):
+    engine = create_engine(url, future=True, connect_args={"check_same_thread": False}, **kwargs)
+    # Тестовой БД не нужна устойчивость к сбою питания, а fsync на каждый коммит заметно тормозит.
+    event.listen(engine, "connect", lambda connection, _record: connection.execute("PRAGMA synchronous=OFF"))
+    return engine
+
+
+@pytest.fixture()
+def engine(database_url):
+    engine = _sqlite_engine(database_url, poolclass=StaticPool)
     Base.metadata.create_all(engine)
     try:
         yield engine
@@ -40,7 +67,9 @@ def engine():
 
 @pytest.fixture()
 def session_factory(engine):
-    return sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    factory = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+    install_rollups(factory)
+    return factory
 
 
 @pytest.fixture()
@@ -58,7 +87,26 @@ def ws_manager() -> WebSocketManager:
 
 
 @pytest.fixture()
-def app(db_session: Session, session_factory, ws_manager: WebSocketManager) -> FastAPI:
+def knowledge_ingestion(engine, database_url, ws_manager: WebSocketManager) -> KnowledgeIngestion:
+    # Своё соединение: фоновые коммиты не должны делить StaticPool-соединение с db_session.
+    ingestion_engine = _sqlite_engine(database_url)
+    try:
+        yield KnowledgeIngestion(
+            session_factory=sessionmaker(bind=ingestion_engine, autoflush=False, future=True),
+            ws_manager=ws_manager,
+        )
+    finally:
+        ingestion_engine.dispose()
+
+
+@pytest.fixture()
+def app(
+    db_session: Session,
+    session_factory,
+    ws_manager: WebSocketManager,
+    knowledge_ingestion: KnowledgeIngestion,
+    monkeypatch,
+) -> FastAPI:
     def override_get_db():
         try:
             yield db_session
@@ -67,13 +115,13 @@ def app(db_session: Session, session_factory, ws_manager: WebSocketManager) -> F
 
     fastapi_app.dependency_overrides[get_db] = override_get_db
     fastapi_app.dependency_overrides[get_ws_manager] = lambda: ws_manager
-    original_session_local = admin_context.SessionLocal
-    admin_context.SessionLocal = session_factory
+    fastapi_app.dependency_overrides[get_knowledge_ingestion] = lambda: knowledge_ingestion
+    monkeypatch.setattr(admin_context, "SessionLocal", session_factory)
+    monkeypatch.setattr(ws_api, "SessionLocal", session_factory)
     try:
         yield fastapi_app
     finally:
         fastapi_app.dependency_overrides.clear()
-        admin_context.SessionLocal = original_session_local
 
 
 @pytest.fixture()
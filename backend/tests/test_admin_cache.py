@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.models import Admin
+from app.services import security
+from app.services.security import create_access_token
+
+
+@pytest.fixture()
+def admin_selects(engine):
+    statements: list[str] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM admins" in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+
+
+@pytest.mark.asyncio
+async def test_repeated_requests_reuse_cached_admin(async_client, auth_headers, admin_selects):
+    first = await async_client.get("/api/auth/me", headers=auth_headers)
+    assert first.status_code == 200
+    assert len(admin_selects) == 1
+
+    second = await async_client.get("/api/auth/me", headers=auth_headers)
+    assert second.status_code == 200
+    assert second.json() == first.json()
+    assert len(admin_selects) == 1
+
+
+@pytest.mark.asyncio
+async def test_update_admin_invalidates_cached_principal(async_client, db_session, auth_headers):
+    operator = Admin(telegram_id=555, full_name="Operator", is_active=True)
+    db_session.add(operator)
+    db_session.commit()
+    operator_headers = {"Authorization": f"Bearer {create_access_token(operator.id)}"}
+
+    assert (await async_client.get("/api/auth/me", headers=operator_headers)).status_code == 200
+
+    disable = await async_client.patch(
+        f"/api/admin/admins/{operator.id}", json={"is_active": False}, headers=auth_headers
+    )
+    assert disable.status_code == 200
+
+    response = await async_client.get("/api/auth/me", headers=operator_headers)
+    assert response.status_code == 403
+
+
+def test_decode_token_verifies_signature_once(monkeypatch):
+    calls = []
+    original = security.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counting_decode)
+    token = create_access_token(42)
+
+    first = security.decode_token(token)
+    first["sub"] = "mutated"
+    assert security.decode_token(token)["sub"] == "42"
+    assert len(calls) == 1
+
+    with pytest.raises(HTTPException):
+        security.decode_token(token + "x")
+    with pytest.raises(HTTPException):
+        security.decode_token(token + "x")
+    assert len(calls) == 3
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from app.models import AuditLog
+from app.services.audit_partitions import AuditRetentionService, add_months, partition_name
+
+
+def _log(db_session, created_at: datetime, action: str = "dialog_unlocked", admin_id: int | None = None) -> AuditLog:
+    log = AuditLog(admin_id=admin_id, action=action, params={"at": created_at.isoformat()}, created_at=created_at)
+    db_session.add(log)
+    db_session.commit()
+    return log
+
+
+def test_retention_archives_and_deletes_old_months(db_session, tmp_path):
+    now = datetime(2024, 7, 15, tzinfo=timezone.utc)
+    _log(db_session, datetime(2024, 1, 10, tzinfo=timezone.utc))
+    _log(db_session, datetime(2024, 1, 20, tzinfo=timezone.utc))
+    _log(db_session, datetime(2024, 3, 5, tzinfo=timezone.utc))
+    _log(db_session, datetime(2024, 5, 1, tzinfo=timezone.utc))
+
+    results = AuditRetentionService(db_session, archive_dir=tmp_path).apply_retention(keep_months=3, now=now)
+
+    assert [(item.partition, item.rows) for item in results] == [("audit_logs_y2024m01", 2), ("audit_logs_y2024m03", 1)]
+    assert db_session.query(AuditLog).count() == 1
+    with gzip.open(results[0].archive_path, "rt", encoding="utf-8") as archive:
+        rows = [json.loads(line) for line in archive]
+    assert [row["params"]["at"][:10] for row in rows] == ["2024-01-10", "2024-01-20"]
+
+
+def test_month_helpers():
+    start = datetime(2024, 11, 1, tzinfo=timezone.utc)
+    assert add_months(start, 2) == datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert add_months(start, -11) == datetime(2023, 12, 1, tzinfo=timezone.utc)
+    assert partition_name(start) == "audit_logs_y2024m11"
+
+
+@pytest.mark.asyncio
+async def test_audit_query_filters_and_paginates(async_client, db_session, admin, auth_headers):
+    for day in range(1, 6):
+        _log(db_session, datetime(2024, 6, day, tzinfo=timezone.utc), action="dialog_assigned", admin_id=admin.id)
+    _log(db_session, datetime(2024, 6, 3, tzinfo=timezone.utc), action="dialog_unlocked")
+    _log(db_session, datetime(2024, 4, 1, tzinfo=timezone.utc), action="dialog_assigned", admin_id=admin.id)
+
+    params = {
+        "admin_id": admin.id,
+        "action": "dialog_assigned",
+        "since": "2024-06-01T00:00:00Z",
+        "until": "2024-07-01T00:00:00Z",
+        "limit": 3,
+    }
+    first = await async_client.get("/api/audit", params=params, headers=auth_headers)
+    assert first.status_code == 200
+    page = first.json()
+    assert [item["created_at"][:10] for item in page["items"]] == ["2024-06-05", "2024-06-04", "2024-06-03"]
+
+    second = await async_client.get(
+        "/api/audit", params={**params, "cursor": page["next_cursor"]}, headers=auth_headers
+    )
+    rest = second.json()
+    assert [item["created_at"][:10] for item in rest["items"]] == ["2024-06-02", "2024-06-01"]
+    assert rest["next_cursor"] is None
+
+    invalid = await async_client.get(
+        "/api/audit", params={"since": "2024-07-01T00:00:00Z", "until": "2024-06-01T00:00:00Z"}, headers=auth_headers
+    )
+    assert invalid.status_code == 400
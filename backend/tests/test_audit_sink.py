@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app.models import AuditLog
+from app.services import audit
+from app.services.audit import AuditSink, log_action
+
+
+@pytest.fixture()
+def sink(session_factory, monkeypatch) -> AuditSink:
+    sink = AuditSink(session_factory=session_factory, max_size=5, batch_size=2, flush_interval=0.05)
+    monkeypatch.setattr(audit, "_audit_sink", sink)
+    return sink
+
+
+@pytest.mark.asyncio
+async def test_buffered_records_are_flushed_in_background(sink, db_session):
+    await sink.start()
+    try:
+        for index in range(3):
+            assert log_action(db_session, admin_id=None, action="dialog_unlocked", params={"n": index}) is None
+        assert db_session.query(AuditLog).count() == 0
+
+        for _ in range(50):
+            await asyncio.sleep(0.02)
+            if not len(sink):
+                break
+    finally:
+        await sink.stop()
+
+    actions = db_session.query(AuditLog.params).order_by(AuditLog.id).all()
+    assert [row.params["n"] for row in actions] == [0, 1, 2]
+
+
+@pytest.mark.asyncio
+async def test_security_actions_and_overflow_are_written_synchronously(sink, db_session):
+    await sink.start()
+    try:
+        login = log_action(db_session, admin_id=None, action="admin_login", params={})
+        assert login is not None and login.id is not None
+
+        sink.flush_interval = 60
+        sink.batch_size = 100
+        for _ in range(sink.max_size):
+            assert log_action(db_session, admin_id=None, action="kb_file_uploaded") is None
+        overflow = log_action(db_session, admin_id=None, action="kb_file_uploaded")
+        assert overflow is not None
+        db_session.commit()
+    finally:
+        await sink.stop()
+
+    assert len(sink) == 0
+    assert db_session.query(AuditLog).count() == sink.max_size + 2
+
+
+def test_log_action_without_running_sink_is_synchronous(db_session):
+    log = log_action(db_session, admin_id=None, action="dialog_unlocked", params={"dialog_id": 1}, commit=True)
+    assert log is not None
+    assert db_session.query(AuditLog).count() == 1
+
+
+def test_failing_batch_is_retried_then_written_row_by_row(sink, db_session):
+    sink.max_retries = 2
+    sink._buffer.extend(
+        [
+            {"admin_id": None, "action": "dialog_unlocked", "params": {"n": 0}},
+            {"admin_id": None, "action": None, "params": {"n": 1}},
+            {"admin_id": None, "action": "dialog_unlocked", "params": {"n": 2}},
+        ]
+    )
+
+    assert sink.flush() == 0
+    assert sink.flush() == 0
+    assert len(sink) == 3
+    # После исчерпания попыток битая строка отбрасывается, остальные записываются.
+    assert sink.flush() == 1
+    assert sink.flush() == 1
+
+    assert len(sink) == 0
+    rows = db_session.query(AuditLog.params).order_by(AuditLog.id).all()
+    assert [row.params["n"] for row in rows] == [0, 2]
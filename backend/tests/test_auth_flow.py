@@ -1,5 +1,11 @@
+import asyncio
+import threading
+
 import pytest
 
+from app.api.v1 import auth
+from app.services.login_waiters import get_login_waiters
+
 
 @pytest.mark.asyncio
 async def test_login_flow_and_auth_me(async_client):
@@ -47,3 +53,45 @@ async def test_auth_me_requires_valid_token(async_client):
         "/api/auth/me", headers={"Authorization": "Bearer invalid"}
     )
     assert response.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_status_wait_wakes_up_on_telegram_callback(async_client, monkeypatch):
+    token = (await async_client.post("/api/auth/init")).json()["token"]
+
+    timed_out = await async_client.get("/api/auth/status/wait", params={"token": token, "timeout": 0.05})
+    assert timed_out.json()["status"] == "pending"
+
+    # Тестовая сессия общая: callback запускаем только после первого чтения статуса,
+    # а повторное чтение ждёт, пока callback полностью закончит работу с сессией.
+    first_read = threading.Event()
+    callback_done = threading.Event()
+    read_status = auth._read_pending_login_status
+
+    def tracking_read(db, pending_token):
+        if first_read.is_set():
+            callback_done.wait(timeout=2)
+        try:
+            return read_status(db, pending_token)
+        finally:
+            first_read.set()
+
+    monkeypatch.setattr(auth, "_read_pending_login_status", tracking_read)
+    waiter = asyncio.create_task(
+        async_client.get("/api/auth/status/wait", params={"token": token, "timeout": 10})
+    )
+    while not (first_read.is_set() and len(get_login_waiters())):
+        await asyncio.sleep(0.01)
+
+    callback_resp = await async_client.post(
+        "/api/auth/telegram_callback",
+        json={"token": token, "telegram_id": 42, "full_name": "Operator", "username": "op"},
+    )
+    assert callback_resp.status_code == 200
+    callback_done.set()
+
+    response = await asyncio.wait_for(waiter, timeout=2)
+    assert response.status_code == 200
+    assert response.json()["status"] == "confirmed"
+    assert response.json()["admin"]["telegram_id"] == 42
+    assert len(get_login_waiters()) == 0
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.db import Base
+from app.models import Admin, Dialog, DialogStatus
+from app.services.dialog_lock import DialogLockService
+
+
+@pytest.fixture()
+def file_sessions(tmp_path):
+    engine = create_engine(
+        f"sqlite+pysqlite:///{tmp_path / 'locks.db'}",
+        future=True,
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(engine)
+    try:
+        yield sessionmaker(bind=engine, autoflush=False, future=True)
+    finally:
+        engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_only_one_of_many_concurrent_acquires_wins(file_sessions):
+    setup = file_sessions()
+    admins = [Admin(telegram_id=index, full_name=f"Admin {index}", is_active=True) for index in range(1, 41)]
+    dialog = Dialog(telegram_user_id=1, status=DialogStatus.WAIT_OPERATOR)
+    setup.add_all([*admins, dialog])
+    setup.commit()
+    admin_ids = [admin.id for admin in admins]
+    dialog_id = dialog.id
+    setup.close()
+
+    def attempt(admin_id: int) -> int | None:
+        db = file_sessions()
+        try:
+            DialogLockService(db).acquire(dialog_id, admin_id=admin_id, values={"assigned_admin_id": admin_id})
+            db.commit()
+            return admin_id
+        except HTTPException as exc:
+            db.rollback()
+            assert exc.status_code == 409
+            return None
+        finally:
+            db.close()
+
+    results = await asyncio.gather(*(asyncio.to_thread(attempt, admin_id) for admin_id in admin_ids))
+    winners = [admin_id for admin_id in results if admin_id is not None]
+    assert len(winners) == 1
+
+    check = file_sessions()
+    stored = check.get(Dialog, dialog_id)
+    assert stored.locked_by_admin_id == winners[0] == stored.assigned_admin_id
+    check.close()
+
+
+def test_acquire_renews_own_lock_and_takes_expired_one(db_session):
+    now = datetime.now(timezone.utc)
+    first, second = Admin(telegram_id=1, full_name="A"), Admin(telegram_id=2, full_name="B")
+    dialog = Dialog(telegram_user_id=1, status=DialogStatus.WAIT_OPERATOR)
+    db_session.add_all([first, second, dialog])
+    db_session.commit()
+    service = DialogLockService(db_session)
+
+    service.acquire(dialog.id, admin_id=first.id, now=now)
+    renewed = service.acquire(dialog.id, admin_id=first.id, now=now + timedelta(minutes=1))
+    assert renewed.locked_by_admin_id == first.id
+
+    with pytest.raises(HTTPException) as conflict:
+        service.acquire(dialog.id, admin_id=second.id, now=now + timedelta(minutes=2))
+    assert conflict.value.status_code == 409
+
+    taken = service.acquire(dialog.id, admin_id=second.id, now=now + timedelta(minutes=10))
+    assert taken.locked_by_admin_id == second.id
+
+    assert service.release(dialog.id, admin_id=first.id) is False
+    assert service.release(dialog.id, admin_id=second.id) is True
+    assert dialog.is_locked is False
+
+    with pytest.raises(HTTPException) as missing:
+        service.acquire(dialog.id + 100, admin_id=first.id)
+    assert missing.value.status_code == 404
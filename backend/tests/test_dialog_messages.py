@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.models import Admin, Dialog, DialogStatus, Message, MessageRole
+from app.services.security import create_access_token
+
+
+@pytest.fixture()
+def long_dialog(db_session) -> Dialog:
+    dialog = Dialog(
+        telegram_user_id=5,
+        status=DialogStatus.WAIT_OPERATOR,
+        last_message_at=datetime.now(timezone.utc),
+    )
+    db_session.add(dialog)
+    db_session.flush()
+    db_session.add_all(
+        Message(dialog_id=dialog.id, role=MessageRole.USER, content=f"message {index}")
+        for index in range(12)
+    )
+    db_session.commit()
+    return dialog
+
+
+@pytest.mark.asyncio
+async def test_dialog_detail_returns_latest_window(async_client, long_dialog, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "DIALOG_DETAIL_MESSAGES_LIMIT", 5)
+
+    response = await async_client.get(f"/api/dialogs/{long_dialog.id}", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert [m["content"] for m in data["messages"]] == [f"message {i}" for i in range(7, 12)]
+    assert data["has_more_messages"] is True
+
+
+@pytest.mark.asyncio
+async def test_messages_endpoint_pages_backwards_and_forwards(async_client, long_dialog, auth_headers):
+    url = f"/api/dialogs/{long_dialog.id}/messages"
+    latest = (await async_client.get(url, params={"limit": 5}, headers=auth_headers)).json()
+    assert latest["has_more"] is True
+    oldest_loaded = latest["items"][0]["id"]
+
+    older = (
+        await async_client.get(url, params={"limit": 5, "before_id": oldest_loaded}, headers=auth_headers)
+    ).json()
+    assert [m["content"] for m in older["items"]] == [f"message {i}" for i in range(2, 7)]
+
+    newer = (
+        await async_client.get(url, params={"limit": 5, "after_id": older["items"][-1]["id"]}, headers=auth_headers)
+    ).json()
+    assert [m["id"] for m in newer["items"]] == [m["id"] for m in latest["items"]]
+    assert newer["has_more"] is False
+
+    both = await async_client.get(url, params={"before_id": 5, "after_id": 1}, headers=auth_headers)
+    assert both.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_switch_auto_does_not_load_messages(async_client, engine, long_dialog, auth_headers):
+    statements: list[str] = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        response = await async_client.post(f"/api/dialogs/{long_dialog.id}/switch_auto", headers=auth_headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+    assert response.status_code == 200
+    assert not [sql for sql in statements if "FROM messages" in sql]
+
+
+@pytest.mark.asyncio
+async def test_send_respects_foreign_lock_except_for_superadmin(
+    async_client, db_session, admin, auth_headers, monkeypatch
+):
+    monkeypatch.setattr("app.api.v1.messages.send_telegram_message", AsyncMock(return_value=None))
+    operator = Admin(telegram_id=321, full_name="Operator", is_superadmin=False, is_active=True)
+    other = Admin(telegram_id=654, full_name="Other", is_superadmin=False, is_active=True)
+    db_session.add_all([operator, other])
+    db_session.flush()
+    locked = Dialog(
+        telegram_user_id=6,
+        status=DialogStatus.WAIT_OPERATOR,
+        is_locked=True,
+        locked_by_admin_id=other.id,
+        locked_until=datetime.now(timezone.utc) + timedelta(minutes=5),
+    )
+    assigned = Dialog(telegram_user_id=7, status=DialogStatus.WAIT_OPERATOR, assigned_admin_id=other.id)
+    db_session.add_all([locked, assigned])
+    db_session.commit()
+    operator_headers = {"Authorization": f"Bearer {create_access_token(operator.id)}"}
+
+    async def send(dialog: Dialog, headers: dict[str, str]) -> int:
+        response = await async_client.post(
+            "/api/messages/send", json={"dialog_id": dialog.id, "content": "Hi"}, headers=headers
+        )
+        return response.status_code
+
+    assert await send(locked, operator_headers) == 409
+    assert await send(assigned, operator_headers) == 403
+
+    assert await send(locked, auth_headers) == 200
+    db_session.refresh(locked)
+    assert locked.locked_by_admin_id == admin.id
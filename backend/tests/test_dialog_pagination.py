@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.models import Dialog, DialogStatus
+
+
+def _create_dialogs(db_session, count: int) -> list[Dialog]:
+    base = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+    dialogs = []
+    for index in range(count):
+        # Пары с одинаковым last_message_at проверяют тай-брейк по id.
+        dialogs.append(
+            Dialog(
+                telegram_user_id=index,
+                status=DialogStatus.WAIT_OPERATOR,
+                last_message_at=base + timedelta(minutes=index // 2),
+            )
+        )
+    db_session.add_all(dialogs)
+    db_session.commit()
+    return dialogs
+
+
+@pytest.mark.asyncio
+async def test_cursor_pagination_walks_all_dialogs_once(async_client, db_session, auth_headers):
+    _create_dialogs(db_session, 7)
+
+    first = await async_client.get("/api/dialogs", params={"per_page": 3}, headers=auth_headers)
+    assert first.status_code == 200
+    data = first.json()
+    assert data["total"] == 7
+    assert data["page"] == 1
+    seen = [item["id"] for item in data["items"]]
+
+    while data["next_cursor"]:
+        response = await async_client.get(
+            "/api/dialogs",
+            params={"per_page": 3, "cursor": data["next_cursor"], "total_mode": "none"},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["page"] is None
+        assert data["total"] is None
+        seen.extend(item["id"] for item in data["items"])
+
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+    assert data["has_next"] is False
+
+    offset_page = await async_client.get(
+        "/api/dialogs", params={"per_page": 3, "page": 2}, headers=auth_headers
+    )
+    assert [item["id"] for item in offset_page.json()["items"]] == seen[3:6]
+
+
+@pytest.mark.asyncio
+async def test_cached_total_is_reused_until_exact_requested(async_client, db_session, auth_headers):
+    _create_dialogs(db_session, 2)
+    first = await async_client.get("/api/dialogs", headers=auth_headers)
+    assert first.json()["total"] == 2
+    assert first.json()["total_is_estimate"] is False
+
+    _create_dialogs(db_session, 1)
+    cached = await async_client.get("/api/dialogs", headers=auth_headers)
+    assert cached.json()["total"] == 2
+    assert cached.json()["total_is_estimate"] is True
+
+    exact = await async_client.get("/api/dialogs", params={"total_mode": "exact"}, headers=auth_headers)
+    assert exact.json()["total"] == 3
+
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_is_rejected(async_client, auth_headers):
+    response = await async_client.get("/api/dialogs", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_inbox_snapshot_and_delta_return_only_changed_dialogs(async_client, db_session, auth_headers, monkeypatch):
+    dialogs = _create_dialogs(db_session, 4)
+    old = datetime(2024, 6, 1, 12, 0, tzinfo=timezone.utc)
+    for dialog in dialogs:
+        dialog.updated_at = old
+    db_session.commit()
+
+    snapshot = (await async_client.get("/api/dialogs/inbox", headers=auth_headers)).json()
+    assert [item["id"] for item in snapshot["items"]] == [dialog.id for dialog in reversed(dialogs)]
+    assert set(snapshot["items"][0]) == {
+        "id", "status", "assigned_admin_id", "unread_messages_count",
+        "is_locked", "locked_until", "last_message_at", "updated_at",
+    }
+
+    dialogs[1].status = DialogStatus.AUTO
+    dialogs[1].updated_at = old + timedelta(hours=1)
+    db_session.commit()
+    # Без перекрытия: диалоги с updated_at, равным version, повторно не приходят.
+    monkeypatch.setattr(settings, "INBOX_DELTA_OVERLAP_SECONDS", 0)
+
+    delta = (await async_client.get("/api/dialogs/inbox/changes", params={"since": snapshot["version"]}, headers=auth_headers)).json()
+    assert delta["reset"] is False
+    assert [(item["id"], item["status"]) for item in delta["items"]] == [(dialogs[1].id, "auto")]
+    assert delta["version"] != snapshot["version"]
+
+    monkeypatch.setattr(settings, "INBOX_DELTA_LIMIT", 0)
+    reset = (await async_client.get("/api/dialogs/inbox/changes", params={"since": snapshot["version"]}, headers=auth_headers)).json()
+    assert reset == {"items": [], "version": snapshot["version"], "reset": True}
+
+    invalid = await async_client.get("/api/dialogs/inbox/changes", params={"since": "garbage"}, headers=auth_headers)
+    assert invalid.status_code == 400
+
+
+def test_dialog_without_last_message_at_gets_server_default(db_session):
+    # NULL в last_message_at сломал бы курсор (last_message_at, id); колонка NOT NULL.
+    dialog = Dialog(telegram_user_id=1, status=DialogStatus.AUTO)
+    db_session.add(dialog)
+    db_session.commit()
+    db_session.refresh(dialog)
+    assert dialog.last_message_at is not None
+    assert Dialog.__table__.c.last_message_at.nullable is False
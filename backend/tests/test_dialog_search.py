@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.models import Dialog, DialogStatus, Message, MessageRole
+from app.services.dialog_search import build_prefix_query, make_snippet
+
+
+def _dialog_with_messages(db_session, telegram_user_id: int, texts: list[str]) -> Dialog:
+    dialog = Dialog(
+        telegram_user_id=telegram_user_id,
+        status=DialogStatus.WAIT_OPERATOR,
+        last_message_at=datetime.now(timezone.utc),
+    )
+    db_session.add(dialog)
+    db_session.flush()
+    for text in texts:
+        db_session.add(Message(dialog_id=dialog.id, role=MessageRole.USER, content=text))
+    db_session.commit()
+    return dialog
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_dialogs_and_highlights_snippet(async_client, db_session, auth_headers):
+    single = _dialog_with_messages(db_session, 1, ["Где моя доставка?", "Спасибо"])
+    double = _dialog_with_messages(db_session, 2, ["доставка задерживается", "Когда будет доставка заказа?"])
+    _dialog_with_messages(db_session, 3, ["Вопрос про оплату"])
+
+    response = await async_client.get("/api/dialogs/search", params={"q": "доставка"}, headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["mode"] == "like"
+    assert [item["dialog"]["id"] for item in data["items"]] == [double.id, single.id]
+    assert data["items"][0]["match_count"] == 2
+    assert "<mark>доставка</mark>" in data["items"][0]["snippet"]
+
+    filtered = await async_client.get(
+        "/api/dialogs",
+        params={"search": "оплат"},
+        headers=auth_headers,
+    )
+    assert filtered.status_code == 200
+    assert filtered.json()["total"] == 1
+
+
+@pytest.mark.asyncio
+async def test_search_escapes_like_wildcards(async_client, db_session, auth_headers):
+    _dialog_with_messages(db_session, 1, ["скидка 50% на всё"])
+    _dialog_with_messages(db_session, 2, ["скидка 500 рублей"])
+
+    response = await async_client.get("/api/dialogs/search", params={"q": "50%"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()["items"]) == 1
+
+
+def test_prefix_query_and_snippet_helpers():
+    assert build_prefix_query("Доставка зак!") == "доставка:* & зак:*"
+    assert build_prefix_query("!!!") is None
+    assert make_snippet("Привет, где заказ?", "заказ") == "Привет, где <mark>заказ</mark>?"
+    # Текст пользователя экранируется, разметкой остаются только <mark>.
+    assert make_snippet("<img src=x onerror=alert(1)> заказ & <b>", "заказ") == (
+        "&lt;img src=x onerror=alert(1)&gt; <mark>заказ</mark> &amp; &lt;b&gt;"
+    )
+    assert make_snippet("<script>", "нет") == "&lt;script&gt;"
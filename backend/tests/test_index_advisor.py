@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from sqlalchemy import select
+
+from app.models import Dialog, Message
+from tools.index_advisor import IndexAdvisor, analyze_postgres_plan
+
+
+def test_advisor_flags_seq_scan_but_not_indexed_history(db_session):
+    advisor = IndexAdvisor(tables=["messages"])
+    advisor.install()
+    try:
+        db_session.execute(
+            select(Message).where(Message.dialog_id == 1).order_by(Message.created_at.desc()).limit(15)
+        ).all()
+        db_session.execute(select(Message.dialog_id).where(Message.content.ilike("%term%"))).all()
+    finally:
+        advisor.uninstall()
+
+    assert advisor.explained == 2
+    flagged = list(advisor.findings.values())
+    assert len(flagged) == 1
+    assert flagged[0].table == "messages"
+    assert "lower" in flagged[0].statement.lower()
+
+
+def test_advisor_ignores_unwatched_tables(db_session):
+    advisor = IndexAdvisor(tables=["audit_logs"])
+    advisor.install()
+    try:
+        db_session.execute(select(Dialog)).all()
+    finally:
+        advisor.uninstall()
+    assert advisor.findings == {}
+
+
+def test_postgres_plan_walks_nested_nodes():
+    plan = [
+        {
+            "Plan": {
+                "Node Type": "Hash Join",
+                "Plans": [
+                    {"Node Type": "Seq Scan", "Relation Name": "messages", "Plan Rows": 100000},
+                    {"Node Type": "Index Scan", "Relation Name": "dialogs"},
+                ],
+            }
+        }
+    ]
+    found = analyze_postgres_plan(plan, ["messages", "dialogs"])
+    assert [table for table, _ in found] == ["messages"]
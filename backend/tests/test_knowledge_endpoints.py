@@ -4,6 +4,7 @@ import pytest
 
 from app.core.config import settings
 from app.models import KnowledgeChunk, KnowledgeFile
+from app.services.rag_service import RAGService
 
 
 @pytest.mark.asyncio
@@ -12,6 +13,7 @@ async def test_upload_and_delete_knowledge_file(
     db_session,
     admin,
     auth_headers,
+    knowledge_ingestion,
     tmp_path,
     monkeypatch,
 ):
@@ -19,7 +21,7 @@ async def test_upload_and_delete_knowledge_file(
 
     chunks = ["chunk-one", "chunk-two", "chunk-three"]
     monkeypatch.setattr(
-        "app.services.knowledge_base.chunking.split_into_chunks",
+        "app.services.knowledge_ingestion.chunking.split_into_chunks",
         lambda text: chunks,
     )
 
@@ -30,23 +32,25 @@ async def test_upload_and_delete_knowledge_file(
         return [1.0]
 
     monkeypatch.setattr(
-        "app.services.knowledge_base.embedding_service.get_text_embedding",
+        "app.services.knowledge_ingestion.embedding_service.get_text_embedding",
         fake_embedding,
     )
     monkeypatch.setattr(
-        "app.services.knowledge_base.text_extractor.extract_text",
+        "app.services.knowledge_ingestion.text_extractor.extract_text",
         lambda *_args, **_kwargs: "extracted",
     )
 
     files = {"file": ("notes.txt", b"hello world", "text/plain")}
     response = await async_client.post("/api/knowledge/files", files=files, headers=auth_headers)
-    assert response.status_code == 201
+    assert response.status_code == 202
     data = response.json()
-    assert data["total_chunks"] == len(chunks)
-    assert async_calls == chunks
+    assert data["status"] == "queued"
 
+    await knowledge_ingestion.join()
+    assert async_calls == chunks
     file_in_db = db_session.query(KnowledgeFile).first()
-    assert file_in_db is not None
+    db_session.refresh(file_in_db)
+    assert (file_in_db.status, file_in_db.total_chunks, file_in_db.embedded_chunks) == ("ready", 3, 3)
     assert db_session.query(KnowledgeChunk).count() == len(chunks)
 
     delete_resp = await async_client.delete(
@@ -54,3 +58,77 @@ async def test_upload_and_delete_knowledge_file(
     )
     assert delete_resp.status_code == 204
     assert db_session.query(KnowledgeFile).count() == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_ingestion_is_reported_and_only_ready_files_are_retrieved(
+    async_client,
+    db_session,
+    admin,
+    auth_headers,
+    knowledge_ingestion,
+    ws_manager,
+    tmp_path,
+    monkeypatch,
+):
+    monkeypatch.setattr(settings, "KNOWLEDGE_FILES_DIR", str(tmp_path))
+    monkeypatch.setattr(
+        "app.services.knowledge_ingestion.text_extractor.extract_text",
+        lambda path, **_kwargs: path.read_text(),
+    )
+    monkeypatch.setattr(
+        "app.services.knowledge_ingestion.chunking.split_into_chunks",
+        lambda text: [text] if text != "broken" else [],
+    )
+
+    async def fake_embedding(value: str) -> list[float]:
+        return [1.0]
+
+    monkeypatch.setattr("app.services.knowledge_ingestion.embedding_service.get_text_embedding", fake_embedding)
+    monkeypatch.setattr("app.services.rag_service.get_text_embedding", fake_embedding)
+
+    events: list[dict] = []
+    original_broadcast = ws_manager.broadcast
+
+    async def record_broadcast(channel: str, event: dict) -> None:
+        if channel == "system":
+            events.append(event)
+        await original_broadcast(channel, event)
+
+    monkeypatch.setattr(ws_manager, "broadcast", record_broadcast)
+
+    # Чанки файла, который ещё не дошёл до ready, в поиск не попадают.
+    queued = KnowledgeFile(filename_original="queued.txt", stored_path="x", size_bytes=1, status="queued")
+    db_session.add(queued)
+    db_session.flush()
+    db_session.add(KnowledgeChunk(file_id=queued.id, chunk_index=0, text="stale", embedding=[1.0]))
+    db_session.commit()
+
+    for name, body in (("good.txt", b"usable"), ("bad.txt", b"broken")):
+        response = await async_client.post(
+            "/api/knowledge/files", files={"file": (name, body, "text/plain")}, headers=auth_headers
+        )
+        assert response.status_code == 202
+
+    await knowledge_ingestion.join()
+
+    progress = [
+        (event["file"]["filename_original"], event["file"]["status"])
+        for event in events
+        if event["event"] == "knowledge.progress"
+    ]
+    assert [status for name, status in progress if name == "good.txt"] == [
+        "extracting",
+        "chunking",
+        "embedding",
+        "embedding",
+        "ready",
+    ]
+    assert [status for name, status in progress if name == "bad.txt"] == ["extracting", "chunking", "failed"]
+
+    listing = (await async_client.get("/api/knowledge/files", headers=auth_headers)).json()
+    failed = next(item for item in listing if item["filename_original"] == "bad.txt")
+    assert (failed["status"], failed["error_message"]) == ("failed", "Не удалось подготовить чанк")
+
+    matches = await RAGService(db_session).get_relevant_chunks("usable")
+    assert [match.chunk.text for match in matches] == ["usable"]
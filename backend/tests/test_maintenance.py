@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.models import AuditLog, Dialog, DialogStatus, PendingLogin
+from app.services.maintenance import (
+    MaintenanceJob,
+    MaintenanceScheduler,
+    notify_unlocked,
+    purge_pending_logins,
+    release_expired_locks,
+)
+
+
+def _locked_dialog(db_session, telegram_user_id: int, locked_until: datetime | None) -> Dialog:
+    dialog = Dialog(
+        telegram_user_id=telegram_user_id,
+        status=DialogStatus.WAIT_OPERATOR,
+        is_locked=True,
+        locked_until=locked_until,
+    )
+    db_session.add(dialog)
+    db_session.commit()
+    return dialog
+
+
+@pytest.mark.asyncio
+async def test_scheduler_releases_expired_locks_in_one_batch(
+    engine, session_factory, db_session, ws_manager, monkeypatch
+):
+    now = datetime.now(timezone.utc)
+    expired = [_locked_dialog(db_session, index, now - timedelta(minutes=1)) for index in range(3)]
+    active = _locked_dialog(db_session, 100, now + timedelta(minutes=5))
+
+    monkeypatch.setattr("app.services.maintenance.get_ws_manager", lambda: ws_manager)
+    ws_manager.broadcast = AsyncMock()
+    clock = [0.0]
+    scheduler = MaintenanceScheduler(
+        jobs=[MaintenanceJob("release_expired_locks", 10.0, release_expired_locks, notify=notify_unlocked)],
+        engine=engine,
+        session_factory=session_factory,
+        clock=lambda: clock[0],
+    )
+
+    results = await scheduler.run_pending()
+    assert sorted(results["release_expired_locks"]) == sorted(dialog.id for dialog in expired)
+    ws_manager.broadcast.assert_awaited_once()
+    channel, payload = ws_manager.broadcast.await_args.args
+    assert channel == "dialogs"
+    assert payload["event"] == "dialogs.unlocked"
+    assert sorted(payload["dialog_ids"]) == sorted(dialog.id for dialog in expired)
+
+    db_session.expire_all()
+    assert db_session.query(Dialog).filter(Dialog.is_locked.is_(True)).one().id == active.id
+    assert db_session.query(AuditLog).filter(AuditLog.action == "dialog_unlocked").count() == 3
+
+    # До истечения интервала задача не запускается повторно.
+    assert await scheduler.run_pending() == {}
+    clock[0] = 11.0
+    assert await scheduler.run_pending() == {"release_expired_locks": []}
+
+
+def test_release_expired_locks_clears_locks_without_deadline(db_session):
+    now = datetime.now(timezone.utc)
+    stale = _locked_dialog(db_session, 1, None)
+    active = _locked_dialog(db_session, 2, now + timedelta(minutes=5))
+
+    assert release_expired_locks(db_session, now=now) == [stale.id]
+    db_session.expire_all()
+    assert db_session.get(Dialog, stale.id).is_locked is False
+    assert db_session.get(Dialog, active.id).is_locked is True
+
+
+def test_purge_pending_logins_keeps_recent_rows(db_session):
+    now = datetime.now(timezone.utc)
+    db_session.add_all(
+        [
+            PendingLogin(token="old", created_at=now - timedelta(days=1)),
+            PendingLogin(token="fresh", created_at=now - timedelta(minutes=15)),
+        ]
+    )
+    db_session.commit()
+
+    assert purge_pending_logins(db_session, now=now) == 1
+    assert [row.token for row in db_session.query(PendingLogin).all()] == ["fresh"]
+
+
+@pytest.mark.asyncio
+async def test_get_dialog_is_side_effect_free(async_client, db_session, auth_headers):
+    dialog = _locked_dialog(db_session, 5, datetime.now(timezone.utc) - timedelta(minutes=1))
+
+    response = await async_client.get(f"/api/dialogs/{dialog.id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["is_locked"] is False
+
+    db_session.expire_all()
+    assert db_session.get(Dialog, dialog.id).is_locked is True
+    assert db_session.query(AuditLog).count() == 0
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app.core.metrics import PoolMetrics
+
+
+def test_pool_metrics_track_checkouts_and_timeouts(tmp_path):
+    metrics = PoolMetrics()
+    engine = create_engine(
+        f"sqlite+pysqlite:///{tmp_path / 'pool.db'}",
+        poolclass=metrics.pool_class(),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+    )
+    metrics.attach(engine)
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            snapshot = metrics.snapshot(engine.pool)
+            assert snapshot["checked_out"] == 1
+            assert snapshot["pool_size"] == 1
+
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+
+        snapshot = metrics.snapshot(engine.pool)
+        assert snapshot["checked_out"] == 0
+        assert snapshot["peak_checked_out"] == 1
+        assert snapshot["checkouts_total"] == 1
+        assert snapshot["timeouts_total"] == 1
+        assert snapshot["wait_seconds"]["count"] == 2
+        assert snapshot["wait_seconds"]["buckets"]["le_inf"] == 2
+    finally:
+        engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pool_endpoint_requires_superadmin(async_client, auth_headers):
+    response = await async_client.get("/api/internal/db/pool", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["config"]["pool_size"] > 0
+    assert "wait_seconds" in data
+
+    anonymous = await async_client.get("/api/internal/db/pool")
+    assert anonymous.status_code == 401
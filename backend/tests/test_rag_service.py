@@ -12,6 +12,7 @@ def test_rag_returns_relevant_chunk(db_session, monkeypatch):
         mime_type="text/plain",
         size_bytes=10,
         total_chunks=0,
+        status="ready",
     )
     db_session.add(knowledge_file)
     db_session.commit()
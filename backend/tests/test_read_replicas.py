@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.core.db as db_module
+from app.core.db import Base, ReplicaRouter, get_db
+from app.models import Admin, Dialog, DialogStatus
+from app.services.security import create_access_token
+
+
+class ReplicaHarness:
+    """Primary и реплика — два SQLite-файла; отставание реплики задаётся вручную."""
+
+    def __init__(self, tmp_path) -> None:
+        self.primary = create_engine(f"sqlite+pysqlite:///{tmp_path / 'primary.db'}", future=True)
+        self.replica = create_engine(f"sqlite+pysqlite:///{tmp_path / 'replica.db'}", future=True)
+        for engine in (self.primary, self.replica):
+            Base.metadata.create_all(engine)
+        self.replica_lag: float | None = 0.0
+        self.probes = 0
+        self.router = ReplicaRouter(
+            self.primary,
+            [self.replica],
+            max_lag=5.0,
+            check_interval=0.0,
+            lag_probe=self._probe,
+        )
+
+    def _probe(self, _engine) -> float | None:
+        self.probes += 1
+        return self.replica_lag
+
+    def session(self, engine):
+        return sessionmaker(bind=engine, autoflush=False, future=True)()
+
+    def add_dialog(self, engine, telegram_user_id: int) -> None:
+        session = self.session(engine)
+        session.add(
+            Dialog(
+                telegram_user_id=telegram_user_id,
+                status=DialogStatus.WAIT_OPERATOR,
+                last_message_at=datetime.now(timezone.utc),
+            )
+        )
+        session.commit()
+        session.close()
+
+    def dispose(self) -> None:
+        self.primary.dispose()
+        self.replica.dispose()
+
+
+@pytest.fixture()
+def harness(tmp_path, app, monkeypatch):
+    harness = ReplicaHarness(tmp_path)
+    primary_session = harness.session(harness.primary)
+    admin = Admin(telegram_id=1, full_name="Primary Admin", is_superadmin=True, is_active=True)
+    primary_session.add(admin)
+    primary_session.commit()
+    harness.headers = {"Authorization": f"Bearer {create_access_token(admin.id)}"}
+
+    def override_get_db():
+        yield primary_session
+
+    app.dependency_overrides[get_db] = override_get_db
+    monkeypatch.setattr(db_module, "replica_router", harness.router)
+    try:
+        yield harness
+    finally:
+        primary_session.close()
+        harness.dispose()
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_until_it_lags(async_client, harness):
+    harness.add_dialog(harness.primary, 100)
+    harness.add_dialog(harness.replica, 200)
+
+    response = await async_client.get("/api/dialogs", headers=harness.headers)
+    assert [item["telegram_user_id"] for item in response.json()["items"]] == [200]
+
+    harness.replica_lag = 30.0
+    response = await async_client.get("/api/dialogs", headers=harness.headers)
+    assert [item["telegram_user_id"] for item in response.json()["items"]] == [100]
+
+    harness.replica_lag = None  # реплика недоступна
+    response = await async_client.get("/api/dialogs", headers=harness.headers)
+    assert [item["telegram_user_id"] for item in response.json()["items"]] == [100]
+
+
+def test_lag_is_cached_for_check_interval(harness):
+    now = [0.0]
+    router = ReplicaRouter(
+        harness.primary,
+        [harness.replica],
+        max_lag=5.0,
+        check_interval=2.0,
+        lag_probe=harness._probe,
+        clock=lambda: now[0],
+    )
+    assert router.pick() is harness.replica
+    harness.replica_lag = 60.0
+    assert router.pick() is harness.replica
+    assert harness.probes == 1
+    now[0] = 3.0
+    assert router.pick() is harness.primary
+    assert harness.probes == 2
+
+
+def test_concurrent_requests_do_not_wait_for_running_probe(harness):
+    now = [0.0]
+    router = ReplicaRouter(
+        harness.primary,
+        [harness.replica],
+        max_lag=5.0,
+        check_interval=2.0,
+        lag_probe=lambda engine: picked_during_probe.append(router.pick()) or harness._probe(engine),
+        clock=lambda: now[0],
+    )
+    picked_during_probe: list = []
+    # Пока первая проверка не завершилась, другие запросы читают с primary.
+    assert router.pick() is harness.replica
+    assert picked_during_probe == [harness.primary]
+
+    now[0] = 3.0
+    harness.replica_lag = 60.0
+    # Устаревшее значение используется, пока идёт повторная проверка.
+    assert router.pick() is harness.primary
+    assert picked_during_probe == [harness.primary, harness.replica]
+    assert harness.probes == 2
+
+
+def test_replica_session_rejects_writes(harness):
+    session = harness.session(harness.replica)
+    session.info["read_only"] = True
+    session.add(Dialog(telegram_user_id=1, status=DialogStatus.AUTO))
+    with pytest.raises(RuntimeError):
+        session.flush()
+    session.close()
+
+
+@pytest.mark.asyncio
+async def test_get_dialog_on_replica_reports_expired_lock_without_writing(async_client, harness):
+    session = harness.session(harness.replica)
+    dialog = Dialog(
+        telegram_user_id=300,
+        status=DialogStatus.WAIT_OPERATOR,
+        is_locked=True,
+        locked_until=datetime.now(timezone.utc) - timedelta(minutes=1),
+    )
+    session.add(dialog)
+    session.commit()
+
+    response = await async_client.get(f"/api/dialogs/{dialog.id}", headers=harness.headers)
+    assert response.status_code == 200
+    assert response.json()["is_locked"] is False
+    session.refresh(dialog)
+    assert dialog.is_locked is True
+    session.close()
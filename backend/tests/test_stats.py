@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.bot.handlers import handle_update
+from app.models import Dialog, Message, MessageRole, StatsDaily, StatsHourly, StatsMonthly
+from app.services.stats import StatsService
+
+
+@pytest.mark.asyncio
+async def test_rollups_follow_operator_flow(async_client, db_session, auth_headers, ws_manager, monkeypatch):
+    monkeypatch.setattr("app.bot.handlers.send_telegram_message", AsyncMock(return_value=None))
+    monkeypatch.setattr("app.bot.handlers.get_ws_manager", lambda: ws_manager)
+    monkeypatch.setattr("app.api.v1.messages.send_telegram_message", AsyncMock(return_value=None))
+
+    await handle_update({"message": {"chat": {"id": 77}, "from": {}, "text": "Позовите оператора"}}, db_session)
+    dialog = db_session.query(Dialog).filter(Dialog.telegram_user_id == 77).one()
+    assert dialog.waiting_operator_since is not None
+
+    # Оператор ответил через две минуты после эскалации.
+    dialog.waiting_operator_since = datetime.now(timezone.utc) - timedelta(minutes=2)
+    db_session.commit()
+
+    send = await async_client.post(
+        "/api/messages/send", json={"dialog_id": dialog.id, "content": "Здравствуйте!"}, headers=auth_headers
+    )
+    assert send.status_code == 200
+    switch = await async_client.post(f"/api/dialogs/{dialog.id}/switch_auto", headers=auth_headers)
+    assert switch.status_code == 200
+
+    overview = (await async_client.get("/api/stats/overview", headers=auth_headers)).json()
+    assert overview["messages"] == {"user": 1, "ai": 1, "admin": 1}
+    assert overview["ai"]["fallback"] == 1
+    assert overview["dialogs_created"] == 1
+    assert overview["escalations"] == 1
+    first_response = overview["first_response"]
+    assert first_response["count"] == 1 and 115 <= first_response["avg_seconds"] <= 125
+    assert first_response["sla_ratio"] == 1.0
+    assert overview["handle_time"]["count"] == 1
+
+    sla = (await async_client.get("/api/stats/sla", params={"granularity": "day"}, headers=auth_headers)).json()
+    assert len(sla["items"]) == 1
+    assert sla["items"][0]["first_response"]["count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_overview_sums_shards_within_range(async_client, db_session, auth_headers):
+    dialog = Dialog(telegram_user_id=5)
+    db_session.add(dialog)
+    db_session.flush()
+    for day in (1, 2, 10):
+        for role in (MessageRole.USER, MessageRole.USER, MessageRole.AI):
+            db_session.add(
+                Message(
+                    dialog_id=dialog.id,
+                    role=role,
+                    content="x",
+                    created_at=datetime(2024, 6, day, 12, 30, tzinfo=timezone.utc),
+                )
+            )
+            db_session.commit()
+    assert db_session.query(StatsHourly).count() >= 3
+
+    response = await async_client.get(
+        "/api/stats/overview",
+        params={"date_from": "2024-06-01T00:00:00Z", "date_to": "2024-06-03T00:00:00Z"},
+        headers=auth_headers,
+    )
+    assert response.json()["messages"] == {"user": 4, "ai": 2, "admin": 0}
+
+
+def test_long_range_reads_coarse_rollups(db_session):
+    dialog = Dialog(telegram_user_id=6)
+    db_session.add(dialog)
+    db_session.flush()
+    stamps = [
+        datetime(2024, 1, 15, 23, 10, tzinfo=timezone.utc),  # до начала периода
+        datetime(2024, 1, 30, 22, 5, tzinfo=timezone.utc),  # неполные первые сутки
+        datetime(2024, 1, 31, 10, 0, tzinfo=timezone.utc),  # целые сутки
+        datetime(2024, 2, 20, 9, 0, tzinfo=timezone.utc),  # целый месяц
+        datetime(2024, 3, 3, 12, 0, tzinfo=timezone.utc),  # целые сутки
+        datetime(2024, 3, 5, 1, 30, tzinfo=timezone.utc),  # неполные последние сутки
+        datetime(2024, 3, 5, 2, 0, tzinfo=timezone.utc),  # после конца периода
+    ]
+    for stamp in stamps:
+        db_session.add(Message(dialog_id=dialog.id, role=MessageRole.USER, content="x", created_at=stamp))
+        db_session.commit()
+    assert db_session.query(StatsMonthly).filter(StatsMonthly.bucket_start == datetime(2024, 2, 1)).count() == 1
+
+    service = StatsService(db_session)
+    date_from = datetime(2024, 1, 30, 21, 30, tzinfo=timezone.utc)
+    date_to = datetime(2024, 3, 5, 1, 45, tzinfo=timezone.utc)
+    assert [model for model, _lo, _hi in service._parts(*service._bounds(date_from, date_to))] == [
+        StatsHourly,
+        StatsDaily,
+        StatsMonthly,
+        StatsDaily,
+        StatsHourly,
+    ]
+    assert service.totals(date_from, date_to)["messages_user"] == 5
+
+    series = service.series(date_from, date_to, granularity="day")
+    assert [(bucket.day, counters["messages_user"]) for bucket, counters in series] == [
+        (30, 1),
+        (31, 1),
+        (20, 1),
+        (3, 1),
+        (5, 1),
+    ]
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import threading
+
 import pytest
 from unittest.mock import AsyncMock
 
 from app.core.config import settings
-from app.models import Dialog, DialogStatus
+from app.models import Dialog, DialogStatus, Message
+from app.schemas.message import MessageOut
+from app.services.security import invalidate_admin_cache
 
 
 @pytest.mark.asyncio
@@ -31,7 +35,7 @@ async def test_websocket_broadcasts_for_messages_and_knowledge(
 
     monkeypatch.setattr(settings, "KNOWLEDGE_FILES_DIR", str(tmp_path))
     monkeypatch.setattr(
-        "app.services.knowledge_base.chunking.split_into_chunks",
+        "app.services.knowledge_ingestion.chunking.split_into_chunks",
         lambda text: [text],
     )
 
@@ -39,11 +43,11 @@ async def test_websocket_broadcasts_for_messages_and_knowledge(
         return [0.1]
 
     monkeypatch.setattr(
-        "app.services.knowledge_base.embedding_service.get_text_embedding",
+        "app.services.knowledge_ingestion.embedding_service.get_text_embedding",
         fake_embedding,
     )
     monkeypatch.setattr(
-        "app.services.knowledge_base.text_extractor.extract_text",
+        "app.services.knowledge_ingestion.text_extractor.extract_text",
         lambda *_args, **_kwargs: "payload",
     )
 
@@ -58,8 +62,8 @@ async def test_websocket_broadcasts_for_messages_and_knowledge(
             headers=auth_headers,
         )
         assert response.status_code == 200
-        assert ws_messages.receive_json()["event"] == "message.created"
-        assert ws_dialogs.receive_json()["event"] == "dialog.updated"
+        assert ws_messages.receive_json(mode="binary")["event"] == "message.summary"
+        assert ws_dialogs.receive_json(mode="binary")["event"] == "dialog.updated"
 
     with test_client.websocket_connect(
         f"/api/events/system?token={websocket_token}"
@@ -68,12 +72,132 @@ async def test_websocket_broadcasts_for_messages_and_knowledge(
         upload_resp = test_client.post(
             "/api/knowledge/files", files=files, headers=auth_headers
         )
-        assert upload_resp.status_code == 201
-        assert ws_system.receive_json()["event"] == "knowledge.uploaded"
+        assert upload_resp.status_code == 202
+        assert ws_system.receive_json(mode="binary")["event"] == "knowledge.uploaded"
+        statuses = []
+        while not statuses or statuses[-1] not in ("ready", "failed"):
+            event = ws_system.receive_json(mode="binary")
+            assert event["event"] == "knowledge.progress"
+            statuses.append(event["file"]["status"])
+        assert statuses == ["extracting", "chunking", "embedding", "embedding", "ready"]
 
         file_id = upload_resp.json()["id"]
         delete_resp = test_client.delete(
             f"/api/knowledge/files/{file_id}", headers=auth_headers
         )
         assert delete_resp.status_code == 204
-        assert ws_system.receive_json()["event"] == "knowledge.deleted"
+        assert ws_system.receive_json(mode="binary")["event"] == "knowledge.deleted"
+
+
+def test_multiplexed_socket_manages_subscriptions(test_client, db_session, websocket_token, auth_headers, monkeypatch):
+    dialog = Dialog(telegram_user_id=778, status=DialogStatus.WAIT_OPERATOR)
+    db_session.add(dialog)
+    db_session.commit()
+    monkeypatch.setattr("app.api.v1.messages.send_telegram_message", AsyncMock(return_value=None))
+
+    with test_client.websocket_connect(f"/api/events?token={websocket_token}&channels=messages") as ws:
+        reply = ws.receive_json(mode="binary")
+        assert (reply["event"], reply["channels"]) == ("subscriptions", ["messages"])
+        assert {"stream", "seq"} <= reply.keys()
+
+        ws.send_json({"action": "subscribe", "channels": ["dialogs", "bogus"]})
+        reply = ws.receive_json(mode="binary")
+        assert (reply["channels"], reply["unknown"]) == (["dialogs", "messages"], ["bogus"])
+
+        response = test_client.post(
+            "/api/messages/send",
+            json={"dialog_id": dialog.id, "content": "Ping"},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        first, second = ws.receive_json(mode="binary"), ws.receive_json(mode="binary")
+        assert (first["channel"], first["event"]) == ("messages", "message.summary")
+        assert (second["channel"], second["event"]) == ("dialogs", "dialog.updated")
+
+        ws.send_json({"action": "unsubscribe", "channel": "messages"})
+        assert ws.receive_json(mode="binary")["channels"] == ["dialogs"]
+
+
+def test_dialog_topic_gets_full_message_and_inbox_gets_summary(
+    test_client, db_session, admin, websocket_token, auth_headers, monkeypatch
+):
+    admin.is_superadmin = False
+    dialog = Dialog(telegram_user_id=779, status=DialogStatus.WAIT_OPERATOR)
+    db_session.add(dialog)
+    db_session.commit()
+    invalidate_admin_cache()
+    monkeypatch.setattr("app.api.v1.messages.send_telegram_message", AsyncMock(return_value=None))
+    content = "x" * 500
+
+    with test_client.websocket_connect(f"/api/events?token={websocket_token}") as ws:
+        ws.send_json(
+            {
+                "action": "subscribe",
+                "channels": [f"dialog:{dialog.id}", f"assigned:{admin.id}", f"assigned:{admin.id + 1}", "dialog:x"],
+            }
+        )
+        reply = ws.receive_json(mode="binary")
+        assert reply["channels"] == sorted([f"dialog:{dialog.id}", f"assigned:{admin.id}"])
+        assert reply["unknown"] == sorted([f"assigned:{admin.id + 1}", "dialog:x"])
+
+        response = test_client.post(
+            "/api/messages/send",
+            json={"dialog_id": dialog.id, "content": content},
+            headers=auth_headers,
+        )
+        assert response.status_code == 200
+        full, summary, updated = (ws.receive_json(mode="binary") for _ in range(3))
+
+    assert full["channel"] == f"dialog:{dialog.id}"
+    assert full["event"] == "message.created"
+    assert full["message"]["content"] == content
+    # Тело собирается без pydantic, но совпадает с ответом REST.
+    message = db_session.get(Message, full["message"]["id"])
+    assert full["message"] == MessageOut.model_validate(message).model_dump(mode="json")
+    assert summary["channel"] == f"assigned:{admin.id}"
+    assert summary["event"] == "message.summary"
+    assert summary["preview"] == content[:140]
+    assert "message" not in summary
+    assert (updated["channel"], updated["event"]) == (f"assigned:{admin.id}", "dialog.updated")
+
+
+def _receive_json(ws, timeout: float = 2.0) -> dict:
+    """receive_json с таймаутом: непришедшее событие валит тест, а не вешает его."""
+    received: list[dict] = []
+    reader = threading.Thread(target=lambda: received.append(ws.receive_json(mode="binary")), daemon=True)
+    reader.start()
+    reader.join(timeout)
+    if not received:
+        pytest.fail(f"No WebSocket frame within {timeout}s")
+    return received[0]
+
+
+def test_resubscribe_with_since_receives_only_missed_events(test_client, ws_manager, websocket_token):
+    manager = ws_manager
+    with test_client.websocket_connect(f"/api/events?token={websocket_token}&channels=system") as ws:
+        reply = ws.receive_json(mode="binary")
+        stream, since = reply["stream"], reply["seq"]
+
+    test_client.portal.call(manager.broadcast, "system", {"event": "knowledge.uploaded", "file": {"id": 1}})
+    test_client.portal.call(manager.broadcast, "system", {"event": "knowledge.deleted", "file": {"id": 1}})
+
+    with test_client.websocket_connect(f"/api/events?token={websocket_token}") as ws:
+        ws.send_json({"action": "subscribe", "channels": ["system"], "since": since, "stream": stream})
+        assert _receive_json(ws)["event"] == "subscriptions"
+        missed = [_receive_json(ws), _receive_json(ws)]
+
+        # Без stream номер since не с чем сверить — только полная пересинхронизация.
+        ws.send_json({"action": "subscribe", "channels": ["system"], "since": since})
+        assert _receive_json(ws)["event"] == "subscriptions"
+        assert _receive_json(ws)["event"] == "resync.required"
+
+    assert [item["event"] for item in missed] == ["knowledge.uploaded", "knowledge.deleted"]
+    assert [item["seq"] for item in missed] == [since + 1, since + 2]
+
+
+@pytest.mark.asyncio
+async def test_websocket_stats_endpoint_is_superadmin_only(async_client, auth_headers):
+    response = await async_client.get("/api/internal/ws", headers=auth_headers)
+    assert response.status_code == 200
+    assert {"connections", "channels", "dropped_total", "send_seconds", "config"} <= response.json().keys()
+    assert (await async_client.get("/api/internal/ws")).status_code == 401
@@ -0,0 +1,358 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import sqlalchemy
+
+from app.api.v1.ws import _receive_frames
+from app.core import event_bus, json_codec
+from app.core.event_bus import InProcessEventBus, PostgresEventBus
+from app.core.ws_manager import BATCH_EVENT, RESYNC_REQUIRED_EVENT, ReplayBuffer, WebSocketManager, encode_event
+from app.models import DialogStatus, WsEventPayload
+from app.services.maintenance import purge_event_payloads
+
+
+class FakeWebSocket:
+    def __init__(self, *, blocked: bool = False, broken: bool = False) -> None:
+        self.sent: list[dict] = []
+        self.closed_with: int | None = None
+        self.broken = broken
+        self.unblocked = asyncio.Event()
+        if not blocked:
+            self.unblocked.set()
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_bytes(self, message: bytes) -> None:
+        await self.unblocked.wait()
+        if self.broken:
+            raise RuntimeError("connection reset")
+        self.sent.append(json.loads(message))
+
+    async def close(self, code: int = 1000) -> None:
+        self.closed_with = code
+
+
+async def _drain() -> None:
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_slow_consumer_does_not_delay_others_and_gets_resync():
+    manager = WebSocketManager(queue_size=3, send_timeout=5)
+    fast, slow = FakeWebSocket(), FakeWebSocket(blocked=True)
+    await manager.connect(fast, "dialogs")
+    await manager.connect(slow, "dialogs")
+
+    for index in range(10):
+        await asyncio.wait_for(manager.broadcast("dialogs", {"event": "dialog.updated", "n": index}), 0.1)
+        await _drain()
+
+    assert [item["n"] for item in fast.sent] == list(range(10))
+    assert slow.sent == []
+
+    slow.unblocked.set()
+    await _drain()
+    events = [item["event"] for item in slow.sent]
+    assert RESYNC_REQUIRED_EVENT in events
+    assert len(slow.sent) <= 4
+    assert slow.sent[-1].get("n") == 9
+
+
+@pytest.mark.asyncio
+async def test_close_policy_and_failed_sends_unregister_connection():
+    manager = WebSocketManager(queue_size=1, send_timeout=5, overflow_policy="close")
+    slow, broken = FakeWebSocket(blocked=True), FakeWebSocket(broken=True)
+    await manager.connect(slow, "messages")
+    await manager.connect(broken, "messages")
+
+    for index in range(3):
+        await manager.broadcast("messages", {"n": index})
+    await _drain()
+
+    assert slow.closed_with == 1013
+    assert manager.deliver_local("messages", encode_event({"n": 99})) == 0
+
+    # Повторное отключение из обработчика сокета безопасно.
+    await manager.disconnect(slow, "messages")
+    await manager.disconnect(broken, "messages")
+
+
+@pytest.mark.asyncio
+async def test_event_is_encoded_once_for_all_channels_and_clients(monkeypatch):
+    calls = []
+    original = event_bus.dumps
+    monkeypatch.setattr(event_bus, "dumps", lambda payload: calls.append(payload) or original(payload))
+
+    manager = WebSocketManager()
+    sockets = [FakeWebSocket() for _ in range(20)]
+    for index, websocket in enumerate(sockets):
+        await manager.connect(websocket, "messages" if index % 2 else "dialogs")
+
+    event = encode_event({"event": "message.created", "dialog_id": 1})
+    await manager.broadcast("messages", event)
+    await manager.broadcast("dialogs", event)
+    await _drain()
+
+    assert len(calls) == 1
+    assert all(
+        websocket.sent == [{"seq": 1 if index % 2 else 2, "event": "message.created", "dialog_id": 1}]
+        for index, websocket in enumerate(sockets)
+    )
+
+
+def test_stdlib_fallback_matches_orjson_output(monkeypatch):
+    payload = {
+        "status": DialogStatus.WAIT_OPERATOR,
+        "created_at": datetime(2024, 6, 1, 12, 30, tzinfo=timezone.utc),
+        "text": "Привет",
+        "ids": [1, 2],
+    }
+    fast = json_codec.dumps(payload)
+    monkeypatch.setattr(json_codec, "orjson", None)
+    assert json_codec.dumps(payload) == fast
+    assert json_codec.loads(fast)["created_at"] == "2024-06-01T12:30:00+00:00"
+
+
+@pytest.mark.asyncio
+async def test_event_published_on_one_worker_reaches_all_workers():
+    bus = InProcessEventBus()
+    worker_a, worker_b = WebSocketManager(), WebSocketManager()
+    await worker_a.start(bus)
+    await worker_b.start(bus)
+    on_a, on_b = FakeWebSocket(), FakeWebSocket()
+    await worker_a.connect(on_a, "dialogs")
+    await worker_b.connect(on_b, "dialogs")
+
+    await worker_b.broadcast("dialogs", {"event": "dialog.updated", "dialog_id": 7})
+    await worker_b.flush()
+    await _drain()
+    assert on_a.sent == on_b.sent == [{"seq": 1, "channel": "dialogs", "event": "dialog.updated", "dialog_id": 7}]
+
+    await worker_a.stop()
+    await worker_b.broadcast("dialogs", {"event": "dialog.updated", "dialog_id": 8})
+    await worker_b.flush()
+    await _drain()
+    assert len(on_a.sent) == 1
+    assert len(on_b.sent) == 2
+
+
+@pytest.mark.asyncio
+async def test_postgres_bus_resolves_oversized_payloads_from_table(engine, db_session):
+    row = WsEventPayload(channel="messages", payload='{"event":"message.created","dialog_id":1}')
+    db_session.add(row)
+    db_session.commit()
+
+    received: list[tuple[str, dict]] = []
+    bus = PostgresEventBus(engine=engine)
+    # Поток LISTEN не запускаем: уведомления подаются напрямую.
+    bus._subscribers.append((asyncio.get_running_loop(), lambda channel, event: received.append((channel, event.payload))))
+
+    bus._on_notify('dialogs\n{"event":"dialog.updated","dialog_id":2}')
+    bus._on_notify(f"messages\n@{row.id}")
+    bus._on_notify("messages\n@999")
+    await _drain()
+
+    assert received == [
+        ("dialogs", {"event": "dialog.updated", "dialog_id": 2}),
+        ("messages", {"event": "message.created", "dialog_id": 1}),
+    ]
+
+
+class _NoListener:
+    def __init__(self, *args, **kwargs) -> None:
+        pass
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_postgres_bus_batches_notifies_and_falls_back_to_local_delivery(engine, monkeypatch):
+    notified: list[str] = []
+    transactions: list[int] = []
+    # В SQLite нет pg_notify: регистрируем функцию с тем же именем на соединении теста.
+    engine.raw_connection().driver_connection.create_function(
+        "pg_notify", 2, lambda _channel, message: notified.append(message)
+    )
+    sqlalchemy.event.listen(engine, "begin", lambda _connection: transactions.append(len(notified)))
+    monkeypatch.setattr(event_bus, "PgNotifyListener", _NoListener)
+
+    bus = PostgresEventBus(engine=engine, queue_size=3, batch_size=10)
+    manager = WebSocketManager(coalesce_window=0)
+    await manager.start(bus)
+    websocket = FakeWebSocket()
+    await manager.connect(websocket, "system")
+
+    # broadcast не ждёт БД: три события встают в очередь, остальные не влезают.
+    for name in ("a", "a", "b", "c", "d"):
+        await manager.broadcast("system", {"event": name})
+    await _drain()
+    assert [event["event"] for event in websocket.sent] == ["c", "d"]
+
+    for _ in range(100):
+        if len(notified) == 3:
+            break
+        await asyncio.sleep(0.01)
+    assert [json.loads(message.partition("\n")[2])["event"] for message in notified] == ["a", "a", "b"]
+    # Одинаковые NOTIFY в одной транзакции PostgreSQL склеил бы: повтор уходит во второй.
+    assert transactions == [0, 1]
+    await manager.stop()
+
+
+def test_purge_event_payloads_removes_only_old_rows(db_session):
+    now = datetime.now(timezone.utc)
+    db_session.add_all(
+        [
+            WsEventPayload(channel="messages", payload="{}", created_at=now - timedelta(hours=1)),
+            WsEventPayload(channel="messages", payload="{}", created_at=now),
+        ]
+    )
+    db_session.commit()
+
+    assert purge_event_payloads(db_session, now=now) == 1
+    assert db_session.query(WsEventPayload).count() == 1
+
+
+@pytest.mark.asyncio
+async def test_one_connection_receives_only_subscribed_channels():
+    manager = WebSocketManager()
+    websocket = FakeWebSocket()
+    await manager.accept(websocket)
+    manager.subscribe(websocket, "dialogs")
+    manager.subscribe(websocket, "system")
+
+    await manager.broadcast("dialogs", {"event": "dialog.updated"})
+    await manager.broadcast("messages", {"event": "message.created"})
+    manager.unsubscribe(websocket, "dialogs")
+    await manager.broadcast("dialogs", {"event": "dialog.updated"})
+    await manager.broadcast("system", {"event": "knowledge.uploaded"})
+    await _drain()
+
+    assert [(item["channel"], item["event"]) for item in websocket.sent] == [
+        ("dialogs", "dialog.updated"),
+        ("system", "knowledge.uploaded"),
+    ]
+    assert manager.channels_of(websocket) == {"system"}
+    manager.release(websocket)
+    assert manager.deliver_local("system", encode_event({})) == 0
+
+
+@pytest.mark.asyncio
+async def test_dialog_updates_are_coalesced_into_one_frame_per_tick():
+    manager = WebSocketManager(coalesce_window=0.01)
+    websocket = FakeWebSocket()
+    await manager.connect(websocket, "dialogs")
+
+    for status in ("wait_operator", "wait_user", "auto"):
+        await manager.broadcast("dialogs", {"event": "dialog.updated", "dialog_id": 1, "status": status})
+    await manager.broadcast("dialogs", {"event": "dialog.updated", "dialog_id": 2, "status": "auto"})
+    await _drain()
+    assert websocket.sent == []
+
+    await asyncio.sleep(0.05)
+    await _drain()
+    assert websocket.sent == [
+        {
+            "seq": 1,
+            "channel": "dialogs",
+            "event": BATCH_EVENT,
+            "dialogs": [
+                {"channel": "dialogs", "event": "dialog.updated", "dialog_id": 1, "status": "auto"},
+                {"channel": "dialogs", "event": "dialog.updated", "dialog_id": 2, "status": "auto"},
+            ],
+        }
+    ]
+
+    # Другое событие канала сначала выталкивает накопленное обновление.
+    await manager.broadcast("dialogs", {"event": "dialog.updated", "dialog_id": 3})
+    await manager.broadcast("dialogs", {"event": "dialogs.unlocked", "dialog_ids": [3]})
+    await _drain()
+    assert [item["event"] for item in websocket.sent[1:]] == ["dialog.updated", "dialogs.unlocked"]
+
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_missed_events_or_requests_resync():
+    manager = WebSocketManager(coalesce_window=0, replay_size=3)
+    first = FakeWebSocket()
+    await manager.connect(first, "dialogs")
+    await manager.broadcast("dialogs", {"event": "dialog.updated", "dialog_id": 1})
+    await _drain()
+    last_seq = first.sent[-1]["seq"]
+    manager.release(first)
+
+    await manager.broadcast("dialogs", {"event": "dialog.updated", "dialog_id": 2})
+    await manager.broadcast("system", {"event": "knowledge.uploaded"})
+    await manager.broadcast("dialogs", {"event": "dialog.updated", "dialog_id": 3})
+
+    resumed = FakeWebSocket()
+    await manager.connect(resumed, "dialogs")
+    assert manager.resume(resumed, ["dialogs"], last_seq, stream=manager.history.stream)
+    await _drain()
+    assert [(item["seq"], item["dialog_id"]) for item in resumed.sent] == [(2, 2), (4, 3)]
+
+    # Ещё три события канала вытесняют seq 2 из буфера на 3 события.
+    for dialog_id in (4, 5, 6):
+        await manager.broadcast("dialogs", {"event": "dialog.updated", "dialog_id": dialog_id})
+    for since, stream in ((last_seq, manager.history.stream), (4, "other-worker")):
+        late = FakeWebSocket()
+        await manager.connect(late, "dialogs")
+        assert not manager.resume(late, ["dialogs"], since, stream=stream)
+        await _drain()
+        assert late.sent == [{"event": RESYNC_REQUIRED_EVENT}]
+
+
+def test_replay_buffer_respects_topic_size_and_byte_budget():
+    history = ReplayBuffer(size=100, topic_size=2, max_channels=10, max_bytes=400)
+    for _ in range(5):
+        history.append("dialog:1", encode_event({"event": "message.created", "body": "x" * 20}))
+    assert history.replay(["dialog:1"], 3) is not None
+    assert history.replay(["dialog:1"], 2) is None
+
+    for index in range(20):
+        history.append("dialogs", encode_event({"event": "dialog.updated", "dialog_id": index}))
+    assert history.bytes <= 400
+    # Старые события вытеснены бюджетом, последние доступны.
+    assert history.replay(["dialogs"], 5) is None
+    assert len(history.replay(["dialogs"], history.seq - 2)) == 2
+
+
+class SilentWebSocket(FakeWebSocket):
+    async def receive_text(self) -> str:
+        await asyncio.Event().wait()
+        return ""
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_idle_eviction_and_per_admin_cap():
+    manager = WebSocketManager(heartbeat_interval=0.01, idle_timeout=0.05, max_per_admin=2)
+    silent = SilentWebSocket()
+    await manager.connect(silent, "dialogs", admin_id=1)
+    frames = [frame async for frame in _receive_frames(silent, manager=manager)]
+    await _drain()
+
+    assert frames == []
+    assert {"event": "ping"} in silent.sent
+    assert silent.closed_with == 1001
+    assert manager.connection_count() == 0
+
+    oldest, middle, newest = FakeWebSocket(), FakeWebSocket(), FakeWebSocket()
+    for websocket in (oldest, middle, newest):
+        await manager.connect(websocket, "dialogs", admin_id=7)
+    await _drain()
+    assert oldest.closed_with == 1008
+    assert manager.connection_count() == 2
+
+    stats = manager.stats()
+    assert stats["channels"] == {"dialogs": 2}
+    assert stats["admins"] == 1
+    assert stats["idle_evictions_total"] == stats["cap_evictions_total"] == 1
+    assert stats["sent_total"] >= 1
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi.websockets import WebSocketDisconnect
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+
+import app.api.v1.ws as ws_api
+from app.core.db import Base
+from app.core.ws_manager import WebSocketManager
+from app.models import Admin
+from app.services.security import create_access_token
+
+CONNECTIONS = 2000
+
+
+class IdleWebSocket:
+    """Сокет, который молчит, пока тест не закроет его."""
+
+    def __init__(self, token: str, closed: asyncio.Event) -> None:
+        self.query_params = {"token": token, "channels": "dialogs"}
+        self.cookies: dict[str, str] = {}
+        self.sent: list[bytes] = []
+        self._closed = closed
+
+    async def accept(self) -> None:
+        pass
+
+    async def send_bytes(self, message: bytes) -> None:
+        self.sent.append(message)
+
+    async def receive_text(self) -> str:
+        await self._closed.wait()
+        raise WebSocketDisconnect(code=1000)
+
+    async def close(self, code: int = 1000, reason: str | None = None) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_thousands_of_websockets_do_not_hold_pool_connections(tmp_path, monkeypatch):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'ws.db'}",
+        poolclass=QueuePool,
+        pool_size=2,
+        max_overflow=0,
+        pool_timeout=5,
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    with factory() as db:
+        admin = Admin(telegram_id=1, full_name="Operator", is_active=True)
+        db.add(admin)
+        db.commit()
+        token = create_access_token(admin.id)
+    monkeypatch.setattr(ws_api, "SessionLocal", factory)
+
+    manager = WebSocketManager(coalesce_window=0, max_per_admin=0)
+    closed = asyncio.Event()
+    sockets = [IdleWebSocket(token, closed) for _ in range(CONNECTIONS)]
+    tasks = [asyncio.create_task(ws_api.multiplexed_events(websocket, manager=manager)) for websocket in sockets]
+
+    while manager.connection_count() < CONNECTIONS:
+        await asyncio.sleep(0.01)
+        assert not any(task.done() for task in tasks)
+    # Все сокеты открыты, а пул из двух соединений свободен.
+    assert engine.pool.checkedout() == 0
+
+    await manager.broadcast("dialogs", {"event": "dialog.updated", "dialog_id": 1})
+    while not all(len(websocket.sent) == 2 for websocket in sockets):
+        await asyncio.sleep(0.01)
+    closed.set()
+    await asyncio.gather(*tasks)
+    assert manager.connection_count() == 0
+    engine.dispose()
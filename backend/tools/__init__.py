@@ -0,0 +1 @@
+"""Вспомогательные инструменты разработчика (не входят в приложение)."""
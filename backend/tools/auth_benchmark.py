@@ -0,0 +1,73 @@
+"""Микробенчмарк стоимости аутентификации одного запроса.
+
+Сравнивает путь «middleware + зависимость» без кэшей (две проверки подписи
+JWT и запрос администратора в БД) и с кэшами проверенных токенов и
+администраторов::
+
+    python -m tools.auth_benchmark --iterations 20000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.db import Base
+from app.models import Admin
+from app.services import security
+
+
+def _measure(iterations: int, step: Callable[[], None]) -> float:
+    """Среднее время одного вызова step в микросекундах."""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        step()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(engine)
+    session_factory = sessionmaker(bind=engine, future=True)
+    with session_factory() as db:
+        admin = Admin(telegram_id=1, full_name="Bench", is_active=True)
+        db.add(admin)
+        db.commit()
+        token = security.create_access_token(admin.id)
+
+    def uncached() -> None:
+        security.clear_token_cache()
+        security.invalidate_admin_cache()
+        security.decode_token(token)
+        with session_factory() as db:
+            security.verify_token(token, db=db)
+
+    def cached() -> None:
+        security.decode_token(token)
+        with session_factory() as db:
+            security.verify_token(token, db=db)
+
+    cached()
+    before = _measure(args.iterations, uncached)
+    cached()
+    after = _measure(args.iterations, cached)
+    print(f"auth per request, no caches: {before:8.1f} us")
+    print(f"auth per request, cached:    {after:8.1f} us ({before / after:.1f}x)")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
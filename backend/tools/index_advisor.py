@@ -0,0 +1,169 @@
+"""Index advisor: прогоняет EXPLAIN для SELECT-запросов тестов и ищет seq scan.
+
+Подключается как pytest-плагин::
+
+    python -m pytest -p tools.index_advisor
+
+Каждый SELECT, выполненный любым движком SQLAlchemy, повторяется с префиксом
+``EXPLAIN QUERY PLAN`` (SQLite) или ``EXPLAIN (FORMAT JSON)`` (PostgreSQL) на
+том же соединении. Полные сканирования «больших» таблиц собираются в отчёт в
+конце прогона.
+
+Переменные окружения:
+
+* ``INDEX_ADVISOR_TABLES`` — список больших таблиц через запятую;
+* ``INDEX_ADVISOR_REPORT`` — путь для JSON-отчёта (опционально).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import asdict, dataclass
+from typing import Any, Iterable
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_LARGE_TABLES = ("messages", "dialogs", "audit_logs", "knowledge_chunks", "pending_logins")
+
+_SQLITE_SCAN_RE = re.compile(r"^SCAN (?:TABLE )?(?P<table>\w+)(?P<rest>.*)$")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+@dataclass
+class SeqScanFinding:
+    table: str
+    statement: str
+    plan: str
+    count: int = 1
+
+
+def analyze_sqlite_plan(rows: Iterable[Any], tables: Iterable[str]) -> list[tuple[str, str]]:
+    """Вернуть (таблица, строка плана) для полных сканирований в EXPLAIN QUERY PLAN."""
+    watched = set(tables)
+    found: list[tuple[str, str]] = []
+    for row in rows:
+        detail = str(row[-1])
+        match = _SQLITE_SCAN_RE.match(detail)
+        if not match or match.group("table") not in watched:
+            continue
+        # «SCAN t USING COVERING INDEX» — обход индекса, а не таблицы.
+        if "USING" in match.group("rest"):
+            continue
+        found.append((match.group("table"), detail))
+    return found
+
+
+def analyze_postgres_plan(plan: Any, tables: Iterable[str]) -> list[tuple[str, str]]:
+    """Вернуть (таблица, описание узла) для Seq Scan в EXPLAIN (FORMAT JSON)."""
+    watched = set(tables)
+    found: list[tuple[str, str]] = []
+
+    def _walk(node: dict[str, Any]) -> None:
+        if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") in watched:
+            found.append(
+                (
+                    node["Relation Name"],
+                    f"Seq Scan on {node['Relation Name']} (rows={node.get('Plan Rows')}, filter={node.get('Filter')})",
+                )
+            )
+        for child in node.get("Plans", []):
+            _walk(child)
+
+    for entry in plan or []:
+        _walk(entry.get("Plan", {}))
+    return found
+
+
+def _normalize(statement: str) -> str:
+    return _WHITESPACE_RE.sub(" ", statement).strip()
+
+
+class IndexAdvisor:
+    """Слушатель движков SQLAlchemy, собирающий полные сканирования таблиц."""
+
+    def __init__(self, tables: Iterable[str] = DEFAULT_LARGE_TABLES) -> None:
+        self.tables = tuple(tables)
+        self.findings: dict[tuple[str, str], SeqScanFinding] = {}
+        self.explained = 0
+
+    def install(self) -> None:
+        event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def uninstall(self) -> None:
+        if event.contains(Engine, "after_cursor_execute", self._after_cursor_execute):
+            event.remove(Engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if executemany or not statement.lstrip().upper().startswith("SELECT"):
+            return
+        try:
+            found = self._explain(conn, statement, parameters)
+        except Exception:
+            # Запрос может не пережить повторный прогон (временные таблицы и т.п.) — пропускаем.
+            return
+        self.explained += 1
+        normalized = _normalize(statement)
+        for table, plan in found:
+            key = (table, normalized)
+            if key in self.findings:
+                self.findings[key].count += 1
+            else:
+                self.findings[key] = SeqScanFinding(table=table, statement=normalized, plan=plan)
+
+    def _explain(self, conn, statement: str, parameters: Any) -> list[tuple[str, str]]:
+        dialect = conn.dialect.name
+        raw_cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            if dialect == "sqlite":
+                raw_cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                return analyze_sqlite_plan(raw_cursor.fetchall(), self.tables)
+            if dialect == "postgresql":
+                raw_cursor.execute(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+                plan = raw_cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                return analyze_postgres_plan(plan, self.tables)
+        finally:
+            raw_cursor.close()
+        return []
+
+    def report_lines(self) -> list[str]:
+        findings = sorted(self.findings.values(), key=lambda item: (-item.count, item.table))
+        lines = [f"index advisor: {self.explained} SELECT explained, {len(findings)} seq scan pattern(s)"]
+        for finding in findings:
+            lines.append(f"  [{finding.table}] x{finding.count}: {finding.plan}")
+            lines.append(f"      {finding.statement[:300]}")
+        return lines
+
+    def write_report(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump([asdict(item) for item in self.findings.values()], fh, ensure_ascii=False, indent=2)
+
+
+_advisor: IndexAdvisor | None = None
+
+
+def pytest_configure(config) -> None:
+    global _advisor
+    tables = os.getenv("INDEX_ADVISOR_TABLES")
+    _advisor = IndexAdvisor([t.strip() for t in tables.split(",") if t.strip()] if tables else DEFAULT_LARGE_TABLES)
+    _advisor.install()
+
+
+def pytest_unconfigure(config) -> None:
+    if _advisor is not None:
+        _advisor.uninstall()
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config) -> None:
+    if _advisor is None:
+        return
+    terminalreporter.section("index advisor")
+    for line in _advisor.report_lines():
+        terminalreporter.write_line(line)
+    report_path = os.getenv("INDEX_ADVISOR_REPORT")
+    if report_path:
+        _advisor.write_report(report_path)
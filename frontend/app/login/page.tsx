@@ -5,10 +5,11 @@ import { useRouter } from "next/navigation";
 import { useCallback, useEffect, useMemo, useState } from "react";
 
 import { useAuth } from "../../contexts/AuthContext";
-import { createLoginIntent, pollLoginStatus } from "../../services/authApi";
+import { createLoginIntent, waitLoginStatus } from "../../services/authApi";
 import type { LoginIntentResponse, LoginStatus } from "../../types/auth";
 
-const POLL_INTERVAL_MS = 3000;
+// Пауза перед повтором только после ошибки: ожидание выполняет long-poll на сервере.
+const RETRY_INTERVAL_MS = 3000;
 
 type FlowState = "idle" | LoginStatus;
 
@@ -91,13 +92,13 @@ export default function LoginPage() {
 
     const poll = async () => {
       try {
-        const result = await pollLoginStatus(intent.token);
+        const result = await waitLoginStatus(intent.token);
         if (isCancelled) {
           return;
         }
 
         if (result.status === "pending") {
-          timeout = setTimeout(poll, POLL_INTERVAL_MS);
+          timeout = setTimeout(poll, 0);
           return;
         }
 
@@ -126,7 +127,7 @@ export default function LoginPage() {
         }
         console.error(err);
         setError("Не удалось проверить статус. Повторяем попытку…");
-        timeout = setTimeout(poll, POLL_INTERVAL_MS * 2);
+        timeout = setTimeout(poll, RETRY_INTERVAL_MS * 2);
       }
     };
 
@@ -9,6 +9,7 @@ import type {
 
 const LOGIN_INTENT_PATH = "/api/auth/init";
 const LOGIN_STATUS_PATH = "/api/auth/status";
+const LOGIN_STATUS_WAIT_PATH = "/api/auth/status/wait";
 const ME_PATH = "/api/auth/me";
 const LOGOUT_PATH = "/api/auth/logout";
 
@@ -42,6 +43,17 @@ export async function pollLoginStatus(token: string): Promise<NormalizedLoginSta
   };
 }
 
+// Long-poll: сервер отвечает сразу после подтверждения или по таймауту со статусом "pending".
+export async function waitLoginStatus(token: string): Promise<NormalizedLoginStatusResponse> {
+  const params = new URLSearchParams({ token });
+  const raw = await apiFetch<PendingLoginStatusResponse>(`${LOGIN_STATUS_WAIT_PATH}?${params.toString()}`);
+  return {
+    status: normalizeStatus(raw.status),
+    admin: raw.admin ?? null,
+    confirmedAt: raw.confirmed_at ?? null,
+  };
+}
+
 export async function fetchMe(): Promise<AuthMeResponse> {
   return apiFetch<AuthMeResponse>(ME_PATH);
 }
@@ -20,6 +20,7 @@ export type DialogShort = {
 
 export type DialogDetail = DialogShort & {
   messages: MessageOut[];
+  has_more_messages?: boolean;
   created_at?: string | null;
   updated_at?: string | null;
 };
@@ -27,9 +28,22 @@ export type DialogDetail = DialogShort & {
 export type DialogListResponse = {
   items: DialogShort[];
   total: number;
+  total_is_estimate?: boolean;
   page: number;
   per_page: number;
   has_next: boolean;
+  next_cursor?: string | null;
+};
+
+export type MessagePage = {
+  items: MessageOut[];
+  has_more: boolean;
+};
+
+export type FetchDialogMessagesParams = {
+  beforeId?: number;
+  afterId?: number;
+  limit?: number;
 };
 
 export type DialogSwitchAutoResponse = {
@@ -37,6 +51,30 @@ export type DialogSwitchAutoResponse = {
   status: DialogStatus;
 };
 
+export type InboxItem = {
+  id: number;
+  status: DialogStatus;
+  assigned_admin_id?: number | null;
+  unread_messages_count: number;
+  is_locked: boolean;
+  locked_until?: string | null;
+  last_message_at?: string | null;
+  updated_at?: string | null;
+};
+
+export type InboxSnapshot = {
+  items: InboxItem[];
+  version: string;
+  truncated: boolean;
+};
+
+export type InboxDelta = {
+  items: InboxItem[];
+  version: string;
+  // Изменений слишком много — нужен новый снимок.
+  reset: boolean;
+};
+
 export type FetchDialogsParams = {
   page?: number;
   perPage?: number;
@@ -70,10 +108,38 @@ export async function fetchDialogs(params: FetchDialogsParams = {}): Promise<Dia
   return apiFetch<DialogListResponse>(url);
 }
 
+export async function fetchInboxSnapshot(): Promise<InboxSnapshot> {
+  return apiFetch<InboxSnapshot>(`${DIALOGS_PATH}/inbox`);
+}
+
+export async function fetchInboxChanges(since: string): Promise<InboxDelta> {
+  const searchParams = new URLSearchParams({ since });
+  return apiFetch<InboxDelta>(`${DIALOGS_PATH}/inbox/changes?${searchParams.toString()}`);
+}
+
 export async function fetchDialog(dialogId: number): Promise<DialogDetail> {
   return apiFetch<DialogDetail>(`${DIALOGS_PATH}/${dialogId}`);
 }
 
+export async function fetchDialogMessages(
+  dialogId: number,
+  params: FetchDialogMessagesParams = {},
+): Promise<MessagePage> {
+  const searchParams = new URLSearchParams();
+  if (params.beforeId) {
+    searchParams.set("before_id", params.beforeId.toString());
+  }
+  if (params.afterId !== undefined) {
+    searchParams.set("after_id", params.afterId.toString());
+  }
+  if (params.limit) {
+    searchParams.set("limit", params.limit.toString());
+  }
+  const queryString = searchParams.toString();
+  const url = `${DIALOGS_PATH}/${dialogId}/messages`;
+  return apiFetch<MessagePage>(queryString ? `${url}?${queryString}` : url);
+}
+
 export async function assignDialog(dialogId: number, adminId?: number | null): Promise<DialogDetail> {
   return apiFetch<DialogDetail>(`${DIALOGS_PATH}/${dialogId}/assign`, {
     method: "POST",
@@ -2,11 +2,16 @@ import { apiFetch } from "./apiClient";
 
 const KNOWLEDGE_FILES_PATH = "/api/knowledge/files";
 
+export type KnowledgeFileStatus = "queued" | "extracting" | "chunking" | "embedding" | "ready" | "failed";
+
 export type KnowledgeFile = {
   id: number;
   filename_original: string;
   size_bytes: number;
   total_chunks: number;
+  status: KnowledgeFileStatus;
+  embedded_chunks: number;
+  error_message: string | null;
   created_at: string;
 };
 
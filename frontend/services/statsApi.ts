@@ -0,0 +1,75 @@
+import { apiFetch } from "./apiClient";
+
+const STATS_PATH = "/api/stats";
+
+export type DurationStats = {
+  count: number;
+  avg_seconds?: number | null;
+};
+
+export type FirstResponseStats = DurationStats & {
+  within_sla: number;
+  sla_ratio?: number | null;
+};
+
+export type StatsOverview = {
+  date_from: string;
+  date_to: string;
+  messages: { user: number; ai: number; admin: number };
+  ai: { total: number; fallback: number; used_rag: number; during_operator_wait: number };
+  dialogs_created: number;
+  escalations: number;
+  first_response: FirstResponseStats;
+  handle_time: DurationStats;
+};
+
+export type SlaGranularity = "hour" | "day";
+
+export type SlaPoint = {
+  bucket_start: string;
+  first_response: FirstResponseStats;
+  handle_time: DurationStats;
+  escalations: number;
+};
+
+export type StatsSla = {
+  date_from: string;
+  date_to: string;
+  granularity: SlaGranularity;
+  sla_target_seconds: number;
+  items: SlaPoint[];
+};
+
+export type StatsRangeParams = {
+  dateFrom?: string;
+  dateTo?: string;
+};
+
+function buildQuery(params: Record<string, string | undefined>): string {
+  const searchParams = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value) {
+      searchParams.set(key, value);
+    }
+  });
+  const queryString = searchParams.toString();
+  return queryString ? `?${queryString}` : "";
+}
+
+export async function fetchStatsOverview(params: StatsRangeParams = {}): Promise<StatsOverview> {
+  return apiFetch<StatsOverview>(
+    `${STATS_PATH}/overview${buildQuery({ date_from: params.dateFrom, date_to: params.dateTo })}`,
+  );
+}
+
+export async function fetchStatsSla(
+  params: StatsRangeParams & { granularity?: SlaGranularity } = {},
+): Promise<StatsSla> {
+  return apiFetch<StatsSla>(
+    `${STATS_PATH}/sla${buildQuery({
+      date_from: params.dateFrom,
+      date_to: params.dateTo,
+      granularity: params.granularity,
+    })}`,
+  );
+}
@@ -95,6 +95,9 @@ type MessageEventPayload = {
   event?: string;
   dialog_id?: number;
   message?: MessageOut;
+  role?: string;
+  preview?: string;
+  created_at?: string;
 };
 
 type OperatorEventPayload = {
@@ -157,9 +160,20 @@ function normalizeMessageEventPayload(payload: unknown): MessageEventPayload | n
     event: typeof payload.event === "string" ? payload.event : undefined,
     dialog_id: toNumber(payload.dialog_id),
     message: payload.message as MessageOut | undefined,
+    role: typeof payload.role === "string" ? payload.role : undefined,
+    preview: typeof payload.preview === "string" ? payload.preview : undefined,
+    created_at: typeof payload.created_at === "string" ? payload.created_at : undefined,
   };
 }
 
+function unpackDialogBatch(payload: unknown): unknown[] {
+  // Сервер склеивает dialog.updated за короткое окно в один кадр dialogs.updated.
+  if (isRecord(payload) && payload.event === "dialogs.updated" && Array.isArray(payload.dialogs)) {
+    return payload.dialogs;
+  }
+  return [payload];
+}
+
 function normalizeOperatorEventPayload(payload: unknown): OperatorEventPayload | null {
   if (!isRecord(payload)) {
     return null;
@@ -393,49 +407,87 @@ export default function DialogsView() {
     loadDialog(selectedDialogId);
   }, [loadDialog, selectedDialogId]);
 
-  const handleMessageEvent = useCallback(
+  const handleMessageSummary = useCallback(
     (payload: unknown) => {
+      // Во входящих приходит только сводка; полный текст — в топике dialog:<id>.
       const data = normalizeMessageEventPayload(payload);
-      if (!data?.dialog_id || !data.message) {
+      if (!data?.dialog_id || data.event !== "message.summary") {
         return;
       }
-      const { dialog_id: dialogId, message } = data;
-      setSelectedDialog((prev) => {
-        if (!prev || prev.id !== dialogId) {
-          return prev;
-        }
-        const alreadyExists = prev.messages.some((item) => item.id === message.id);
-        if (alreadyExists) {
-          return {
-            ...prev,
-            last_message_at: message.created_at ?? prev.last_message_at,
-          };
-        }
-        return {
-          ...prev,
-          last_message_at: message.created_at ?? prev.last_message_at,
-          messages: [...prev.messages, message],
-        };
-      });
+      const { dialog_id: dialogId, created_at: createdAt } = data;
       setDialogs((prev) =>
         prev.map((dialog) =>
           dialog.id === dialogId
-            ? { ...dialog, last_message_at: message.created_at ?? dialog.last_message_at }
+            ? { ...dialog, last_message_at: createdAt ?? dialog.last_message_at }
             : dialog,
         ),
       );
-      if (message.role === "user") {
-        const body = message.content?.slice(0, 140) ?? "Новое сообщение";
+      if (data.role === "user") {
         triggerNotification(`Новое сообщение в диалоге #${dialogId}`, {
-          body,
+          body: data.preview || "Новое сообщение",
         });
       }
     },
     [triggerNotification],
   );
 
+  const resyncSelectedDialog = useCallback(async (dialogId: number) => {
+    // Без loadDialog: он сбрасывает черновик ответа и показывает загрузку.
+    try {
+      const response = await fetchDialog(dialogId);
+      setSelectedDialog((prev) => (prev && prev.id === dialogId ? response : prev));
+    } catch (error) {
+      console.error("Не удалось обновить сообщения диалога", error);
+    }
+  }, []);
+
+  const handleMessageEvent = useCallback((payload: unknown) => {
+    if (isRecord(payload) && payload.event === "resync.required") {
+      // Часть событий топика потеряна — перечитываем сообщения открытого диалога.
+      if (selectedDialogId) {
+        void resyncSelectedDialog(selectedDialogId);
+      }
+      return;
+    }
+    const data = normalizeMessageEventPayload(payload);
+    if (!data?.dialog_id || !data.message) {
+      return;
+    }
+    const { dialog_id: dialogId, message } = data;
+    setSelectedDialog((prev) => {
+      if (!prev || prev.id !== dialogId) {
+        return prev;
+      }
+      const alreadyExists = prev.messages.some((item) => item.id === message.id);
+      if (alreadyExists) {
+        return {
+          ...prev,
+          last_message_at: message.created_at ?? prev.last_message_at,
+        };
+      }
+      return {
+        ...prev,
+        last_message_at: message.created_at ?? prev.last_message_at,
+        messages: [...prev.messages, message],
+      };
+    });
+  }, [resyncSelectedDialog, selectedDialogId]);
+
   const handleDialogEvent = useCallback(
     (payload: unknown) => {
+      if (isRecord(payload) && payload.event === "resync.required") {
+        // Сервер отбросил часть событий для этого соединения — перечитываем список.
+        loadDialogs();
+        return;
+      }
+      if (isRecord(payload) && payload.event === "dialogs.unlocked" && Array.isArray(payload.dialog_ids)) {
+        const unlocked = new Set(payload.dialog_ids.map(toNumber).filter((id): id is number => id !== undefined));
+        const release = <T extends DialogShort>(dialog: T): T =>
+          unlocked.has(dialog.id) ? { ...dialog, is_locked: false, locked_until: null } : dialog;
+        setDialogs((prev) => prev.map(release));
+        setSelectedDialog((prev) => (prev ? release(prev) : prev));
+        return;
+      }
       const data = normalizeDialogEventPayload(payload);
       if (!data?.dialog_id) {
         return;
@@ -561,15 +613,24 @@ export default function DialogsView() {
   }, []);
 
   useEffect(() => {
-    const unsubscribeMessages = subscribe("messages", handleMessageEvent);
-    const unsubscribeDialogs = subscribe("dialogs", handleDialogEvent);
+    const unsubscribeMessages = subscribe("messages", handleMessageSummary);
+    const unsubscribeDialogs = subscribe("dialogs", (payload) => {
+      unpackDialogBatch(payload).forEach(handleDialogEvent);
+    });
     const unsubscribeOperators = subscribe("operators", handleOperatorEvent);
     return () => {
       unsubscribeMessages();
       unsubscribeDialogs();
       unsubscribeOperators();
     };
-  }, [handleDialogEvent, handleMessageEvent, handleOperatorEvent, subscribe]);
+  }, [handleDialogEvent, handleMessageSummary, handleOperatorEvent, subscribe]);
+
+  useEffect(() => {
+    if (!selectedDialogId) {
+      return undefined;
+    }
+    return subscribe(`dialog:${selectedDialogId}`, handleMessageEvent);
+  }, [handleMessageEvent, selectedDialogId, subscribe]);
 
   const handleStatusChange = (nextStatus: DialogStatus | "all") => {
     setStatusFilter(nextStatus);
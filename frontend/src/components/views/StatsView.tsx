@@ -2,6 +2,13 @@
 
 import { useEffect, useMemo, useState } from "react";
 
+import {
+  fetchStatsOverview,
+  fetchStatsSla,
+  type SlaGranularity,
+  type StatsOverview,
+} from "../../../services/statsApi";
+
 type Period = "day" | "week" | "month";
 
 type MetricCard = {
@@ -10,23 +17,78 @@ type MetricCard = {
   caption: string;
 };
 
-// TODO: replace mock stats with real API once /api/stats endpoints are available.
-const PERFORMANCE = [
-  { queue: "B2B", sla: "94%", aht: "6 мин", satisfaction: "4.8" },
-  { queue: "Retail", sla: "88%", aht: "4 мин", satisfaction: "4.5" },
-  { queue: "Support", sla: "91%", aht: "7 мин", satisfaction: "4.6" },
-];
-
-// TODO: replace mock stats with real API once /api/stats endpoints are available.
-const GRAPH_DATA: Record<Period, number[]> = {
-  day: [82, 90, 95, 93, 97, 92, 94],
-  week: [71, 82, 79, 85, 88, 90, 92],
-  month: [60, 65, 70, 72, 80, 84, 90],
+type PerformanceRow = {
+  queue: string;
+  sla: string;
+  aht: string;
+  satisfaction: string;
+};
+
+const PERIODS: Record<Period, { hours: number; granularity: SlaGranularity }> = {
+  day: { hours: 24, granularity: "hour" },
+  week: { hours: 24 * 7, granularity: "day" },
+  month: { hours: 24 * 30, granularity: "day" },
 };
 
+function formatDuration(seconds?: number | null): string {
+  if (seconds === null || seconds === undefined) {
+    return "—";
+  }
+  const minutes = Math.floor(seconds / 60);
+  const rest = Math.round(seconds % 60);
+  return minutes ? `${minutes} мин ${rest} сек` : `${rest} сек`;
+}
+
+function formatRatio(ratio?: number | null): string {
+  return ratio === null || ratio === undefined ? "—" : `${Math.round(ratio * 100)}%`;
+}
+
+function buildMetrics(overview: StatsOverview): MetricCard[] {
+  return [
+    {
+      label: "Новых диалогов",
+      value: overview.dialogs_created.toString(),
+      caption: `${overview.messages.user} сообщений от пользователей`,
+    },
+    {
+      label: "Первый ответ оператора",
+      value: formatDuration(overview.first_response.avg_seconds),
+      caption: `SLA ${formatRatio(overview.first_response.sla_ratio)}`,
+    },
+    {
+      label: "Эскалации",
+      value: overview.escalations.toString(),
+      caption: `${overview.ai.during_operator_wait} ответов AI во время ожидания`,
+    },
+    {
+      label: "Ответы AI",
+      value: overview.ai.total.toString(),
+      caption: `${overview.ai.used_rag} с базой знаний, ${overview.ai.fallback} fallback`,
+    },
+  ];
+}
+
+function buildPerformance(overview: StatsOverview): PerformanceRow[] {
+  const aiAnswered = overview.ai.total - overview.ai.fallback;
+  return [
+    {
+      queue: "Операторы",
+      sla: formatRatio(overview.first_response.sla_ratio),
+      aht: formatDuration(overview.handle_time.avg_seconds),
+      satisfaction: `${overview.messages.admin} сообщений`,
+    },
+    {
+      queue: "AI",
+      sla: formatRatio(overview.ai.total ? aiAnswered / overview.ai.total : null),
+      aht: "—",
+      satisfaction: `${overview.messages.ai} сообщений`,
+    },
+  ];
+}
+
 export default function StatsView() {
   const [metrics, setMetrics] = useState<MetricCard[] | null>(null);
-  const [performanceData, setPerformanceData] = useState<typeof PERFORMANCE>([]);
+  const [performanceData, setPerformanceData] = useState<PerformanceRow[]>([]);
   const [chartData, setChartData] = useState<Record<Period, number[]>>({
     day: [],
     week: [],
@@ -42,18 +104,27 @@ export default function StatsView() {
 
     async function loadStats() {
       try {
-        // TODO: Replace with analytics overview request to /api/stats/overview
-        const overviewMetrics: MetricCard[] = [
-          { label: "Диалогов сегодня", value: "186", caption: "+14% к прошлой неделе" },
-          { label: "Среднее время ответа", value: "3 мин 42 сек", caption: "SLA 90%" },
-          { label: "Эскалации", value: "12", caption: "4 в работе" },
-          { label: "Операторы онлайн", value: "27", caption: "+5 в резерве" },
-        ];
-
-        // TODO: Replace with SLA dataset from /api/stats/sla
-        setMetrics(overviewMetrics);
-        setPerformanceData(PERFORMANCE);
-        setChartData(GRAPH_DATA);
+        const now = new Date();
+        const dateTo = now.toISOString();
+        const since = (hours: number) => new Date(now.getTime() - hours * 3600 * 1000).toISOString();
+
+        const [overview, ...series] = await Promise.all([
+          fetchStatsOverview({ dateFrom: since(24), dateTo }),
+          ...(Object.keys(PERIODS) as Period[]).map((key) =>
+            fetchStatsSla({ dateFrom: since(PERIODS[key].hours), dateTo, granularity: PERIODS[key].granularity }),
+          ),
+        ]);
+
+        const slaByPeriod = {} as Record<Period, number[]>;
+        (Object.keys(PERIODS) as Period[]).forEach((key, index) => {
+          slaByPeriod[key] = series[index].items
+            .filter((point) => point.first_response.sla_ratio !== null && point.first_response.sla_ratio !== undefined)
+            .map((point) => Math.round((point.first_response.sla_ratio ?? 0) * 100));
+        });
+
+        setMetrics(buildMetrics(overview));
+        setPerformanceData(buildPerformance(overview));
+        setChartData(slaByPeriod);
       } catch (statsError) {
         setError(statsError instanceof Error ? statsError.message : "Не удалось загрузить статистику");
       } finally {
@@ -65,7 +136,7 @@ export default function StatsView() {
   }, []);
 
   const dataset = useMemo(() => chartData[period] ?? [], [chartData, period]);
-  const hasData = Boolean(metrics?.length && performanceData.length && dataset.length);
+  const hasData = Boolean(metrics?.length);
 
   if (isLoading) {
     return (
@@ -127,6 +198,7 @@ export default function StatsView() {
           </div>
         </div>
         <div className="chart-placeholder">
+          {dataset.length === 0 && <p className="placeholder">Нет ответов операторов за период</p>}
           {dataset.map((value, index) => (
             <div key={`${value}-${index}`} className="chart-bar" style={{ height: `${value}%` }}>
               <span>{value}%</span>
@@ -143,7 +215,7 @@ export default function StatsView() {
               <th>Очередь</th>
               <th>SLA</th>
               <th>AHT</th>
-              <th>Оценка клиентов</th>
+              <th>Объём</th>
             </tr>
           </thead>
           <tbody>
@@ -5,6 +5,7 @@ const ACCESS_COOKIE_NAME = "access_token";
 const PING_INTERVAL = 20_000;
 const INITIAL_RECONNECT_DELAY = 1_000;
 const MAX_RECONNECT_DELAY = 30_000;
+const textDecoder = new TextDecoder();
 
 export type ConnectionStatus =
   | "idle"
@@ -48,24 +49,35 @@ function isUnauthorizedClose(event: CloseEvent): boolean {
 }
 
 type ChannelState = {
-  socket: WebSocket | null;
   listeners: Set<ChannelMessageHandler>;
   statusListeners: Set<ChannelStatusHandler>;
-  reconnectAttempts: number;
-  reconnectTimeoutId: ReturnType<typeof setTimeout> | null;
-  pingIntervalId: ReturnType<typeof setInterval> | null;
-  status: ConnectionStatus;
-  shouldReconnect: boolean;
+};
+
+type ControlFrame = {
+  action: "subscribe" | "unsubscribe";
+  channels: string[];
+  since?: number;
+  stream?: string;
 };
 
 export type WSClientOptions = {
   auth?: Pick<AuthContextValue, "refreshUser" | "logout">;
 };
 
+// Один сокет /api/events на все каналы: подписки меняются управляющими кадрами,
+// события раскладываются по полю channel.
 export class WSClient {
   private readonly baseUrl: string;
   private auth?: Pick<AuthContextValue, "refreshUser" | "logout">;
   private readonly channels = new Map<string, ChannelState>();
+  private socket: WebSocket | null = null;
+  private status: ConnectionStatus = "idle";
+  private reconnectAttempts = 0;
+  private reconnectTimeoutId: ReturnType<typeof setTimeout> | null = null;
+  private pingIntervalId: ReturnType<typeof setInterval> | null = null;
+  // Поток и номер последнего события: после переподключения сервер дошлёт пропущенное.
+  private stream: string | null = null;
+  private lastSeq: number | null = null;
 
   constructor(options: WSClientOptions = {}) {
     this.baseUrl = API_BASE_URL || (isBrowser ? window.location.origin : "");
@@ -82,9 +94,12 @@ export class WSClient {
     }
     const normalizedChannel = normalizeChannel(channel);
     const state = this.ensureState(normalizedChannel);
+    const isNewChannel = state.listeners.size === 0;
     state.listeners.add(handler);
-    state.shouldReconnect = true;
-    this.connect(normalizedChannel);
+    if (isNewChannel) {
+      this.sendControl({ action: "subscribe", channels: [normalizedChannel] });
+    }
+    this.connect();
     return () => {
       this.unsubscribe(normalizedChannel, handler);
     };
@@ -103,7 +118,8 @@ export class WSClient {
     }
 
     if (state.listeners.size === 0) {
-      this.closeChannel(normalizedChannel);
+      this.sendControl({ action: "unsubscribe", channels: [normalizedChannel] });
+      this.dropChannelIfUnused(normalizedChannel);
     }
   }
 
@@ -114,7 +130,7 @@ export class WSClient {
     const normalizedChannel = normalizeChannel(channel);
     const state = this.ensureState(normalizedChannel);
     state.statusListeners.add(handler);
-    handler(state.status);
+    handler(state.listeners.size > 0 ? this.status : "idle");
     return () => {
       this.offStatus(normalizedChannel, handler);
     };
@@ -127,14 +143,16 @@ export class WSClient {
       return;
     }
     state.statusListeners.delete(handler);
-    if (state.listeners.size === 0 && state.statusListeners.size === 0) {
-      this.closeChannel(normalizedChannel);
-    }
+    this.dropChannelIfUnused(normalizedChannel);
   }
 
   public closeAll(): void {
+    for (const state of this.channels.values()) {
+      state.listeners.clear();
+    }
+    this.closeSocket();
     for (const channel of [...this.channels.keys()]) {
-      this.closeChannel(channel);
+      this.dropChannelIfUnused(channel);
     }
   }
 
@@ -146,25 +164,34 @@ export class WSClient {
     let state = this.channels.get(channel);
     if (!state) {
       state = {
-        socket: null,
         listeners: new Set(),
         statusListeners: new Set(),
-        reconnectAttempts: 0,
-        reconnectTimeoutId: null,
-        pingIntervalId: null,
-        status: "idle",
-        shouldReconnect: false,
       };
       this.channels.set(channel, state);
     }
     return state;
   }
 
-  private buildUrl(channel: string): string {
+  private activeChannels(): string[] {
+    return [...this.channels.entries()]
+      .filter(([, state]) => state.listeners.size > 0)
+      .map(([channel]) => channel);
+  }
+
+  private dropChannelIfUnused(channel: string): void {
+    const state = this.channels.get(channel);
+    if (state && state.listeners.size === 0 && state.statusListeners.size === 0) {
+      this.channels.delete(channel);
+    }
+    if (this.activeChannels().length === 0) {
+      this.closeSocket();
+    }
+  }
+
+  private buildUrl(): string {
     const fallback = isBrowser ? window.location.origin : "http://localhost";
     const base = (this.baseUrl || fallback).replace(/\/$/, "");
-    const normalizedChannel = normalizeChannel(channel);
-    const url = new URL(`/api/events/${normalizedChannel}`, base || undefined);
+    const url = new URL("/api/events", base || undefined);
     url.protocol = url.protocol === "https:" ? "wss:" : "ws:";
     const token = readCookie(ACCESS_COOKIE_NAME);
     if (token) {
@@ -173,41 +200,55 @@ export class WSClient {
     return url.toString();
   }
 
-  private connect(channel: string): void {
+  private sendControl(frame: ControlFrame): void {
+    // До открытия сокета кадр не нужен: при open подписываемся на все активные каналы.
+    if (this.socket?.readyState === WebSocket.OPEN) {
+      this.socket.send(JSON.stringify(frame));
+    }
+  }
+
+  private connect(): void {
     if (!isBrowser) {
       return;
     }
-    const state = this.ensureState(channel);
     if (
-      state.socket &&
-      (state.socket.readyState === WebSocket.OPEN || state.socket.readyState === WebSocket.CONNECTING)
+      this.socket &&
+      (this.socket.readyState === WebSocket.OPEN || this.socket.readyState === WebSocket.CONNECTING)
     ) {
       return;
     }
-    if (state.listeners.size === 0) {
+    if (this.activeChannels().length === 0) {
       return;
     }
-    this.clearReconnect(channel);
-    this.setStatus(channel, state.reconnectAttempts > 0 ? "reconnecting" : "connecting");
+    this.clearReconnect();
+    this.setStatus(this.reconnectAttempts > 0 ? "reconnecting" : "connecting");
     try {
-      const socket = new WebSocket(this.buildUrl(channel));
-      state.socket = socket;
+      const socket = new WebSocket(this.buildUrl());
+      // Сервер шлёт события бинарными кадрами с готовым UTF-8 JSON.
+      socket.binaryType = "arraybuffer";
+      this.socket = socket;
       socket.addEventListener("open", () => {
-        state.reconnectAttempts = 0;
-        this.setStatus(channel, "connected");
-        this.startPing(channel);
+        this.reconnectAttempts = 0;
+        const resume =
+          this.stream !== null && this.lastSeq !== null ? { since: this.lastSeq, stream: this.stream } : {};
+        this.sendControl({ action: "subscribe", channels: this.activeChannels(), ...resume });
+        this.setStatus("connected");
+        this.startPing();
       });
       socket.addEventListener("message", (event) => {
-        this.dispatchMessage(channel, event.data);
+        this.dispatchMessage(event.data);
       });
       socket.addEventListener("error", () => {
-        this.setStatus(channel, "error");
+        this.setStatus("error");
       });
       socket.addEventListener("close", async (event) => {
-        this.stopPing(channel);
-        state.socket = null;
-        if (!state.shouldReconnect || state.listeners.size === 0) {
-          this.setStatus(channel, "disconnected");
+        if (this.socket !== socket) {
+          return;
+        }
+        this.stopPing();
+        this.socket = null;
+        if (this.activeChannels().length === 0) {
+          this.setStatus("disconnected");
           return;
         }
         if (isUnauthorizedClose(event) && this.auth?.refreshUser) {
@@ -217,73 +258,99 @@ export class WSClient {
             console.error("Не удалось обновить токен", error);
           }
         }
-        this.scheduleReconnect(channel);
+        this.scheduleReconnect();
       });
     } catch (error) {
       console.error("Не удалось подключиться к WebSocket", error);
-      this.scheduleReconnect(channel);
+      this.scheduleReconnect();
     }
   }
 
-  private dispatchMessage(channel: string, data: MessageEvent["data"]): void {
-    const state = this.channels.get(channel);
-    if (!state) {
-      return;
-    }
+  private dispatchMessage(data: MessageEvent["data"]): void {
     let payload: unknown = data;
+    if (data instanceof ArrayBuffer) {
+      data = textDecoder.decode(data);
+    }
     if (typeof data === "string") {
       try {
         payload = JSON.parse(data);
       } catch {
-        payload = data;
+        return;
       }
     }
-    for (const listener of state.listeners) {
-      listener(payload);
+    if (!payload || typeof payload !== "object") {
+      return;
+    }
+    const { seq, stream, event } = payload as { seq?: unknown; stream?: unknown; event?: unknown };
+    if (event === "ping") {
+      // Серверный heartbeat: ответом служит наш собственный периодический ping.
+      return;
+    }
+    if (event === "subscriptions" && typeof stream === "string") {
+      if (stream !== this.stream) {
+        this.stream = stream;
+        this.lastSeq = typeof seq === "number" ? seq : null;
+      }
+      return;
+    }
+    if (typeof seq === "number") {
+      this.lastSeq = Math.max(this.lastSeq ?? 0, seq);
+    }
+    const channel = (payload as { channel?: unknown }).channel;
+    // Служебные кадры без канала (resync.required) получают все подписчики.
+    const targets =
+      typeof channel === "string"
+        ? [this.channels.get(channel)]
+        : [...this.channels.values()];
+    for (const state of targets) {
+      if (!state) {
+        continue;
+      }
+      for (const listener of state.listeners) {
+        listener(payload);
+      }
     }
   }
 
-  private setStatus(channel: string, status: ConnectionStatus): void {
-    const state = this.channels.get(channel);
-    if (!state || state.status === status) {
+  private setStatus(status: ConnectionStatus): void {
+    if (this.status === status) {
       return;
     }
-    state.status = status;
-    for (const listener of state.statusListeners) {
-      listener(status);
+    this.status = status;
+    for (const state of this.channels.values()) {
+      for (const listener of state.statusListeners) {
+        listener(status);
+      }
     }
   }
 
-  private scheduleReconnect(channel: string): void {
-    const state = this.channels.get(channel);
-    if (!state || state.listeners.size === 0) {
+  private scheduleReconnect(): void {
+    if (this.activeChannels().length === 0) {
       return;
     }
-    state.reconnectAttempts += 1;
-    const delay = Math.min(MAX_RECONNECT_DELAY, INITIAL_RECONNECT_DELAY * 2 ** (state.reconnectAttempts - 1));
-    this.clearReconnect(channel);
-    state.reconnectTimeoutId = setTimeout(() => {
-      this.connect(channel);
+    this.reconnectAttempts += 1;
+    const delay = Math.min(MAX_RECONNECT_DELAY, INITIAL_RECONNECT_DELAY * 2 ** (this.reconnectAttempts - 1));
+    this.clearReconnect();
+    this.reconnectTimeoutId = setTimeout(() => {
+      this.connect();
     }, delay);
   }
 
-  private clearReconnect(channel: string): void {
-    const state = this.channels.get(channel);
-    if (state?.reconnectTimeoutId) {
-      clearTimeout(state.reconnectTimeoutId);
-      state.reconnectTimeoutId = null;
+  private clearReconnect(): void {
+    if (this.reconnectTimeoutId) {
+      clearTimeout(this.reconnectTimeoutId);
+      this.reconnectTimeoutId = null;
     }
   }
 
-  private startPing(channel: string): void {
-    const state = this.channels.get(channel);
-    if (!state || state.pingIntervalId || !state.socket) {
+  private startPing(): void {
+    if (this.pingIntervalId || !this.socket) {
       return;
     }
-    state.pingIntervalId = setInterval(() => {
-      if (state?.socket?.readyState === WebSocket.OPEN) {
+    this.pingIntervalId = setInterval(() => {
+      if (this.socket?.readyState === WebSocket.OPEN) {
         try {
-          state.socket.send("ping");
+          this.socket.send("ping");
         } catch (error) {
           console.error("Не удалось отправить ping", error);
         }
@@ -291,32 +358,22 @@ export class WSClient {
     }, PING_INTERVAL);
   }
 
-  private stopPing(channel: string): void {
-    const state = this.channels.get(channel);
-    if (state?.pingIntervalId) {
-      clearInterval(state.pingIntervalId);
-      state.pingIntervalId = null;
+  private stopPing(): void {
+    if (this.pingIntervalId) {
+      clearInterval(this.pingIntervalId);
+      this.pingIntervalId = null;
     }
   }
 
-  private closeChannel(channel: string): void {
-    const state = this.channels.get(channel);
-    if (!state) {
-      return;
-    }
-    state.shouldReconnect = false;
-    this.clearReconnect(channel);
-    this.stopPing(channel);
-    if (
-      state.socket &&
-      (state.socket.readyState === WebSocket.OPEN || state.socket.readyState === WebSocket.CONNECTING)
-    ) {
-      state.socket.close();
-    }
-    state.socket = null;
-    this.setStatus(channel, "disconnected");
-    if (state.listeners.size === 0 && state.statusListeners.size === 0) {
-      this.channels.delete(channel);
+  private closeSocket(): void {
+    this.clearReconnect();
+    this.stopPing();
+    const socket = this.socket;
+    this.socket = null;
+    this.reconnectAttempts = 0;
+    if (socket && (socket.readyState === WebSocket.OPEN || socket.readyState === WebSocket.CONNECTING)) {
+      socket.close();
     }
+    this.setStatus("disconnected");
   }
 }
@@ -44,7 +44,7 @@ describe("LoginPage", () => {
           expires_at: "2024-03-01T12:00:00Z",
         }),
       ),
-      http.get("/api/auth/status", () => {
+      http.get("/api/auth/status/wait", () => {
         pollCount += 1;
         if (pollCount === 1) {
           return HttpResponse.json({
@@ -96,7 +96,7 @@ describe("LoginPage", () => {
           expires_at: "2024-03-01T12:00:00Z",
         }),
       ),
-      http.get("/api/auth/status", () =>
+      http.get("/api/auth/status/wait", () =>
         HttpResponse.json({
           status: "rejected",
           admin: null,